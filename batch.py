@@ -0,0 +1,291 @@
+"""
+Batch entry point: clean every workbook of a directory or glob in one process.
+
+All workbooks share one pool of worker processes. Each workbook's split is a job
+in the pool; as soon as it finishes, that workbook's sheets are queued as jobs
+too, largest first. Idle workers take the next queued job, whichever workbook it
+belongs to, so a few huge sheets never leave the other workers waiting, and
+pandas and openpyxl are imported once per worker instead of once per workbook.
+
+Every workbook gets its own output folder (``<output>/<workbook name>/``) with
+the same layout, manifest and run report as a ``main.py`` run. A workbook that
+fails to split, or a sheet that fails, is recorded and never stops the rest; a
+worker that crashes is replaced and the jobs lost with it run again.
+A consolidated ``batch_summary.json`` is written to the output directory.
+
+Usage:
+    python batch.py "data/*.xlsx" results/ --workers 8
+    python batch.py data/ results/ --recursive
+"""
+
+import os
+import sys
+import argparse
+import datetime
+import glob
+import json
+import time
+import traceback
+from concurrent.futures import Future, ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from main import add_pipeline_arguments, resolve_options, output_dirs
+from pipeline import split_workbook, process_sheet_file, record_sheets
+from run_manifest import RunManifest, SHEET_STAGES
+from telemetry import RUN_REPORT_FILE_NAME, write_run_report
+
+BATCH_SUMMARY_FILE_NAME = "batch_summary.json"
+
+
+def find_workbooks(sources: list, recursive: bool = False) -> list:
+    """
+    Expand directories and glob patterns into a sorted list of .xlsx files.
+
+    Excel's lock files (``~$name.xlsx``) are skipped.
+    """
+    found = set()
+    for source in sources:
+        if os.path.isdir(source):
+            pattern = os.path.join(glob.escape(source), "**" if recursive else "", "*.xlsx")
+            matches = glob.glob(pattern, recursive=recursive)
+        else:
+            matches = glob.glob(source, recursive=recursive)
+        found.update(os.path.abspath(path) for path in matches
+                     if path.lower().endswith(".xlsx") and not os.path.basename(path).startswith("~$"))
+    return sorted(found)
+
+
+class WorkbookRun:
+    """State of one workbook inside a batch: its folders, manifest, split result and sheet entries."""
+
+    def __init__(self, input_file: str, output_dir: str, options: dict):
+        self.input_file = input_file
+        self.output_dir = output_dir
+        self.dirs = output_dirs(output_dir)
+        for d in self.dirs.values():
+            os.makedirs(d, exist_ok=True)
+        self.manifest = None if options.get("no_manifest") else RunManifest(output_dir, fresh=options.get("rerun_all"))
+        self.started_at = datetime.datetime.now().isoformat(timespec="seconds")
+        self.started = time.perf_counter()
+        self.finished = None
+        self.sheet_files = []
+        self.entries = {}
+        self.workbook_stages = []
+        self.error = None
+
+    @property
+    def done(self) -> bool:
+        return self.error is not None or len(self.entries) == len(self.sheet_files)
+
+    def summary(self) -> list:
+        return [self.entries[sheet_file] for sheet_file in self.sheet_files]
+
+
+def _workbook_output_dirs(workbooks: list, output_root: str) -> list:
+    """One output folder per workbook, named after it; same-named workbooks from different folders get a suffix."""
+    used, folders = set(), []
+    for path in workbooks:
+        name = os.path.splitext(os.path.basename(path))[0]
+        folder, suffix = name, 2
+        while folder in used:
+            folder, suffix = f"{name}_{suffix}", suffix + 1
+        used.add(folder)
+        folders.append(os.path.join(output_root, folder))
+    return folders
+
+
+class _WorkerPool:
+    """The batch's process pool, replaced by a new one when a crashed worker has broken it."""
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self.executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+
+    def submit(self, func, *args) -> Future:
+        if self.executor is None:
+            # Sequential batches run each job right away; a finished future keeps one code path
+            future = Future()
+            try:
+                future.set_result(func(*args))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        try:
+            return self.executor.submit(func, *args)
+        except BrokenProcessPool:
+            print("⚠️  The worker pool was broken by a crashed worker; starting a new one.")
+            self.executor.shutdown(wait=False)
+            self.executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self.executor.submit(func, *args)
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+
+
+def run_batch(workbooks: list, output_root: str, options: dict, workers: int) -> list:
+    """
+    Run the pipeline for every workbook on one shared worker pool.
+
+    A worker that dies breaks the pool and fails every job in it. The pool is then
+    replaced, and each job lost that way is queued again; these retries run one at
+    a time, so a job that crashes its worker again is the one recorded as failed.
+
+    Returns
+    -------
+    list of WorkbookRun
+        One per workbook, in input order, each with its per-sheet summary entries.
+    """
+    folders = _workbook_output_dirs(workbooks, output_root)
+    runs = [WorkbookRun(path, folder, options) for path, folder in zip(workbooks, folders)]
+    pool = _WorkerPool(workers)
+
+    # future -> (run, sheet file or None for the split, job, whether the job is a retry)
+    pending = {}
+    retries = []
+
+    def submit(run, sheet_file, func, *args, retry=False):
+        pending[pool.submit(func, *args)] = (run, sheet_file, (func, *args), retry)
+
+    try:
+        for run in runs:
+            previous = run.manifest.data["split"] if run.manifest else None
+            submit(run, None, split_workbook, run.input_file, run.dirs["split"], options, previous)
+
+        while pending or retries:
+            if retries and not any(retry for *_, retry in pending.values()):
+                run, sheet_file, job = retries.pop(0)
+                submit(run, sheet_file, *job, retry=True)
+            finished, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+            for future in finished:
+                run, sheet_file, job, retry = pending.pop(future)
+                if not retry and isinstance(future.exception(), BrokenProcessPool):
+                    retries.append((run, sheet_file, job))
+                    continue
+                if sheet_file is None:
+                    _on_split_done(run, future, options, submit)
+                else:
+                    _on_sheet_done(run, sheet_file, future)
+                if run.done and run.finished is None:
+                    _finish_workbook(run, options)
+    finally:
+        pool.shutdown()
+    return runs
+
+
+def _on_split_done(run: WorkbookRun, future, options: dict, submit):
+    try:
+        split = future.result()
+    except Exception as e:
+        print(f"❌ Failed to split '{run.input_file}': {e}")
+        traceback.print_exc()
+        run.error = f"split failed: {e}"
+        return
+    run.workbook_stages.extend(split["telemetry"])
+    run.sheet_files = split["sheet_files"]
+    if not run.sheet_files:
+        run.error = "no sheet files were generated"
+        return
+    if run.manifest and not split["reused"]:
+        run.manifest.data["input_file"] = run.input_file
+        run.manifest.data["split"] = split["record"]
+    # Largest sheets first, so the longest jobs do not start last and hold up the end of the batch
+    for sheet_file in sorted(run.sheet_files, key=os.path.getsize, reverse=True):
+        previous = run.manifest.sheet_stages(os.path.basename(sheet_file)) if run.manifest else None
+        submit(run, sheet_file, process_sheet_file, sheet_file, run.dirs, options, previous)
+
+
+def _on_sheet_done(run: WorkbookRun, sheet_file: str, future):
+    try:
+        run.entries[sheet_file] = future.result()
+    except Exception as e:
+        print(f"❌ Worker failed while processing '{os.path.basename(sheet_file)}': {e}")
+        run.entries[sheet_file] = {"sheet_file": sheet_file, "status": "Failed", "outputs": {}}
+
+
+def _finish_workbook(run: WorkbookRun, options: dict):
+    """Save the workbook's manifest and run report as soon as its last sheet is done."""
+    run.finished = time.perf_counter()
+    summary = run.summary() if run.error is None else []
+    if run.manifest and run.error is None:
+        record_sheets(run.manifest, run.sheet_files, summary)
+    write_run_report(os.path.join(run.output_dir, RUN_REPORT_FILE_NAME), run.input_file, run.started_at,
+                     run.finished - run.started, run.workbook_stages, summary, options)
+    failed = sum(entry["status"] != "Success" for entry in summary)
+    status = f"failed ({run.error})" if run.error else f"{len(summary) - failed} of {len(summary)} sheets succeeded"
+    print(f"📘 Finished workbook '{os.path.basename(run.input_file)}': {status}.")
+
+
+def write_batch_summary(path: str, runs: list, started_at: str, wall_seconds: float) -> dict:
+    """Write the consolidated summary of all workbooks and return it."""
+    workbooks = []
+    for run in runs:
+        summary = run.summary() if run.error is None else []
+        failed = sum(entry["status"] != "Success" for entry in summary)
+        workbooks.append({
+            "input_file": run.input_file,
+            "output_dir": run.output_dir,
+            "status": "Failed" if run.error or failed else "Success",
+            "error": run.error,
+            "sheets_total": len(summary),
+            "sheets_failed": failed,
+            "sheets_reused": sum(set(entry.get("reused", [])) == set(SHEET_STAGES) for entry in summary),
+            # Workbooks share the pool, so this is the time from the batch start until the workbook was done
+            "finished_after_seconds": round(run.finished - run.started, 4),
+            "sheets": [{"sheet_file": os.path.basename(entry["sheet_file"]), "status": entry["status"],
+                        "outputs": entry["outputs"]} for entry in summary],
+        })
+    batch = {
+        "started_at": started_at,
+        "wall_seconds": round(wall_seconds, 4),
+        "workbooks_total": len(runs),
+        "workbooks_failed": sum(workbook["status"] != "Success" for workbook in workbooks),
+        "sheets_total": sum(workbook["sheets_total"] for workbook in workbooks),
+        "sheets_failed": sum(workbook["sheets_failed"] for workbook in workbooks),
+        "workbooks": workbooks,
+    }
+    with open(path, "w") as f:
+        json.dump(batch, f, indent=2)
+    return batch
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Clean every workbook of a directory or glob pattern on one shared worker pool."
+    )
+    parser.add_argument("inputs", nargs="+", help="Directories and/or glob patterns of .xlsx files (quote globs).")
+    parser.add_argument("output_directory", help="Directory that receives one output folder per workbook.")
+    parser.add_argument("--recursive", action="store_true", help="Also search subdirectories (and '**' in globs).")
+    add_pipeline_arguments(parser)
+    parser.set_defaults(workers=os.cpu_count() or 1)
+    args = parser.parse_args()
+    started_at = datetime.datetime.now().isoformat(timespec="seconds")
+    run_started = time.perf_counter()
+    options = resolve_options(args)
+
+    workbooks = find_workbooks(args.inputs, args.recursive)
+    if not workbooks:
+        print(f"❌ No .xlsx files found in {', '.join(args.inputs)}.")
+        sys.exit(1)
+    os.makedirs(args.output_directory, exist_ok=True)
+    print(f"📚 Processing {len(workbooks)} workbooks with {args.workers} worker(s) ...")
+
+    runs = run_batch(workbooks, args.output_directory, options, args.workers)
+
+    summary_path = os.path.join(args.output_directory, BATCH_SUMMARY_FILE_NAME)
+    batch = write_batch_summary(summary_path, runs, started_at, time.perf_counter() - run_started)
+    print("\n=== Batch summary ===")
+    for workbook in batch["workbooks"]:
+        detail = workbook["error"] or (f"{workbook['sheets_total'] - workbook['sheets_failed']}/"
+                                       f"{workbook['sheets_total']} sheets, done after {workbook['finished_after_seconds']:.1f}s")
+        print(f"  - {os.path.basename(workbook['input_file'])}: {workbook['status']} ({detail})")
+    print(f"\n  {batch['workbooks_total'] - batch['workbooks_failed']} of {batch['workbooks_total']} workbooks and "
+          f"{batch['sheets_total'] - batch['sheets_failed']} of {batch['sheets_total']} sheets succeeded "
+          f"in {batch['wall_seconds']:.1f}s.")
+    print(f"  Batch summary written to '{summary_path}'.")
+    if batch["workbooks_failed"]:
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Benchmark sequential vs. concurrent LLM boundary detection against the mock server.
+
+Starts ``mock_openai_server`` in the background, sends the same synthetic sheets
+through ``find_table_boundaries`` (one request after another) and through
+``find_table_boundaries_batch`` (concurrent, rate limited, with retries), checks
+that both paths agree, and prints throughput and retry counts.
+
+Usage:
+    python benchmarks/bench_async_boundaries.py --sheets 40 --latency 0.5 --failure-rate 0.2
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+from mock_openai_server import start_server
+
+
+def make_grid(rows: int, cols: int, seed: int) -> pd.DataFrame:
+    """A sheet grid shaped like ``pd.read_excel(header=None, dtype=str)``: title, header, numbers, total."""
+    rng = np.random.default_rng(seed)
+    body = rng.integers(0, 10_000, size=(rows, cols)).astype(str).astype(object)
+    grid = pd.DataFrame(body)
+    grid.insert(0, "label", [f"Item {seed}-{i}" for i in range(rows)])
+    grid.columns = range(cols + 1)
+    title = pd.DataFrame([[f"Report {seed}"] + [np.nan] * cols])
+    header = pd.DataFrame([["Name"] + [f"Col {c}" for c in range(cols)]])
+    total = pd.DataFrame([["TOTAL"] + [str(v) for v in body.astype(int).sum(axis=0)]])
+    return pd.concat([title, header, grid, total], ignore_index=True)
+
+
+def strip_metadata(boundaries: dict) -> dict:
+    return {key: boundaries[key] for key in ("header_start_index", "data_end_index")}
+
+
+def run_sequential(grids: list, max_retries: int) -> dict:
+    import openai
+    from find_table_boundaries import find_table_boundaries
+
+    # The SDK's module-level client retries on its own; give it the same budget
+    openai.max_retries = max_retries
+    results, failures = [], 0
+    started = time.perf_counter()
+    for grid in grids:
+        try:
+            results.append(strip_metadata(find_table_boundaries(None, None, df=grid, engine="llm")))
+        except Exception:
+            results.append(None)
+            failures += 1
+    elapsed = time.perf_counter() - started
+    return {"elapsed_seconds": round(elapsed, 3), "sheets_per_second": round(len(grids) / elapsed, 2),
+            "failures": failures, "results": results}
+
+
+def run_batched(grids: list, concurrency: int, rate: float, timeout: float, max_retries: int) -> dict:
+    from async_boundaries import find_table_boundaries_batch
+
+    stats = {}
+    started = time.perf_counter()
+    answers = find_table_boundaries_batch(grids, engine="llm", concurrency=concurrency, requests_per_second=rate,
+                                          timeout=timeout, max_retries=max_retries, stats=stats)
+    elapsed = time.perf_counter() - started
+    results = [None if isinstance(answer, BaseException) else strip_metadata(answer) for answer in answers]
+    return {"elapsed_seconds": round(elapsed, 3), "sheets_per_second": round(len(grids) / elapsed, 2),
+            "failures": results.count(None), "requests": stats["requests"], "retries": stats["retries"],
+            "results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sequential vs. concurrent boundary detection offline.")
+    parser.add_argument("--sheets", type=int, default=20, help="Number of synthetic sheets (default: 20).")
+    parser.add_argument("--rows", type=int, default=60, help="Data rows per sheet (default: 60).")
+    parser.add_argument("--cols", type=int, default=6, help="Numeric columns per sheet (default: 6).")
+    parser.add_argument("--latency", type=float, default=0.3, help="Mock response latency in seconds (default: 0.3).")
+    parser.add_argument("--jitter", type=float, default=0.1, help="Extra random mock latency (default: 0.1).")
+    parser.add_argument("--failure-rate", type=float, default=0.1, help="Share of 429/500 responses (default: 0.1).")
+    parser.add_argument("--retry-after", type=float, default=0.2, help="Retry-After seconds on 429 (default: 0.2).")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=20.0, help="Requests started per second (default: 20).")
+    parser.add_argument("--timeout", type=float, default=10.0)
+    parser.add_argument("--max-retries", type=int, default=5)
+    parser.add_argument("--skip-sequential", action="store_true", help="Only run the batched path.")
+    parser.add_argument("--json", help="Also write the measurements to this JSON file.")
+    args = parser.parse_args()
+
+    server, state, base_url = start_server(latency=args.latency, jitter=args.jitter, failure_rate=args.failure_rate,
+                                           retry_after=args.retry_after)
+    os.environ["OPENAI_BASE_URL"] = base_url
+    os.environ["OPENAI_API_KEY"] = "mock"
+    grids = [make_grid(args.rows, args.cols, seed) for seed in range(args.sheets)]
+
+    report = {"settings": vars(args)}
+    try:
+        if not args.skip_sequential:
+            report["sequential"] = run_sequential(grids, args.max_retries)
+        state.max_in_flight = 0
+        report["batched"] = run_batched(grids, args.concurrency, args.rate, args.timeout, args.max_retries)
+        report["batched"]["max_in_flight"] = state.max_in_flight
+        report["mock_server"] = dict(state.counts)
+    finally:
+        server.shutdown()
+
+    print("\n=== Boundary detection benchmark ===")
+    print(f"{args.sheets} sheets, mock latency {args.latency}s (+{args.jitter}s), failure rate {args.failure_rate}")
+    if "sequential" in report:
+        seq = report["sequential"]
+        print(f"  sequential: {seq['elapsed_seconds']:.2f}s, {seq['sheets_per_second']} sheets/s, "
+              f"{seq['failures']} failed")
+    bat = report["batched"]
+    print(f"  batched:    {bat['elapsed_seconds']:.2f}s, {bat['sheets_per_second']} sheets/s, {bat['failures']} failed, "
+          f"{bat['requests']} requests, {bat['retries']} retries, max {bat['max_in_flight']} in flight "
+          f"(cap {args.concurrency})")
+    if "sequential" in report:
+        seq = report["sequential"]
+        print(f"  speed-up:   {seq['elapsed_seconds'] / bat['elapsed_seconds']:.1f}x")
+        agree = all(a == b for a, b in zip(seq["results"], bat["results"]) if a is not None and b is not None)
+        print(f"  results agree: {agree}")
+        report["results_agree"] = agree
+    print(f"  mock server: {report['mock_server']}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"  Measurements written to '{args.json}'")
+
+
+if __name__ == "__main__":
+    main()
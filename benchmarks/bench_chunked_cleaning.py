@@ -0,0 +1,127 @@
+"""
+Time and peak memory of chunked (out-of-core) cleaning against whole-table cleaning.
+
+Generates a tall report workbook (see ``generate_workbook``) and cleans its table
+with the true boundaries into the requested output formats, twice:
+
+    whole    ``process_table_with_pandas`` with the fast reader: the sheet grid,
+             the sliced table and the filtered table are all in memory
+    chunked  ``chunked_cleaning.clean_sheet_in_chunks``: the rows are streamed
+             ``--chunk-size`` at a time and appended to the outputs
+
+Each mode runs in a fresh process, which reports its wall time and how far its
+peak resident memory rose above what the imports took (read from /proc, so Linux
+only). Resident memory is used instead of ``tracemalloc`` because pandas keeps
+string columns in Arrow buffers, which ``tracemalloc`` does not see. The CSV
+outputs of both modes are compared byte for byte. Run it with growing ``--rows``:
+the whole-table peak grows with the table, the chunked peak stays about the same.
+
+Usage:
+    python benchmarks/bench_chunked_cleaning.py --rows 200000 --chunk-size 10000 --json chunked.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+from generate_workbook import generate_workbook
+from chunked_cleaning import clean_sheet_in_chunks
+from process_with_pandas import process_table_with_pandas
+from stage_registry import OUTPUT_FORMATS
+
+
+def run_mode(mode: str, workbook: str, boundaries_json: str, paths: dict, chunk_size: int, coerce: bool):
+    """Clean the table once in ``mode``, with the pipeline's progress output silenced."""
+    arguments = (workbook, boundaries_json, paths.get("xlsx"), paths.get("csv"))
+    options = {"parquet_path": paths.get("parquet"), "feather_path": paths.get("feather"), "coerce": coerce}
+    with contextlib.redirect_stdout(io.StringIO()):
+        if mode == "whole":
+            process_table_with_pandas(*arguments, reader="fast", **options)
+        else:
+            clean_sheet_in_chunks(*arguments, chunk_size, **options)
+
+
+def _memory_kb(field: str) -> int:
+    """A memory field of /proc/self/status ('VmRSS', 'VmHWM'), in kB."""
+    with open("/proc/self/status") as f:
+        return next(int(line.split()[1]) for line in f if line.startswith(field + ":"))
+
+
+def _measured_run(mode: str, arguments: tuple, results):
+    """Child process: run ``mode`` once and send back its seconds and peak resident MB above the baseline."""
+    # Reset the resident high-water mark to the current size (Linux); ru_maxrss would include the parent's peak
+    with open("/proc/self/clear_refs", "w") as f:
+        f.write("5")
+    baseline_kb = _memory_kb("VmRSS")
+    started = time.perf_counter()
+    run_mode(mode, *arguments)
+    seconds = time.perf_counter() - started
+    results.put({"seconds": round(seconds, 4), "peak_mb": round((_memory_kb("VmHWM") - baseline_kb) / 1024, 2)})
+
+
+def measure_mode(mode: str, *arguments) -> dict:
+    """Seconds and peak resident MB of one run of ``mode`` in a fresh process."""
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=_measured_run, args=(mode, arguments, results))
+    process.start()
+    measured = results.get()
+    process.join()
+    return measured
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the time and memory of chunked and whole-table cleaning.")
+    parser.add_argument("--rows", type=int, default=100_000, help="Data rows of the generated table.")
+    parser.add_argument("--cols", type=int, default=12, help="Numeric columns of the generated table.")
+    parser.add_argument("--chunk-size", type=int, default=10_000, help="Rows per chunk in chunked mode.")
+    parser.add_argument("--formats", default="csv",
+                        help=f"Comma-separated output formats out of {', '.join(OUTPUT_FORMATS)} (default: %(default)s).")
+    parser.add_argument("--coerce-types", action="store_true", help="Coerce column types in both modes.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Write the results to this JSON file.")
+    args = parser.parse_args()
+    formats = [fmt.strip() for fmt in args.formats.split(",") if fmt.strip()]
+
+    with tempfile.TemporaryDirectory(prefix="chunked_bench_") as work_dir:
+        workbook = os.path.join(work_dir, "tall.xlsx")
+        truth = generate_workbook(workbook, rows=args.rows, cols=args.cols, sheets=1, seed=args.seed)
+        boundaries_json = os.path.join(work_dir, "boundaries.json")
+        with open(boundaries_json, "w") as f:
+            json.dump(next(iter(truth.values())), f)
+
+        modes, outputs = {}, {}
+        print(f"{'mode':<8} {'rows':>9} {'chunk':>7} {'seconds':>9} {'peak MB':>9}")
+        for mode in ("whole", "chunked"):
+            outputs[mode] = {fmt: os.path.join(work_dir, f"{mode}.{fmt}") for fmt in formats}
+            modes[mode] = measure_mode(mode, workbook, boundaries_json, outputs[mode], args.chunk_size,
+                                       args.coerce_types)
+            chunk = args.chunk_size if mode == "chunked" else "-"
+            print(f"{mode:<8} {args.rows:>9} {chunk:>7} {modes[mode]['seconds']:>9.3f} {modes[mode]['peak_mb']:>9.1f}")
+
+        identical = None
+        if "csv" in formats:
+            with open(outputs["whole"]["csv"], "rb") as whole, open(outputs["chunked"]["csv"], "rb") as chunked:
+                identical = whole.read() == chunked.read()
+            if not identical:
+                print("  !! the chunked CSV differs from the whole-table CSV")
+        print(f"Peak memory of chunked cleaning: {modes['chunked']['peak_mb'] / modes['whole']['peak_mb']:.0%} "
+              f"of whole-table cleaning.")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"rows": args.rows, "cols": args.cols, "chunk_size": args.chunk_size, "formats": formats,
+                       "coerce_types": args.coerce_types, "csv_identical": identical, "modes": modes}, f, indent=2)
+        print(f"Results written to '{args.json}'")
+
+
+if __name__ == "__main__":
+    main()
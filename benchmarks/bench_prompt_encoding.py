@@ -0,0 +1,87 @@
+"""
+Prompt size of the 'table' and 'compact' sheet encodings of the LLM boundary step.
+
+Generates report workbooks of growing width and sparsity (see
+``generate_workbook``), builds the prompt sheet text of every sheet with both
+encodings, and prints the token and character counts side by side, together
+with the time spent encoding. Tokens are counted as ``find_table_boundaries``
+counts them: with tiktoken when installed, otherwise estimated from the length.
+
+Usage:
+    python benchmarks/bench_prompt_encoding.py --token-budget 4000 --json prompt_sizes.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+from generate_workbook import generate_workbook
+from find_table_boundaries import _build_sheet_text, LLM_MODEL
+from prompt_encoding import PROMPT_ENCODINGS, DEFAULT_TOKEN_BUDGET, count_tokens, token_counter
+
+# (rows, numeric columns, header depth, footer rows) per scenario
+SCENARIOS = {
+    "narrow": (2000, 6, 2, 2),
+    "medium": (2000, 30, 2, 3),
+    "wide": (2000, 120, 3, 3),
+    "very_wide": (1000, 400, 3, 2),
+}
+
+
+def measure_encodings(grid: pd.DataFrame, token_budget: int) -> dict:
+    """Tokens, characters and encoding seconds of the grid's prompt text, per encoding."""
+    sizes = {}
+    for encoding in PROMPT_ENCODINGS:
+        with contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            text = _build_sheet_text(grid, prompt_encoding=encoding, token_budget=token_budget)
+            seconds = time.perf_counter() - started
+        sizes[encoding] = {"tokens": count_tokens(text, LLM_MODEL), "characters": len(text),
+                           "seconds": round(seconds, 4)}
+    return sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the prompt size of the sheet encodings.")
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--token-budget", type=int, default=DEFAULT_TOKEN_BUDGET,
+                        help="Token budget of the compact encoding (default: %(default)s, 0 for none).")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Write the results to this JSON file.")
+    args = parser.parse_args()
+
+    print(f"Tokens counted with {token_counter(LLM_MODEL)}; compact budget {args.token_budget or 'none'}.")
+    print(f"{'scenario':<10} {'cols':>5} {'table tok':>10} {'compact tok':>12} {'ratio':>7} "
+          f"{'table s':>8} {'compact s':>10}")
+    results = []
+    with tempfile.TemporaryDirectory(prefix="prompt_bench_") as work_dir:
+        for name in args.scenarios:
+            rows, cols, header_depth, footer_rows = SCENARIOS[name]
+            path = os.path.join(work_dir, f"{name}.xlsx")
+            generate_workbook(path, rows=rows, cols=cols, header_depth=header_depth, footer_rows=footer_rows,
+                              seed=args.seed)
+            grid = pd.read_excel(path, header=None, sheet_name=0, dtype=str)
+            sizes = measure_encodings(grid, args.token_budget)
+            table, compact = sizes["table"], sizes["compact"]
+            print(f"{name:<10} {grid.shape[1]:>5} {table['tokens']:>10} {compact['tokens']:>12} "
+                  f"{compact['tokens'] / table['tokens']:>6.2f}x {table['seconds']:>8.3f} {compact['seconds']:>10.3f}")
+            results.append({"name": name, "rows": len(grid), "columns": grid.shape[1], **sizes})
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"token_counter": token_counter(LLM_MODEL), "token_budget": args.token_budget,
+                       "scenarios": results}, f, indent=2)
+        print(f"Results written to '{args.json}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Throughput and peak memory of the sheet readers in ``xlsx_reader``.
+
+Generates report workbooks of growing size (see ``generate_workbook``) and reads
+their first sheet into the string grid the pipeline works on, with every reader
+of ``READERS``:
+
+    openpyxl  ``pd.read_excel(header=None, dtype=str)``, the default reader
+    fast      the streaming expat parser of ``xlsx_reader``
+
+Each read runs ``--repeat`` times for the best wall time, then once more under
+``tracemalloc`` for the peak of Python-allocated memory. The grids of all readers
+are compared, so a faster reader that returns a different grid is reported.
+
+Usage:
+    python benchmarks/bench_xlsx_reader.py --scenarios tall wide --repeat 3 --json readers.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+from generate_workbook import generate_workbook
+from xlsx_reader import READERS, read_grid
+
+# Generator parameters per named scenario
+SCENARIOS = {
+    "small": {"rows": 1000, "cols": 10, "header_depth": 2, "footer_rows": 2},
+    "tall": {"rows": 50_000, "cols": 12, "header_depth": 2, "footer_rows": 3},
+    "wide": {"rows": 2000, "cols": 300, "header_depth": 3, "footer_rows": 2},
+    "styled": {"rows": 10_000, "cols": 20, "header_depth": 2, "footer_rows": 2, "style_density": 0.8,
+               "formula_ratio": 0.2},
+}
+
+
+def measure_reader(path: str, reader: str, repeat: int) -> tuple:
+    """The grid read by ``reader``, and its best seconds, cells per second and peak MB."""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        grid = read_grid(path, 0, reader)
+        seconds = time.perf_counter() - started
+        best = seconds if best is None else min(best, seconds)
+    tracemalloc.start()
+    try:
+        read_grid(path, 0, reader)
+        peak_mb = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    finally:
+        tracemalloc.stop()
+    return grid, {"seconds": round(best, 4), "cells_per_second": round(grid.size / best) if best else None,
+                  "peak_mb": round(peak_mb, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the time and memory of the sheet readers.")
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS), default=["small", "tall", "wide"])
+    parser.add_argument("--readers", nargs="+", choices=READERS, default=list(READERS))
+    parser.add_argument("--repeat", type=int, default=3, help="Timed reads per reader; the best counts.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Write the results to this JSON file.")
+    args = parser.parse_args()
+
+    print(f"{'scenario':<9} {'reader':<9} {'cells':>9} {'seconds':>9} {'cells/s':>11} {'peak MB':>9} {'speedup':>8}")
+    results = []
+    with tempfile.TemporaryDirectory(prefix="reader_bench_") as work_dir:
+        for name in args.scenarios:
+            path = os.path.join(work_dir, f"{name}.xlsx")
+            generate_workbook(path, sheets=1, seed=args.seed, **SCENARIOS[name])
+            grids, readers = {}, {}
+            for reader in args.readers:
+                grids[reader], readers[reader] = measure_reader(path, reader, args.repeat)
+            baseline = readers[args.readers[0]]["seconds"]
+            for reader, stats in readers.items():
+                print(f"{name:<9} {reader:<9} {grids[reader].size:>9} {stats['seconds']:>9.3f} "
+                      f"{stats['cells_per_second']:>11,} {stats['peak_mb']:>9.1f} {baseline / stats['seconds']:>7.2f}x")
+            reference = grids[args.readers[0]]
+            identical = all(grid.equals(reference) for grid in grids.values())
+            if not identical:
+                print(f"  !! {name}: the readers returned different grids")
+            results.append({"name": name, "params": SCENARIOS[name], "workbook_bytes": os.path.getsize(path),
+                            "identical": identical, "readers": readers})
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"scenarios": results}, f, indent=2)
+        print(f"Results written to '{args.json}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Startup-time regression check: the import budget of ``main.py``.
+
+Runs ``main.py`` in a fresh interpreter under ``python -X importtime`` for two
+cases and checks what it imported:
+
+    help    ``main.py --help``; may import only the standard library and the
+            lightweight option modules (``stage_registry`` and friends).
+    clean   a cleaning-only run of a small generated workbook
+            (``--refresh-engine none --boundary-engine heuristic``); may import
+            pandas and openpyxl, but no LLM client, dotenv, Excel automation,
+            formula engine or async backend.
+
+A case fails when it imports a forbidden module, or when the total import time
+exceeds its budget in seconds (``--help-budget``, ``--clean-budget``). The
+forbidden modules are the regression this guards against and do not depend on
+the machine; raise the time budgets on slow machines. Exits with status 1 when
+any case fails, so it can run in CI.
+
+Usage:
+    python benchmarks/check_import_budget.py
+    python benchmarks/check_import_budget.py --clean-budget 3 --json import_budget.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+from generate_workbook import generate_workbook
+
+MAIN_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "main.py")
+HEAVY_MODULES = ("pandas", "numpy", "openpyxl", "pyarrow", "openai", "dotenv", "xlwings")
+# Modules each case must not import, by top-level module name
+FORBIDDEN = {
+    "help": HEAVY_MODULES + ("pipeline", "formula_engine", "async_boundaries"),
+    "clean": ("openai", "dotenv", "xlwings", "formula_engine", "async_boundaries"),
+}
+DEFAULT_BUDGETS = {"help": 0.25, "clean": 1.5}
+
+
+def parse_importtime(stderr: str) -> tuple:
+    """Total import seconds (the cumulative time of the top-level imports) and the set of imported modules."""
+    total_us, modules = 0, set()
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Nested imports are indented under the module that imported them
+        if len(name) - len(name.lstrip()) == 1:
+            total_us += int(cumulative)
+        modules.add(name.strip())
+    return total_us / 1e6, modules
+
+
+def measure(argv: list) -> dict:
+    """Run ``main.py`` with ``argv`` under ``-X importtime``; its exit status, wall time, import time and modules."""
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", MAIN_SCRIPT, *argv], capture_output=True, text=True)
+    wall_seconds = time.perf_counter() - started
+    import_seconds, modules = parse_importtime(result.stderr)
+    return {"returncode": result.returncode, "wall_seconds": round(wall_seconds, 4),
+            "import_seconds": round(import_seconds, 4), "modules": modules}
+
+
+def check(name: str, measured: dict, budget: float) -> list:
+    """The budget violations of one case, as messages."""
+    problems = []
+    if measured["returncode"] != 0:
+        problems.append(f"main.py exited with status {measured['returncode']}")
+    imported = sorted(module for module in FORBIDDEN[name]
+                      if any(found == module or found.startswith(module + ".") for found in measured["modules"]))
+    if imported:
+        problems.append(f"imported {', '.join(imported)}")
+    if measured["import_seconds"] > budget:
+        problems.append(f"imports took {measured['import_seconds']:.3f}s, budget {budget:.3f}s")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the import time and imported modules of main.py startup.")
+    parser.add_argument("--help-budget", type=float, default=DEFAULT_BUDGETS["help"],
+                        help="Import seconds allowed for 'main.py --help' (default: %(default)s).")
+    parser.add_argument("--clean-budget", type=float, default=DEFAULT_BUDGETS["clean"],
+                        help="Import seconds allowed for a cleaning-only run (default: %(default)s).")
+    parser.add_argument("--json", help="Write the results to this JSON file.")
+    args = parser.parse_args()
+    budgets = {"help": args.help_budget, "clean": args.clean_budget}
+
+    with tempfile.TemporaryDirectory(prefix="import_budget_") as work_dir:
+        workbook = os.path.join(work_dir, "small.xlsx")
+        generate_workbook(workbook, rows=50, cols=5, sheets=1)
+        cases = {
+            "help": ["--help"],
+            "clean": [workbook, os.path.join(work_dir, "out"), "--refresh-engine", "none",
+                      "--boundary-engine", "heuristic", "--no-boundary-cache", "--no-manifest"],
+        }
+        results, failed = [], False
+        print(f"{'case':<6} {'wall s':>8} {'import s':>9} {'budget s':>9} {'modules':>8}  result")
+        for name, argv in cases.items():
+            measured = measure(argv)
+            problems = check(name, measured, budgets[name])
+            failed = failed or bool(problems)
+            print(f"{name:<6} {measured['wall_seconds']:>8.3f} {measured['import_seconds']:>9.3f} "
+                  f"{budgets[name]:>9.3f} {len(measured['modules']):>8}  {'; '.join(problems) or 'ok'}")
+            heavy = sorted(module for module in HEAVY_MODULES if module in measured["modules"])
+            results.append({"case": name, "argv": argv, "budget_seconds": budgets[name],
+                            "wall_seconds": measured["wall_seconds"], "import_seconds": measured["import_seconds"],
+                            "modules_imported": len(measured["modules"]), "heavy_modules": heavy,
+                            "problems": problems})
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"cases": results}, f, indent=2)
+        print(f"Results written to '{args.json}'")
+    if failed:
+        print("❌ Import budget exceeded.")
+        sys.exit(1)
+    print("✅ Startup imports within budget.")
+
+
+if __name__ == "__main__":
+    main()
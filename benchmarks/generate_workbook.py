@@ -0,0 +1,162 @@
+"""
+Synthetic .xlsx workbooks shaped like the statistical reports the pipeline cleans.
+
+Every sheet has a title row, a blank row, a multi-row header (group titles
+spanning several columns above the leaf headers), a data body with a text label
+column and numeric columns, and footer rows (a TOTAL row and source notes). The
+true table boundaries of every sheet are returned, so benchmarks can check
+results and clean with known boundaries.
+
+Usage:
+    python benchmarks/generate_workbook.py out.xlsx --rows 5000 --cols 20 --sheets 3 \\
+        --header-depth 2 --merged --style-density 0.2 --formula-ratio 0.1 --footer-rows 3
+"""
+
+import argparse
+import json
+
+import numpy as np
+from openpyxl import Workbook
+from openpyxl.styles import Alignment, Font, PatternFill
+from openpyxl.utils import get_column_letter
+
+TITLE_ROWS = 2  # title and a blank spacer row above the header
+HEADER_FILL = PatternFill("solid", fgColor="DDEBF7")
+BODY_FILL = PatternFill("solid", fgColor="FFF2CC")
+BODY_FORMATS = ("#,##0", "0.00", "0.0%", "#,##0.00")
+
+
+def generate_workbook(path: str, rows: int = 1000, cols: int = 10, sheets: int = 1, header_depth: int = 2,
+                      merged: bool = True, style_density: float = 0.0, formula_ratio: float = 0.0,
+                      footer_rows: int = 2, seed: int = 0) -> dict:
+    """
+    Write a synthetic workbook to ``path``.
+
+    Parameters
+    ----------
+    rows, cols : int
+        Data rows and numeric columns per sheet (a label column comes on top).
+    sheets : int
+        Number of worksheets.
+    header_depth : int
+        Header rows; every row above the last holds group titles over 4**k columns.
+    merged : bool
+        Merge the title across the table and every group title across its columns.
+    style_density : float
+        Share of body cells with a font, fill and number format (header cells are
+        always styled when this is above 0).
+    formula_ratio : float
+        Share of numeric body cells written as formulas referencing their left
+        neighbour. openpyxl stores no cached values, so these read as empty until
+        the refresh stage recalculates them.
+    footer_rows : int
+        Rows below the data: a TOTAL row first, then source and note lines.
+    seed : int
+        Seed of the random values.
+
+    Returns
+    -------
+    dict
+        The true boundaries per sheet title: 'header_start_index' and
+        'data_end_index' as row positions of ``pd.read_excel(header=None)``.
+    """
+    rng = np.random.default_rng(seed)
+    workbook = Workbook()
+    workbook.remove(workbook.active)
+    truth = {}
+    width = cols + 1
+    for sheet_idx in range(sheets):
+        title = f"Report {sheet_idx + 1}"
+        ws = workbook.create_sheet(title)
+        ws.cell(row=1, column=1, value=f"Table {sheet_idx + 1}. Synthetic indicators by region, {2000 + sheet_idx}")
+        if merged and width > 1:
+            ws.merge_cells(start_row=1, start_column=1, end_row=1, end_column=width)
+
+        header_top = TITLE_ROWS + 1
+        _write_header(ws, header_top, header_depth, cols, merged, style_density > 0)
+
+        body_top = header_top + header_depth
+        values = rng.integers(0, 100_000, size=(rows, cols))
+        styled = rng.random((rows, cols)) < style_density
+        formulas = rng.random((rows, cols)) < formula_ratio
+        formulas[:, 0] = False  # the first numeric column has no left neighbour to reference
+        fonts = Font(italic=True)
+        for r in range(rows):
+            excel_row = body_top + r
+            ws.cell(row=excel_row, column=1, value=f"Region {r + 1:05d}")
+            for c in range(cols):
+                excel_col = c + 2
+                if formulas[r, c]:
+                    value = f"={get_column_letter(excel_col - 1)}{excel_row}+1"
+                else:
+                    value = int(values[r, c])
+                cell = ws.cell(row=excel_row, column=excel_col, value=value)
+                if styled[r, c]:
+                    cell.font = fonts
+                    cell.fill = BODY_FILL
+                    cell.number_format = BODY_FORMATS[(r + c) % len(BODY_FORMATS)]
+
+        footer_top = body_top + rows
+        for f in range(footer_rows):
+            if f == 0:
+                ws.cell(row=footer_top, column=1, value="TOTAL")
+                for c in range(cols):
+                    letter = get_column_letter(c + 2)
+                    ws.cell(row=footer_top, column=c + 2, value=f"=SUM({letter}{body_top}:{letter}{footer_top - 1})")
+            else:
+                ws.cell(row=footer_top + f, column=1, value=f"/{f} Source: Synthetic Statistics Office, note {f}.")
+
+        # Zero-based row positions as pandas reads the sheet (row 1 is position 0)
+        truth[title] = {"header_start_index": header_top - 1, "data_end_index": footer_top - 2}
+    workbook.save(path)
+    return truth
+
+
+def _write_header(ws, top: int, depth: int, cols: int, merged: bool, styled: bool):
+    """Group-title rows over the leaf header row; the label column header sits in the top row."""
+    ws.cell(row=top, column=1, value="Region")
+    for level in range(depth):
+        row = top + level
+        span = 4 ** (depth - level - 1)
+        for start in range(0, cols, span):
+            end = min(start + span, cols) - 1
+            if span == 1:
+                label = f"Indicator {start + 1}"
+            else:
+                label = f"Group {level + 1}.{start // span + 1}"
+            cell = ws.cell(row=row, column=start + 2, value=label)
+            if styled:
+                cell.font = Font(bold=True)
+                cell.fill = HEADER_FILL
+                cell.alignment = Alignment(horizontal="center")
+            if merged and end > start:
+                ws.merge_cells(start_row=row, start_column=start + 2, end_row=row, end_column=end + 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic report workbook for benchmarks.")
+    parser.add_argument("output", help="Path of the .xlsx file to write.")
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--cols", type=int, default=10)
+    parser.add_argument("--sheets", type=int, default=1)
+    parser.add_argument("--header-depth", type=int, default=2)
+    parser.add_argument("--merged", action="store_true", help="Merge the title and group header cells.")
+    parser.add_argument("--style-density", type=float, default=0.0)
+    parser.add_argument("--formula-ratio", type=float, default=0.0)
+    parser.add_argument("--footer-rows", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--truth", help="Also write the true boundaries per sheet to this JSON file.")
+    args = parser.parse_args()
+
+    truth = generate_workbook(args.output, rows=args.rows, cols=args.cols, sheets=args.sheets,
+                              header_depth=args.header_depth, merged=args.merged, style_density=args.style_density,
+                              formula_ratio=args.formula_ratio, footer_rows=args.footer_rows, seed=args.seed)
+    print(f"Wrote {args.sheets} sheet(s) of {args.rows} x {args.cols + 1} to '{args.output}'")
+    if args.truth:
+        with open(args.truth, "w") as f:
+            json.dump(truth, f, indent=2)
+        print(f"True boundaries written to '{args.truth}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Local mock of the OpenAI chat completions endpoint for offline benchmarks.
+
+Answers ``POST /v1/chat/completions`` with a boundaries JSON object after a
+configurable latency, and fails a configurable share of requests with 429 (with
+a ``Retry-After`` header) or 500 responses. The answer depends only on the
+request text, so every code path that sends the same sheet gets the same result.
+
+Usage:
+    python benchmarks/mock_openai_server.py --port 8765 --latency 0.5 --failure-rate 0.2
+
+Then point the OpenAI client at it:
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=mock python main.py ...
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# A listed row: '12  ...' (table encoding), '12: ...' or '12-14: ...' (compact encoding)
+ROW_LINE_PATTERN = re.compile(r"^\s*(\d+)(?:-(\d+))?:?(?:\s|$)")
+
+
+def mock_boundaries(sheet_text: str) -> dict:
+    """Deterministic boundaries for a sheet text: a stable header row and the last listed row."""
+    matches = [ROW_LINE_PATTERN.match(line) for line in sheet_text.splitlines()]
+    row_numbers = [int(match.group(2) or match.group(1)) for match in matches if match]
+    digest = int(hashlib.sha256(sheet_text.encode("utf-8")).hexdigest(), 16)
+    data_end = row_numbers[-1] if row_numbers else 0
+    return {"header_start_index": digest % 3, "data_end_index": data_end}
+
+
+class MockState:
+    """Settings and counters shared by all request handler threads."""
+
+    def __init__(self, latency: float = 0.2, jitter: float = 0.0, failure_rate: float = 0.0,
+                 retry_after: float = 0.1, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counts = {"requests": 0, "ok": 0, "429": 0, "500": 0}
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    state = None
+
+    def do_POST(self):
+        state = self.state
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        with state.lock:
+            state.counts["requests"] += 1
+            state.in_flight += 1
+            state.max_in_flight = max(state.max_in_flight, state.in_flight)
+            roll = state.random.random()
+            delay = state.latency + state.random.uniform(0, state.jitter)
+        try:
+            time.sleep(delay)
+            if roll < state.failure_rate / 2:
+                self._send(429, {"error": {"message": "Rate limit reached", "type": "rate_limit_error"}},
+                           {"Retry-After": f"{state.retry_after:g}"})
+                outcome = "429"
+            elif roll < state.failure_rate:
+                self._send(500, {"error": {"message": "Internal server error", "type": "server_error"}})
+                outcome = "500"
+            else:
+                messages = body.get("messages", [])
+                sheet_text = messages[-1]["content"] if messages else ""
+                self._send(200, {
+                    "id": "chatcmpl-mock",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body.get("model", "mock"),
+                    "choices": [{
+                        "index": 0,
+                        "finish_reason": "stop",
+                        "message": {"role": "assistant", "content": json.dumps(mock_boundaries(sheet_text))},
+                    }],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+                })
+                outcome = "ok"
+        finally:
+            with state.lock:
+                state.in_flight -= 1
+        with state.lock:
+            state.counts[outcome] += 1
+
+    def _send(self, status: int, payload: dict, headers: dict = None):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(port: int = 0, **settings):
+    """
+    Start the mock server in a background thread.
+
+    Returns
+    -------
+    tuple
+        ``(server, state, base_url)``; call ``server.shutdown()`` to stop it.
+    """
+    state = MockState(**settings)
+    handler = type("BoundMockHandler", (MockHandler,), {"state": state})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    return server, state, base_url
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local mock of the OpenAI chat completions endpoint.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds before every response (default: 0.2).")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random latency of up to this many seconds.")
+    parser.add_argument("--failure-rate", type=float, default=0.0,
+                        help="Share of requests answered with 429 or 500, half each (default: 0).")
+    parser.add_argument("--retry-after", type=float, default=0.1, help="Retry-After seconds sent with 429 responses.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server, state, base_url = start_server(
+        args.port, latency=args.latency, jitter=args.jitter, failure_rate=args.failure_rate,
+        retry_after=args.retry_after, seed=args.seed,
+    )
+    print(f"Mock OpenAI server listening on {base_url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+        print(f"Requests: {state.counts}")
@@ -0,0 +1,257 @@
+"""
+Per-stage benchmark suite for the cleaning pipeline.
+
+For every scenario a synthetic workbook is generated (see ``generate_workbook``)
+and the pipeline stages are measured separately:
+
+    split       separate the workbook into per-sheet files
+    parse       read every split sheet into a grid with ``--reader`` (``read_excel(header=None, dtype=str)``
+                or the fast reader of ``xlsx_reader``)
+    boundaries  find table boundaries with a stubbed LLM (the local mock server, no
+                latency) or with the heuristic engine
+    clean       slice, name headers and filter rows with the true boundaries
+    write_*     write the cleaned tables in each output format
+
+Each stage runs once for wall time and once more under ``tracemalloc`` for the
+peak of Python-allocated memory, so the tracing overhead does not distort the
+timings. Results are saved as JSON; ``--compare`` reads an earlier result file
+and flags stages that got slower by more than ``--threshold``.
+
+Usage:
+    python benchmarks/run_benchmarks.py --scenarios small wide --json results.json
+    python benchmarks/run_benchmarks.py --json new.json --compare results.json
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+from generate_workbook import generate_workbook
+from mock_openai_server import start_server
+from sheets_to_excel import separate_sheets_with_openpyxl, separate_sheets_with_zip, SPLIT_ENGINES, SPLIT_MODES
+from find_table_boundaries import find_table_boundaries, BOUNDARY_ENGINES
+from process_with_pandas import process_table_with_pandas
+from xlsx_reader import READERS, DEFAULT_READER, read_grid
+
+# Timing differences below this many seconds are noise, never regressions.
+MIN_REGRESSION_SECONDS = 0.05
+# Generator parameters per named scenario
+SCENARIOS = {
+    "small": {"rows": 500, "cols": 10, "sheets": 3, "header_depth": 2, "merged": True, "style_density": 0.1,
+              "formula_ratio": 0.05, "footer_rows": 2},
+    "tall": {"rows": 20_000, "cols": 12, "sheets": 2, "header_depth": 2, "merged": True, "style_density": 0.05,
+             "formula_ratio": 0.0, "footer_rows": 3},
+    "wide": {"rows": 2000, "cols": 200, "sheets": 1, "header_depth": 3, "merged": True, "style_density": 0.0,
+             "formula_ratio": 0.0, "footer_rows": 2},
+    "styled": {"rows": 5000, "cols": 20, "sheets": 2, "header_depth": 2, "merged": True, "style_density": 0.8,
+               "formula_ratio": 0.2, "footer_rows": 2},
+}
+
+
+def measure(func, memory: bool = True):
+    """
+    Run ``func`` for its wall time, then again under tracemalloc for its peak memory.
+
+    Returns
+    -------
+    tuple
+        ``(result, {'seconds': ..., 'peak_mb': ...})``; 'peak_mb' is None without ``memory``.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        result = func()
+        seconds = time.perf_counter() - started
+        peak_mb = None
+        if memory:
+            tracemalloc.start()
+            try:
+                func()
+                peak_mb = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+            finally:
+                tracemalloc.stop()
+    return result, {"seconds": round(seconds, 4), "peak_mb": None if peak_mb is None else round(peak_mb, 2)}
+
+
+def run_scenario(name: str, params: dict, work_dir: str, args) -> dict:
+    """Generate the scenario's workbook and measure every stage on it."""
+    scenario_dir = os.path.join(work_dir, name)
+    split_dir = os.path.join(scenario_dir, "split")
+    out_dir = os.path.join(scenario_dir, "cleaned")
+    os.makedirs(split_dir, exist_ok=True)
+    os.makedirs(out_dir, exist_ok=True)
+    workbook = os.path.join(scenario_dir, f"{name}.xlsx")
+    truth = generate_workbook(workbook, seed=args.seed, **params)
+    stages = {}
+
+    def split():
+        if args.split_engine == "zip":
+            separate_sheets_with_zip(workbook, split_dir)
+        else:
+            separate_sheets_with_openpyxl(workbook, split_dir, mode=args.split_mode)
+        return sorted(os.path.join(split_dir, f) for f in os.listdir(split_dir) if f.endswith(".xlsx"))
+
+    sheet_files, stages["split"] = measure(split, args.memory)
+    grids, stages["parse"] = measure(
+        lambda: [read_grid(path, 0, args.reader) for path in sheet_files], args.memory)
+    found, stages["boundaries"] = measure(
+        lambda: [find_table_boundaries(None, None, df=grid, engine=args.boundary_engine) for grid in grids],
+        args.memory)
+
+    # Clean with the generator's true boundaries so every run slices the same table
+    sheet_truth = list(truth.values())
+    cleaned, stages["clean"] = measure(
+        lambda: [process_table_with_pandas(None, None, None, None, df=grid, boundaries=bounds)
+                 for grid, bounds in zip(grids, sheet_truth)], args.memory)
+
+    for fmt in args.formats:
+        paths = [os.path.join(out_dir, f"sheet{idx}_cleaned.{fmt}") for idx in range(len(cleaned))]
+        writer = {
+            "xlsx": lambda df, path: df.to_excel(path, index=False),
+            "csv": lambda df, path: df.to_csv(path, index=False),
+            "parquet": lambda df, path: df.to_parquet(path, index=False),
+            "feather": lambda df, path: df.to_feather(path, compression="uncompressed"),
+        }[fmt]
+        _, stages[f"write_{fmt}"] = measure(
+            lambda: [writer(df, path) for df, path in zip(cleaned, paths)], args.memory)
+
+    # The stubbed model answers arbitrary rows, so accuracy only means something offline
+    boundaries_correct = None
+    if args.boundary_engine == "heuristic":
+        correct = sum(
+            result["header_start_index"] == expected["header_start_index"]
+            and result["data_end_index"] == expected["data_end_index"]
+            for result, expected in zip(found, sheet_truth)
+        )
+        boundaries_correct = f"{correct}/{len(found)}"
+    return {
+        "name": name,
+        "params": params,
+        "workbook_bytes": os.path.getsize(workbook),
+        "cells": sum(grid.size for grid in grids),
+        "boundaries_correct": boundaries_correct,
+        "stages": stages,
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """
+    Print stage timings next to a baseline run and return the stages slower by more than ``threshold``.
+
+    Stages that differ by less than ``MIN_REGRESSION_SECONDS`` are never flagged.
+    """
+    regressions = []
+    previous = {scenario["name"]: scenario["stages"] for scenario in baseline["scenarios"]}
+    print(f"\n=== Compared with {baseline.get('commit') or 'baseline'} ===")
+    print(f"{'scenario':<10} {'stage':<14} {'before s':>10} {'after s':>10} {'ratio':>7}")
+    for scenario in results["scenarios"]:
+        before_stages = previous.get(scenario["name"])
+        if before_stages is None:
+            continue
+        for stage, after in scenario["stages"].items():
+            before = before_stages.get(stage)
+            if not before or not before["seconds"]:
+                continue
+            ratio = after["seconds"] / before["seconds"]
+            flag = ""
+            if ratio > 1 + threshold and after["seconds"] - before["seconds"] >= MIN_REGRESSION_SECONDS:
+                flag = "  <- slower"
+                regressions.append(f"{scenario['name']}/{stage}")
+            print(f"{scenario['name']:<10} {stage:<14} {before['seconds']:>10.3f} {after['seconds']:>10.3f} "
+                  f"{ratio:>6.2f}x{flag}")
+    return regressions
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure time and memory of every pipeline stage.")
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS), default=["small"],
+                        help="Named scenarios to run (default: small).")
+    parser.add_argument("--rows", type=int, help="Override the data rows of every scenario.")
+    parser.add_argument("--cols", type=int, help="Override the numeric columns of every scenario.")
+    parser.add_argument("--sheets", type=int, help="Override the sheet count of every scenario.")
+    parser.add_argument("--split-engine", choices=SPLIT_ENGINES, default="openpyxl")
+    parser.add_argument("--split-mode", choices=SPLIT_MODES, default="full")
+    parser.add_argument("--reader", choices=READERS, default=DEFAULT_READER)
+    parser.add_argument("--boundary-engine", choices=BOUNDARY_ENGINES, default="llm",
+                        help="'llm' and 'hybrid' use the local mock server as a stubbed model (default: %(default)s).")
+    parser.add_argument("--formats", default="xlsx,csv", help="Output formats to time (default: %(default)s).")
+    parser.add_argument("--no-memory", dest="memory", action="store_false",
+                        help="Skip the tracemalloc pass; only wall times are measured.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Write the results to this JSON file.")
+    parser.add_argument("--compare", help="Earlier results JSON to compare the timings with.")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="With --compare, flag stages more than this share slower (default: %(default)s).")
+    args = parser.parse_args()
+    args.formats = [fmt.strip() for fmt in args.formats.split(",") if fmt.strip()]
+    if any(fmt in ("parquet", "feather") for fmt in args.formats) and importlib.util.find_spec("pyarrow") is None:
+        parser.error("parquet and feather need pyarrow")
+
+    server = None
+    if args.boundary_engine != "heuristic":
+        server, _, base_url = start_server(latency=0.0)
+        os.environ["OPENAI_BASE_URL"] = base_url
+        os.environ["OPENAI_API_KEY"] = "mock"
+        # The SDK is imported on first use; load it now so its import time is not counted as boundary time
+        import openai  # noqa: F401
+
+    results = {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "settings": {key: value for key, value in vars(args).items() if key not in ("json", "compare")},
+        "scenarios": [],
+    }
+    try:
+        with tempfile.TemporaryDirectory(prefix="excel_bench_") as work_dir:
+            for name in args.scenarios:
+                params = dict(SCENARIOS[name])
+                for key in ("rows", "cols", "sheets"):
+                    if getattr(args, key) is not None:
+                        params[key] = getattr(args, key)
+                print(f"Running scenario '{name}' {params} ...")
+                scenario = run_scenario(name, params, work_dir, args)
+                results["scenarios"].append(scenario)
+                for stage, numbers in scenario["stages"].items():
+                    peak = "" if numbers["peak_mb"] is None else f", peak {numbers['peak_mb']:.1f} MB"
+                    print(f"  {stage:<14} {numbers['seconds']:>8.3f}s{peak}")
+                if scenario["boundaries_correct"] is not None:
+                    print(f"  boundaries correct: {scenario['boundaries_correct']}")
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to '{args.json}'")
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} stage(s) slower than the threshold: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+"""
+Long-lived pipeline daemon: warm imports, warm workers, jobs over local HTTP.
+
+A ``main.py`` run spends a large part of a small workbook's runtime importing
+pandas, openpyxl, openai, dotenv and xlwings, and starting worker processes.
+The daemon pays that once: it imports every stage module, starts its pool of
+worker processes (each importing the pipeline when it starts) and builds the
+OpenAI client, then serves jobs until it is stopped. The client's HTTP
+connections stay open between jobs, so only the first LLM request of the
+daemon's lifetime opens a connection.
+
+Jobs are ``main.py`` command lines, submitted by the thin client
+``daemon_client.py``, which imports nothing but the standard library:
+
+    python daemon.py --workers 4
+    python daemon_client.py data/MyWorkbook.xlsx results/ --refresh-engine python
+
+The daemon listens on 127.0.0.1 only. Endpoints:
+
+    POST /jobs      ``{"argv": [...], "cwd": "..."}``: parse ``argv`` with the
+                    ``main.py`` parser, resolve relative paths against ``cwd``, run
+                    the pipeline and answer with the exit status, the per-sheet
+                    summary and everything the run printed.
+    GET  /status    pid, start time, worker count and number of jobs run.
+    POST /shutdown  stop the daemon after the running job.
+
+Jobs run one at a time, in arrival order; a job's sheets run in parallel on the
+shared worker pool, whose size caps every job's ``--workers`` (the default of
+``--workers`` is the pool size). Environment variables such as OPENAI_API_KEY are
+the daemon's, not the client's. Output printed inside worker processes goes to
+the daemon's console only.
+"""
+
+import os
+import sys
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import threading
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from main import build_parser, resolve_options, run_pipeline
+from pipeline import set_worker_pool
+
+DAEMON_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# Options holding paths, resolved against the client's working directory
+PATH_OPTIONS = ("input_excel_file", "output_directory", "row_filters", "events_jsonl", "boundary_cache_dir")
+
+
+def _warm_up():
+    """
+    Import the stage modules and build the LLM client before the first job arrives.
+
+    Runs in the daemon and, as the pool initializer, in every worker. Backends the
+    command line loads lazily (see ``stage_registry``) are imported here on purpose.
+    """
+    import pipeline  # noqa: F401
+    import async_boundaries  # noqa: F401
+    _warm_llm_client()
+
+
+def _warm_llm_client():
+    """Build the OpenAI module client now, so its connection pool is reused by every job of this process."""
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    if os.getenv("OPENAI_API_KEY"):
+        import openai
+        openai.api_key = os.getenv("OPENAI_API_KEY")
+        openai.chat.completions  # noqa: B018 - creates the client
+
+
+def _worker_pid(_=None) -> int:
+    return os.getpid()
+
+
+class _Tee(io.TextIOBase):
+    """Text stream writing to the daemon's console and to a job's log buffer."""
+
+    def __init__(self, console, log: io.StringIO):
+        self.console = console
+        self.log = log
+
+    def write(self, text: str) -> int:
+        self.console.write(text)
+        return self.log.write(text)
+
+    def flush(self):
+        self.console.flush()
+
+
+class PipelineDaemon(ThreadingHTTPServer):
+    """HTTP server holding the warm worker pool and running the submitted jobs one at a time."""
+
+    daemon_threads = True
+
+    def __init__(self, port: int, workers: int):
+        self.workers = workers
+        self.started_at = datetime.datetime.now().isoformat(timespec="seconds")
+        self.started = time.perf_counter()
+        self.jobs_run = 0
+        self.busy = False
+        self.job_lock = threading.Lock()
+        self.pool = None
+        # Workers are forked before the socket exists and before any server thread runs
+        self._start_pool()
+        try:
+            super().__init__((DAEMON_HOST, port), JobHandler)
+        except OSError:
+            self._stop_pool()
+            raise
+        _warm_up()
+
+    def _start_pool(self):
+        if self.workers <= 1:
+            return
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_up)
+        # Start every worker now instead of at the first job
+        list(self.pool.map(_worker_pid, range(self.workers)))
+        set_worker_pool(self.pool)
+
+    def _check_pool(self):
+        """Replace the pool when a crashed worker has broken it, so one bad job does not fail the next ones."""
+        if self.pool is None:
+            return
+        try:
+            self.pool.submit(_worker_pid).result()
+        except BrokenProcessPool:
+            print("⚠️  The worker pool was broken by a crashed worker; starting a new one.")
+            self._stop_pool(wait=False)
+            self._start_pool()
+
+    def _stop_pool(self, wait: bool = True):
+        if self.pool is not None:
+            set_worker_pool(None)
+            self.pool.shutdown(wait=wait)
+            self.pool = None
+
+    def status(self) -> dict:
+        return {"pid": os.getpid(), "started_at": self.started_at,
+                "uptime_seconds": round(time.perf_counter() - self.started, 1), "workers": self.workers,
+                "jobs_run": self.jobs_run, "busy": self.busy}
+
+    def run_job(self, argv: list, cwd: str) -> dict:
+        """
+        Run one ``main.py`` command line and collect its result.
+
+        Returns
+        -------
+        dict
+            'exit_status' (what ``main.py`` would have exited with), 'summary' (the
+            per-sheet summary entries), 'log' (the job's printed output) and 'seconds'.
+        """
+        log = io.StringIO()
+        summary, exit_status = [], 0
+        with self.job_lock:
+            self.busy = True
+            started = time.perf_counter()
+            self._check_pool()
+            with contextlib.redirect_stdout(_Tee(sys.stdout, log)), contextlib.redirect_stderr(_Tee(sys.stderr, log)):
+                try:
+                    parser = build_parser()
+                    parser.prog = "main.py"
+                    parser.set_defaults(workers=self.workers)
+                    args = parser.parse_args(argv)
+                    for name in PATH_OPTIONS:
+                        if getattr(args, name):
+                            setattr(args, name, os.path.join(cwd, getattr(args, name)))
+                    options = resolve_options(args)
+                    summary = run_pipeline(args.input_excel_file, args.output_directory, options)
+                    exit_status = 2 if any(entry["status"] != "Success" for entry in summary) else 0
+                except SystemExit as e:
+                    # Invalid options and failed runs exit like main.py does; that ends this job only
+                    exit_status = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+                except Exception as e:
+                    print(f"❌ Job failed: {e}")
+                    traceback.print_exc()
+                    exit_status = 1
+            seconds = time.perf_counter() - started
+            self.jobs_run += 1
+            self.busy = False
+            print(f"📨 Job {self.jobs_run} finished with exit status {exit_status} in {seconds:.2f}s.")
+        return {"exit_status": exit_status, "summary": summary, "log": log.getvalue(), "seconds": round(seconds, 4)}
+
+    def server_close(self):
+        super().server_close()
+        self._stop_pool()
+
+
+class JobHandler(BaseHTTPRequestHandler):
+    """Routes the daemon's endpoints; bodies and answers are JSON."""
+
+    def do_GET(self):
+        if self.path == "/status":
+            self._answer(200, self.server.status())
+        else:
+            self._answer(404, {"error": f"unknown endpoint '{self.path}'"})
+
+    def do_POST(self):
+        if self.path == "/shutdown":
+            self._answer(200, {"stopping": True})
+            threading.Thread(target=self.server.shutdown).start()
+            return
+        if self.path != "/jobs":
+            self._answer(404, {"error": f"unknown endpoint '{self.path}'"})
+            return
+        try:
+            job = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            argv, cwd = job["argv"], job["cwd"]
+            if not isinstance(argv, list) or not all(isinstance(arg, str) for arg in argv):
+                raise ValueError("'argv' must be a list of strings")
+        except (ValueError, KeyError, TypeError) as e:
+            self._answer(400, {"error": f"invalid job: {e}"})
+            return
+        self._answer(200, self.server.run_job(argv, cwd))
+
+    def _answer(self, code: int, body: dict):
+        data = json.dumps(body, default=str).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass  # run_job prints one line per job
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Keep the pipeline's modules, worker processes and LLM client warm and run jobs "
+                    "submitted with daemon_client.py."
+    )
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT,
+                        help=f"Port on {DAEMON_HOST} to listen on (default: %(default)s).")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Warm worker processes shared by all jobs; 1 runs every sheet in the daemon process "
+                             "(default: one per CPU).")
+    args = parser.parse_args()
+
+    try:
+        server = PipelineDaemon(args.port, args.workers)
+    except OSError as e:
+        print(f"❌ Could not listen on {DAEMON_HOST}:{args.port}: {e}")
+        sys.exit(1)
+    print(f"🚀 Pipeline daemon listening on http://{DAEMON_HOST}:{args.port} with {args.workers} warm worker(s). "
+          f"Submit jobs with daemon_client.py; stop with Ctrl+C or 'daemon_client.py --daemon-shutdown'.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print("👋 Pipeline daemon stopped.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Thin client of the pipeline daemon (``daemon.py``).
+
+Takes the same arguments as ``main.py``, sends them to the running daemon with
+the current working directory, prints what the run printed and exits with the
+status ``main.py`` would have exited with. It imports only the standard library,
+so it starts in a few milliseconds; all pipeline work happens in the daemon.
+
+Usage:
+    python daemon_client.py data/MyWorkbook.xlsx results/ --refresh-engine python
+    python daemon_client.py --daemon-status
+    python daemon_client.py --daemon-shutdown
+"""
+
+import os
+import sys
+import argparse
+import json
+import urllib.error
+import urllib.request
+
+DEFAULT_DAEMON_URL = "http://127.0.0.1:8765"
+
+
+def _request(url: str, path: str, body: dict = None) -> dict:
+    data = None if body is None else json.dumps(body).encode("utf-8")
+    request = urllib.request.Request(url.rstrip("/") + path, data=data,
+                                     headers={"Content-Type": "application/json"} if data else {})
+    # Jobs take as long as their workbooks do, so there is no read timeout
+    with urllib.request.urlopen(request) as response:
+        return json.load(response)
+
+
+def submit_job(argv: list, url: str = DEFAULT_DAEMON_URL, cwd: str = None) -> dict:
+    """
+    Run the ``main.py`` command line ``argv`` on the daemon at ``url``.
+
+    Returns
+    -------
+    dict
+        The daemon's answer: 'exit_status', 'summary', 'log' and 'seconds'.
+    """
+    return _request(url, "/jobs", {"argv": list(argv), "cwd": cwd or os.getcwd()})
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Submit a main.py run to the pipeline daemon. All arguments other than the --daemon-* "
+                    "options are passed to main.py unchanged.",
+        allow_abbrev=False,
+    )
+    parser.add_argument("--daemon-url", default=os.getenv("PIPELINE_DAEMON_URL", DEFAULT_DAEMON_URL),
+                        help="Address of the daemon (default: $PIPELINE_DAEMON_URL or %(default)s).")
+    parser.add_argument("--daemon-status", action="store_true", help="Print the daemon's status and exit.")
+    parser.add_argument("--daemon-shutdown", action="store_true", help="Stop the daemon and exit.")
+    args, pipeline_args = parser.parse_known_args()
+
+    try:
+        if args.daemon_status or args.daemon_shutdown:
+            answer = _request(args.daemon_url, "/shutdown" if args.daemon_shutdown else "/status",
+                              {} if args.daemon_shutdown else None)
+            print(json.dumps(answer, indent=2))
+            return
+        if not pipeline_args:
+            parser.error("the main.py arguments (input_excel_file output_directory ...) are required")
+        answer = submit_job(pipeline_args, args.daemon_url)
+    except urllib.error.HTTPError as e:
+        print(f"❌ The daemon rejected the request: {e.read().decode('utf-8', 'replace')}")
+        sys.exit(1)
+    except urllib.error.URLError as e:
+        print(f"❌ No pipeline daemon at {args.daemon_url} ({e.reason}). Start one with 'python daemon.py'.")
+        sys.exit(1)
+
+    sys.stdout.write(answer["log"])
+    print(f"\n  Job ran in the daemon in {answer['seconds']:.2f}s.")
+    sys.exit(answer["exit_status"])
+
+
+if __name__ == "__main__":
+    main()
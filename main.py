@@ -1,26 +1,235 @@
 import os
 import sys
 import argparse
-import glob
+import datetime
+import importlib.util
+import time
 import traceback
 
-# Import functions from src scripts
+# Import functions from src scripts. Only standard-library modules are imported here, so --help and
+# option errors come back at once; the stage modules are imported by run_pipeline, and each
+# engine's dependencies only when a run selects it (see stage_registry).
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "src"))
-from sheets_to_excel import separate_sheets_with_openpyxl
-from preprocessing_excel_sheets import recalculate_and_refresh_sheets
-from find_table_boundaries import find_table_boundaries
-from process_with_pandas import process_table_with_pandas
+from stage_registry import (
+    SPLIT_ENGINES, SPLIT_MODES, REFRESH_ENGINES, BOUNDARY_ENGINES, DEFAULT_CONFIDENCE_THRESHOLD, PROMPT_ENCODINGS,
+    DEFAULT_PROMPT_ENCODING, DEFAULT_TOKEN_BUDGET, READERS, DEFAULT_READER, OUTPUT_FORMATS, DEFAULT_OUTPUT_FORMATS,
+    COLUMNAR_FORMATS, DEFAULT_CONCURRENCY, DEFAULT_MAX_RETRIES, DEFAULT_REQUEST_TIMEOUT, DEFAULT_REQUESTS_PER_SECOND,
+    MIN_CHUNK_SIZE,
+)
+from boundary_cache import BoundaryCache, DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES
+from run_manifest import RunManifest, MANIFEST_FILE_NAME, SHEET_STAGES
+from telemetry import StageRecorder, RUN_REPORT_FILE_NAME, write_run_report
 
-def main():
+OUTPUT_LABELS = {"xlsx": "Excel", "csv": "CSV", "parquet": "Parquet", "feather": "Feather", "schema": "Schema"}
+
+def add_pipeline_arguments(parser: argparse.ArgumentParser):
+    """Options shared by ``main.py`` and the batch entry point ``batch.py``."""
+    parser.add_argument(
+        "--split-engine", choices=SPLIT_ENGINES, default="openpyxl",
+        help="'openpyxl' rebuilds each sheet cell by cell; 'zip' copies the sheet parts straight from the source archive."
+    )
+    parser.add_argument(
+        "--split-mode", choices=SPLIT_MODES, default="full",
+        help="How sheets are split: 'full' copies styles cell by cell, 'streaming' keeps memory bounded for very large workbooks."
+    )
+    parser.add_argument(
+        "--values-only", action="store_true",
+        help="Skip styling while splitting; downstream stages only read values."
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help="Number of worker processes for the per-sheet pipeline (default: 1, sequential)."
+    )
+    parser.add_argument(
+        "--formats", default=",".join(DEFAULT_OUTPUT_FORMATS),
+        help=f"Comma-separated cleaned output formats out of {', '.join(OUTPUT_FORMATS)} (default: %(default)s). "
+             "Parquet and Feather need pyarrow."
+    )
+    parser.add_argument(
+        "--coerce-types", action="store_true",
+        help="Convert cleaned columns to typed values (numbers, percentages, dates, categories) instead of text, "
+             "and write a per-column schema report."
+    )
+    parser.add_argument(
+        "--reader", choices=READERS, default=DEFAULT_READER,
+        help="How sheet grids are parsed: 'openpyxl' through pandas.read_excel, 'fast' with the streaming "
+             "XML reader (same grids, less time and memory on large sheets; default: %(default)s)."
+    )
+    parser.add_argument(
+        "--chunk-size", type=int, default=0, metavar="ROWS",
+        help="Clean tables ROWS rows at a time, streamed from the sheet and appended to the outputs, so memory "
+             f"stays flat however long a table is (at least {MIN_CHUNK_SIZE}; default: 0, whole tables in memory)."
+    )
+    parser.add_argument(
+        "--row-filters", metavar="PATH",
+        help="JSON file of row-filter rules (regex, column, empty, numeric_range, footnote) that drop totals, "
+             "footnotes and padding rows from cleaned tables; default: drop TOTAL/DEPARTMENTS and empty rows."
+    )
+    parser.add_argument(
+        "--refresh-engine", choices=REFRESH_ENGINES, default="excel",
+        help="'excel' refreshes through Microsoft Excel (xlwings), 'python' recalculates formulas headlessly "
+             "without Excel, 'none' keeps the cached values."
+    )
+    parser.add_argument(
+        "--always-refresh", action="store_true",
+        help="Refresh every sheet, even ones without formulas, data connections, pivot caches or external links."
+    )
+    parser.add_argument(
+        "--boundary-engine", choices=BOUNDARY_ENGINES, default="llm",
+        help="'llm' asks the model for every sheet, 'heuristic' runs the offline detector only, "
+             "'hybrid' uses the offline detector and escalates low-confidence sheets to the model."
+    )
+    parser.add_argument(
+        "--confidence-threshold", type=float, default=DEFAULT_CONFIDENCE_THRESHOLD,
+        help=f"Minimum heuristic confidence accepted without the LLM in hybrid mode (default: {DEFAULT_CONFIDENCE_THRESHOLD})."
+    )
+    parser.add_argument(
+        "--multi-table", action="store_true",
+        help="Find every table block on a sheet (stacked or side by side) and clean each one to its own outputs, "
+             "suffixed _table1, _table2, ... when a sheet has several."
+    )
+    parser.add_argument(
+        "--prompt-encoding", choices=PROMPT_ENCODINGS, default=DEFAULT_PROMPT_ENCODING,
+        help="How sheet rows are written into the LLM prompt: 'table' pads fixed-width columns, 'compact' "
+             "run-length encodes empty cells and drops empty columns (default: %(default)s)."
+    )
+    parser.add_argument(
+        "--token-budget", type=int, default=DEFAULT_TOKEN_BUDGET,
+        help="With --prompt-encoding compact, the most tokens a sheet's prompt text may use; "
+             "0 for no limit (default: %(default)s)."
+    )
+    parser.add_argument(
+        "--boundary-cache-dir", default=DEFAULT_CACHE_DIR,
+        help=f"Directory of the persistent LLM boundary cache (default: {DEFAULT_CACHE_DIR})."
+    )
+    parser.add_argument(
+        "--boundary-cache-size-mb", type=float, default=DEFAULT_MAX_BYTES / (1024 * 1024),
+        help="Size above which the least recently used cache entries are evicted (default: %(default)s MB)."
+    )
+    parser.add_argument(
+        "--no-boundary-cache", action="store_true",
+        help="Always call the LLM, without reading or writing the boundary cache."
+    )
+    parser.add_argument(
+        "--clear-boundary-cache", action="store_true",
+        help="Remove every cached boundary result before the run."
+    )
+    parser.add_argument(
+        "--events-jsonl", metavar="PATH",
+        help=f"Also append every stage's telemetry record to this JSON-lines file as the stage ends "
+             f"(the full report is always written to {RUN_REPORT_FILE_NAME} in the output directory)."
+    )
+    parser.add_argument(
+        "--rerun-all", action="store_true",
+        help=f"Ignore the {MANIFEST_FILE_NAME} of a previous run and run every stage again."
+    )
+    parser.add_argument(
+        "--no-manifest", action="store_true",
+        help=f"Neither read nor write {MANIFEST_FILE_NAME}; every stage runs and nothing is recorded."
+    )
+
+
+def resolve_options(args: argparse.Namespace) -> dict:
+    """
+    Turn parsed arguments into the run options dict handed to the pipeline.
+
+    Validates the output formats and chunk size, loads the row-filter rules and prepares the
+    boundary cache settings; exits with status 1 on invalid options.
+    """
+    options = vars(args)
+    requested_formats = args.formats
+    options["formats"] = [fmt.strip().lower() for fmt in requested_formats.split(",") if fmt.strip()]
+    if not options["formats"] or any(fmt not in OUTPUT_FORMATS for fmt in options["formats"]):
+        print(f"❌ Unknown output format(s) '{requested_formats}'. Choose from: {', '.join(OUTPUT_FORMATS)}.")
+        sys.exit(1)
+    if any(fmt in COLUMNAR_FORMATS for fmt in options["formats"]) and importlib.util.find_spec("pyarrow") is None:
+        print("❌ Parquet and Feather outputs need pyarrow. Install it with 'pip install pyarrow'.")
+        sys.exit(1)
+    if args.chunk_size and args.chunk_size < MIN_CHUNK_SIZE:
+        print(f"❌ --chunk-size must be 0 or at least {MIN_CHUNK_SIZE} rows, not {args.chunk_size}.")
+        sys.exit(1)
+    options["row_filter_rules"] = None
+    if args.row_filters:
+        from row_filters import RowFilter
+
+        try:
+            options["row_filter_rules"] = RowFilter.from_file(args.row_filters).rules
+        except (OSError, ValueError) as e:
+            print(f"❌ Invalid row filter file '{args.row_filters}': {e}")
+            sys.exit(1)
+    options["boundary_cache_max_bytes"] = int(args.boundary_cache_size_mb * 1024 * 1024)
+    if args.no_boundary_cache:
+        options["boundary_cache_dir"] = None
+    elif args.clear_boundary_cache:
+        removed = BoundaryCache(args.boundary_cache_dir).clear()
+        print(f"🧹 Cleared {removed} cached boundary results from '{args.boundary_cache_dir}'.")
+    if args.events_jsonl:
+        options["events_jsonl"] = os.path.abspath(args.events_jsonl)
+    return options
+
+
+def output_dirs(output_dir: str) -> dict:
+    """Subfolders of ``output_dir`` for each step, keyed by 'split', 'refreshed', 'boundaries' and 'cleaned'."""
+    return {name: os.path.join(output_dir, name) for name in ("split", "refreshed", "boundaries", "cleaned")}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """The ``main.py`` command line, shared with the job daemon ``daemon.py``."""
     parser = argparse.ArgumentParser(
         description="Orchestrate Excel cleaning pipeline: split sheets, refresh, find table boundaries, and clean data."
     )
     parser.add_argument("input_excel_file", help="Path to the source Excel file (.xlsx).")
     parser.add_argument("output_directory", help="Directory where all outputs will be saved.")
-    args = parser.parse_args()
+    add_pipeline_arguments(parser)
+    parser.add_argument(
+        "--in-memory", action="store_true",
+        help="Refresh the workbook once and hand each parsed sheet grid from stage to stage instead of re-reading files."
+    )
+    parser.add_argument(
+        "--keep-intermediates", action="store_true",
+        help="With --in-memory, also write the split sheets, refreshed workbook and boundaries JSON files."
+    )
+    parser.add_argument(
+        "--async-boundaries", action="store_true",
+        help="Refresh and parse every sheet first, then send all LLM boundary requests concurrently."
+    )
+    parser.add_argument(
+        "--llm-concurrency", type=int, default=DEFAULT_CONCURRENCY,
+        help="With --async-boundaries, maximum number of LLM requests in flight (default: %(default)s)."
+    )
+    parser.add_argument(
+        "--llm-rate", type=float, default=DEFAULT_REQUESTS_PER_SECOND,
+        help="With --async-boundaries, maximum LLM requests started per second; 0 disables the limit (default: %(default)s)."
+    )
+    parser.add_argument(
+        "--llm-timeout", type=float, default=DEFAULT_REQUEST_TIMEOUT,
+        help="With --async-boundaries, per-request timeout in seconds (default: %(default)s)."
+    )
+    parser.add_argument(
+        "--llm-max-retries", type=int, default=DEFAULT_MAX_RETRIES,
+        help="With --async-boundaries, retries per sheet after 429/5xx responses or timeouts (default: %(default)s)."
+    )
+    return parser
+
+
+def run_pipeline(input_excel_file: str, output_dir: str, options: dict) -> list:
+    """
+    Run the whole pipeline for one workbook and print its per-sheet summary.
+
+    ``options`` is the dict built by ``resolve_options``; its 'in_memory',
+    'keep_intermediates', 'async_boundaries', 'workers', 'no_manifest' and
+    'rerun_all' entries select the run mode. Exits with status 1 when the run
+    cannot start (missing input, split failure, no sheets).
 
-    input_excel_file = args.input_excel_file
-    output_dir = args.output_directory
+    Returns
+    -------
+    list of dict
+        One summary entry per sheet, in sheet order.
+    """
+    from pipeline import process_sheet_files, process_workbook_in_memory, split_workbook
+
+    started_at = datetime.datetime.now().isoformat(timespec="seconds")
+    run_started = time.perf_counter()
 
     if not os.path.exists(input_excel_file):
         print(f"❌ Input file '{input_excel_file}' does not exist.")
@@ -28,83 +237,110 @@ def main():
     os.makedirs(output_dir, exist_ok=True)
 
     # Define subfolders for each step
-    split_dir = os.path.join(output_dir, "split")
-    refreshed_dir = os.path.join(output_dir, "refreshed")
-    boundaries_dir = os.path.join(output_dir, "boundaries")
-    cleaned_dir = os.path.join(output_dir, "cleaned")
-    for d in [split_dir, refreshed_dir, boundaries_dir, cleaned_dir]:
-        os.makedirs(d, exist_ok=True)
+    dirs = output_dirs(output_dir)
 
-    print(f"\n[1/4] Splitting sheets from '{input_excel_file}' into '{split_dir}' ...")
-    try:
-        separate_sheets_with_openpyxl(input_excel_file, split_dir)
-    except Exception as e:
-        print(f"❌ Failed to split sheets: {e}")
-        traceback.print_exc()
-        sys.exit(1)
+    # In-memory runs only write intermediate artifacts when asked to
+    write_intermediates = not options["in_memory"] or options["keep_intermediates"]
+    for d in (dirs.values() if write_intermediates else [dirs["cleaned"]]):
+        os.makedirs(d, exist_ok=True)
 
-    # Find all generated sheet files
-    base_name = os.path.splitext(os.path.basename(input_excel_file))[0]
-    sheet_files = sorted(glob.glob(os.path.join(split_dir, f"{base_name}_sheet*.xlsx")))
+    recorder = StageRecorder(None, options.get("events_jsonl"))
 
-    if not sheet_files:
-        print("❌ No sheet files were generated. Exiting.")
-        sys.exit(1)
+    # Incremental runs need the per-stage files, so only on-disk, per-sheet runs use the manifest
+    manifest = None
+    if not (options["no_manifest"] or options["in_memory"] or options["async_boundaries"]):
+        manifest = RunManifest(output_dir, fresh=options["rerun_all"])
+    elif not options["no_manifest"]:
+        print(f"ℹ️  {MANIFEST_FILE_NAME} is only used by on-disk, per-sheet runs; every stage runs.")
 
-    print(f"\n[2/4] Processing each sheet file ...")
-    summary = []
-    for sheet_file in sheet_files:
+    if write_intermediates:
         try:
-            print(f"\n--- Processing sheet file: {os.path.basename(sheet_file)} ---")
-
-            # Step 2: Refresh and recalculate
-            print("  [2.1] Refreshing formulas and data ...")
-            refreshed_file = os.path.join(
-                refreshed_dir, os.path.basename(sheet_file).replace(".xlsx", "_refreshed.xlsx")
-            )
-            # Copy the split file to refreshed_dir first, then refresh in place
-            import shutil
-            shutil.copy2(sheet_file, refreshed_file)
-            recalculate_and_refresh_sheets(refreshed_file)
-
-            # Step 3: Find table boundaries
-            print("  [2.2] Finding table boundaries ...")
-            boundaries_json = os.path.join(
-                boundaries_dir, os.path.basename(sheet_file).replace(".xlsx", "_boundaries.json")
-            )
-            find_table_boundaries(refreshed_file, boundaries_json)
+            split = split_workbook(input_excel_file, dirs["split"], options, manifest.data["split"] if manifest else None)
+        except Exception as e:
+            print(f"❌ Failed to split sheets: {e}")
+            traceback.print_exc()
+            sys.exit(1)
+        recorder.stages.extend(split["telemetry"])
+    else:
+        print("\n[1/4] Skipping the split step; sheets are handed over in memory.")
 
-            # Step 4: Process with pandas
-            print("  [2.3] Cleaning and saving final outputs ...")
-            cleaned_excel = os.path.join(
-                cleaned_dir, os.path.basename(sheet_file).replace(".xlsx", "_cleaned.xlsx")
-            )
-            cleaned_csv = os.path.join(
-                cleaned_dir, os.path.basename(sheet_file).replace(".xlsx", "_cleaned.csv")
+    if options["in_memory"]:
+        print(f"\n[2/4] Processing each sheet in memory ...")
+        try:
+            summary = process_workbook_in_memory(
+                input_excel_file, dirs, workers=options["workers"], keep_intermediates=options["keep_intermediates"],
+                options=options, recorder=recorder,
             )
-            process_table_with_pandas(refreshed_file, boundaries_json, cleaned_excel, cleaned_csv)
-
-            print(f"✅ Finished processing '{os.path.basename(sheet_file)}'.")
-            summary.append((sheet_file, "Success", cleaned_excel, cleaned_csv))
         except Exception as e:
-            print(f"❌ Error processing '{os.path.basename(sheet_file)}': {e}")
+            print(f"❌ Failed to read or refresh '{input_excel_file}': {e}")
             traceback.print_exc()
-            summary.append((sheet_file, "Failed", None, None))
+            sys.exit(1)
+        if not summary:
+            print("❌ The workbook contains no sheets. Exiting.")
+            sys.exit(1)
+    else:
+        sheet_files = split["sheet_files"]
+        if not sheet_files:
+            print("❌ No sheet files were generated. Exiting.")
+            sys.exit(1)
+
+        if manifest and not split["reused"]:
+            manifest.data["input_file"] = os.path.abspath(input_excel_file)
+            manifest.data["split"] = split["record"]
+
+        print(f"\n[2/4] Processing each sheet file ...")
+        summary = process_sheet_files(sheet_files, dirs, workers=options["workers"], options=options, manifest=manifest,
+                                      recorder=recorder)
 
     print("\n[3/4] Processing complete. Summary:")
     for entry in summary:
-        sheet, status, excel, csv = entry
-        print(f"  - {os.path.basename(sheet)}: {status}")
-        if status == "Success":
-            print(f"      Cleaned Excel: {os.path.basename(excel)}")
-            print(f"      Cleaned CSV:   {os.path.basename(csv)}")
-
-    failed = [s for s in summary if s[1] != "Success"]
-    if failed:
+        print(f"  - {os.path.basename(entry['sheet_file'])}: {entry['status']}")
+        if entry.get("refresh"):
+            refresh = entry["refresh"]
+            print(f"      Refresh:       {'ran' if refresh['ran'] else 'skipped'} ({refresh['reason']})")
+        if entry["status"] == "Success":
+            for key, path in entry["outputs"].items():
+                fmt = key.split("_table")[0]  # multi-table outputs are keyed like 'csv_table2'
+                print(f"      Cleaned {OUTPUT_LABELS.get(fmt, fmt) + ':':<8} {os.path.basename(path)}")
+        if entry.get("reused"):
+            print(f"      Reused:        {', '.join(entry['reused'])} (unchanged since the last run)")
+
+    refreshes = [entry["refresh"] for entry in summary if entry.get("refresh")]
+    if refreshes:
+        skipped = sum(not refresh["ran"] for refresh in refreshes)
+        print(f"\n  Refresh skipped for {skipped} of {len(refreshes)} sheets.")
+
+    if manifest:
+        reused = sum(len(entry.get("reused", [])) for entry in summary)
+        print(f"\n  Run manifest: {reused} of {len(SHEET_STAGES) * len(summary)} sheet stages reused, recorded in '{manifest.path}'.")
+
+    if options["boundary_cache_dir"]:
+        hits = sum(entry.get("boundary_cache", {}).get("hits", 0) for entry in summary)
+        misses = sum(entry.get("boundary_cache", {}).get("misses", 0) for entry in summary)
+        # Only the LLM path consults the cache; heuristic runs (and confident hybrid ones) never do
+        if hits + misses:
+            print(f"\n  Boundary cache: {hits} hits, {misses} misses ({hits} LLM calls saved).")
+
+    report_path = os.path.join(output_dir, RUN_REPORT_FILE_NAME)
+    report = write_run_report(report_path, input_excel_file, started_at, time.perf_counter() - run_started,
+                              recorder.stages, summary, options)
+    timings = ", ".join(f"{stage} {total['wall_seconds']:.2f}s" for stage, total in report["totals"].items())
+    print(f"\n  Stage wall times: {timings}.")
+    print(f"  Run report written to '{report_path}'.")
+
+    if any(entry["status"] != "Success" for entry in summary):
         print("\n[4/4] Some sheets failed to process. See errors above.")
-        sys.exit(2)
     else:
         print("\n[4/4] All sheets processed successfully.")
+    return summary
+
+
+def main():
+    args = build_parser().parse_args()
+    options = resolve_options(args)
+    summary = run_pipeline(args.input_excel_file, args.output_directory, options)
+    if any(entry["status"] != "Success" for entry in summary):
+        sys.exit(2)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
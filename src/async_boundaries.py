@@ -0,0 +1,305 @@
+"""
+Concurrent LLM table-boundary detection for many sheets at once.
+
+``find_table_boundaries`` sends one request per sheet and waits for each answer
+before starting the next. ``find_table_boundaries_batch`` sends the requests for
+all sheets concurrently with asyncio while staying polite to the API:
+
+    - a concurrency cap (at most N requests in flight),
+    - a token-bucket rate limiter (at most R requests started per second),
+    - exponential backoff with jitter on 429 and 5xx responses, timeouts and
+      connection errors, honouring ``Retry-After`` when the server sends it,
+    - a per-request timeout.
+
+Offline engines and the boundary cache behave exactly as in the single-sheet
+function: heuristic results never reach the network, hybrid sheets are only sent
+when the detector is unsure, and cached answers skip the request entirely.
+"""
+
+import asyncio
+import json
+import os
+import random
+import time
+
+from find_table_boundaries import (
+    BOUNDARY_ENGINES, BOUNDARY_PROMPT, DEFAULT_CONFIDENCE_THRESHOLD, LLM_MODEL,
+    _build_sheet_text, _configure_openai, _prompt_stats,
+)
+from prompt_encoding import DEFAULT_PROMPT_ENCODING, DEFAULT_TOKEN_BUDGET
+from heuristic_boundaries import detect_table_boundaries
+from table_regions import find_table_blocks, block_grid, whole_sheet_block, sheet_boundaries
+from stage_registry import (
+    DEFAULT_CONCURRENCY, DEFAULT_MAX_RETRIES, DEFAULT_REQUEST_TIMEOUT, DEFAULT_REQUESTS_PER_SECOND,
+)
+
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 60.0
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter shared by all tasks of one event loop.
+
+    Tokens refill continuously at ``rate`` per second up to ``capacity``; each
+    request takes one token and waits when the bucket is empty.
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+def _retry_after_seconds(error) -> float:
+    """Return the server's ``Retry-After`` delay in seconds, or None when absent."""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+async def _request_boundaries(client, sheet_text: str, semaphore, limiter, timeout: float,
+                              max_retries: int, stats: dict) -> dict:
+    """Send one boundary request, retrying transient failures with exponential backoff."""
+    import openai  # only runs that send sheets to the LLM load the SDK
+
+    attempt = 0
+    while True:
+        retry_after = None
+        async with semaphore:
+            if limiter is not None:
+                await limiter.acquire()
+            stats["requests"] += 1
+            try:
+                response = await asyncio.wait_for(
+                    client.chat.completions.create(
+                        model=LLM_MODEL,
+                        messages=[{"role": "system", "content": BOUNDARY_PROMPT}, {"role": "user", "content": sheet_text}],
+                        response_format={"type": "json_object"},
+                    ),
+                    timeout,
+                )
+                boundaries = json.loads(response.choices[0].message.content)
+                if 'header_start_index' not in boundaries or 'data_end_index' not in boundaries:
+                    raise ValueError("AI response did not contain the required keys.")
+                return boundaries
+            except (asyncio.TimeoutError, openai.APITimeoutError, openai.APIConnectionError) as e:
+                error = e
+            except openai.APIStatusError as e:
+                if e.status_code != 429 and e.status_code < 500:
+                    raise
+                error = e
+                retry_after = _retry_after_seconds(e)
+
+        # Back off outside the semaphore so other sheets keep using the free slot
+        if attempt >= max_retries:
+            raise error
+        delay = retry_after
+        if delay is None:
+            delay = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt) * random.uniform(0.5, 1.0)
+        stats["retries"] += 1
+        attempt += 1
+        await asyncio.sleep(delay)
+
+
+async def _find_boundaries_async(sheet_texts: list, concurrency: int, requests_per_second: float,
+                                 timeout: float, max_retries: int, client, stats: dict) -> list:
+    owns_client = client is None
+    if owns_client:
+        openai = _configure_openai()
+        # Retries are handled here, so the SDK's own retry loop is switched off
+        client = openai.AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0, timeout=timeout)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    limiter = TokenBucket(requests_per_second) if requests_per_second and requests_per_second > 0 else None
+    tasks = [
+        _request_boundaries(client, text, semaphore, limiter, timeout, max_retries, stats)
+        for text in sheet_texts
+    ]
+    try:
+        return await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        if owns_client:
+            await client.close()
+
+
+def find_table_boundaries_batch(grids: list, output_json_paths: list = None, engine: str = "llm",
+                                confidence_threshold: float = DEFAULT_CONFIDENCE_THRESHOLD, cache=None,
+                                concurrency: int = DEFAULT_CONCURRENCY,
+                                requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND,
+                                timeout: float = DEFAULT_REQUEST_TIMEOUT, max_retries: int = DEFAULT_MAX_RETRIES,
+                                client=None, stats: dict = None, multi_table: bool = False,
+                                prompt_encoding: str = DEFAULT_PROMPT_ENCODING,
+                                token_budget: int = DEFAULT_TOKEN_BUDGET) -> list:
+    """
+    Find the table boundaries of many sheets, sending the LLM requests concurrently.
+
+    Parameters
+    ----------
+    grids : list of pd.DataFrame
+        Sheet grids read with ``header=None, dtype=str``.
+    output_json_paths : list of str, optional
+        Where to write each sheet's boundaries JSON; None entries are not written.
+    engine, confidence_threshold, cache, prompt_encoding, token_budget
+        As in ``find_table_boundaries``.
+    concurrency : int
+        Maximum number of requests in flight.
+    requests_per_second : float
+        Token-bucket rate for starting requests; 0 disables rate limiting.
+    timeout : float
+        Per-request timeout in seconds. Timeouts are retried like 5xx responses.
+    max_retries : int
+        Retries per sheet after 429/5xx responses, timeouts or connection errors.
+    client : openai.AsyncOpenAI, optional
+        Client to use, for example one pointed at a local mock server.
+    stats : dict, optional
+        Filled with request, retry, cache and timing counters of this batch, plus
+        'cache_outcomes': per grid, 'hit', 'miss' or None when the cache was not used.
+    multi_table : bool
+        Find every table block of each sheet and the boundaries of each block, as in
+        ``find_table_boundaries``. The blocks of all sheets share one batch of requests.
+
+    Returns
+    -------
+    list
+        One entry per grid, in order: the boundaries dict, or the exception that
+        made that sheet fail. One failing sheet never affects the others.
+    """
+    if engine not in BOUNDARY_ENGINES:
+        raise ValueError(f"Unknown boundary engine '{engine}'. Expected one of: {', '.join(BOUNDARY_ENGINES)}")
+    if stats is None:
+        stats = {}
+    if multi_table:
+        return _find_tables_batch(grids, output_json_paths, stats, engine=engine,
+                                  confidence_threshold=confidence_threshold, cache=cache, concurrency=concurrency,
+                                  requests_per_second=requests_per_second, timeout=timeout,
+                                  max_retries=max_retries, client=client, prompt_encoding=prompt_encoding,
+                                  token_budget=token_budget)
+    stats.update({"sheets": len(grids), "requests": 0, "retries": 0, "cache_hits": 0, "cache_misses": 0,
+                  "llm_sheets": 0, "prompt_tokens": 0, "elapsed_seconds": 0.0, "cache_outcomes": [None] * len(grids)})
+    output_json_paths = output_json_paths or [None] * len(grids)
+
+    print(f"--- Step A: Finding Table Boundaries for {len(grids)} sheets (batched) ---")
+    results = [None] * len(grids)
+    pending = []  # (position, sheet_text, cache_key, heuristic_confidence, prompt_stats)
+    for position, grid in enumerate(grids):
+        try:
+            heuristic_confidence = None
+            if engine != "llm":
+                boundaries = detect_table_boundaries(grid)
+                boundaries["engine"] = "heuristic"
+                if engine == "heuristic" or boundaries["confidence"] >= confidence_threshold:
+                    results[position] = boundaries
+                    continue
+                heuristic_confidence = boundaries["confidence"]
+
+            sheet_text = _build_sheet_text(grid, prompt_encoding=prompt_encoding, token_budget=token_budget)
+            prompt = _prompt_stats(sheet_text, prompt_encoding)
+            stats["prompt_tokens"] += prompt["prompt_tokens"]
+            cache_key = None
+            if cache is not None:
+                cache_key = cache.make_key(sheet_text, BOUNDARY_PROMPT, LLM_MODEL)
+                cached = cache.get(cache_key)
+                if cached is not None:
+                    stats["cache_hits"] += 1
+                    stats["cache_outcomes"][position] = "hit"
+                    results[position] = _mark_llm(cached, heuristic_confidence, prompt)
+                    continue
+                stats["cache_misses"] += 1
+                stats["cache_outcomes"][position] = "miss"
+            pending.append((position, sheet_text, cache_key, heuristic_confidence, prompt))
+        except Exception as e:
+            results[position] = e
+
+    if pending:
+        stats["llm_sheets"] = len(pending)
+        print(f"  [AI] Sending {len(pending)} requests (concurrency {concurrency}, "
+              f"{requests_per_second or 'unlimited'} req/s, timeout {timeout:.0f}s).")
+        started = time.perf_counter()
+        try:
+            answers = asyncio.run(_find_boundaries_async(
+                [text for _, text, _, _, _ in pending], concurrency, requests_per_second,
+                timeout, max_retries, client, stats,
+            ))
+        except Exception as e:
+            answers = [e] * len(pending)
+        stats["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+        print(f"  [AI] {len(pending)} sheets answered in {stats['elapsed_seconds']:.2f}s "
+              f"({stats['requests']} requests, {stats['retries']} retries).")
+
+        for (position, _, cache_key, heuristic_confidence, prompt), answer in zip(pending, answers):
+            if isinstance(answer, BaseException):
+                results[position] = answer
+                continue
+            if cache is not None:
+                cache.put(cache_key, answer)
+            results[position] = _mark_llm(answer, heuristic_confidence, prompt)
+
+    for position, (result, output_json_path) in enumerate(zip(results, output_json_paths)):
+        if isinstance(result, BaseException):
+            print(f"  [Error] Sheet {position + 1}: {result}")
+        elif output_json_path:
+            with open(output_json_path, 'w') as f:
+                json.dump(result, f, indent=4)
+    return results
+
+
+def _find_tables_batch(grids: list, output_json_paths: list, stats: dict, **batch_kwargs) -> list:
+    """``find_table_boundaries_batch`` with ``multi_table``: one batch over the table blocks of all sheets."""
+    output_json_paths = output_json_paths or [None] * len(grids)
+    blocks, owners, results = [], [], [None] * len(grids)
+    for position, grid in enumerate(grids):
+        try:
+            for block in find_table_blocks(grid) or [whole_sheet_block(grid)]:
+                blocks.append((grid, block))
+                owners.append(position)
+        except Exception as e:
+            results[position] = e
+    print(f"  [Tables] Found {len(blocks)} table blocks on {len(grids)} sheets.")
+
+    found = find_table_boundaries_batch([block_grid(grid, block) for grid, block in blocks], stats=stats,
+                                        **batch_kwargs)
+    block_outcomes = stats["cache_outcomes"]
+    stats["sheets"], stats["table_blocks"] = len(grids), len(blocks)
+    stats["cache_outcomes"] = [None] * len(grids)
+    for (_, block), position, answer, outcome in zip(blocks, owners, found, block_outcomes):
+        if isinstance(results[position], BaseException):
+            continue
+        if isinstance(answer, BaseException):
+            # One failed block fails its sheet, whose other tables would be cleaned without it
+            results[position] = answer
+            continue
+        results[position] = results[position] or {"tables": []}
+        results[position]["tables"].append(sheet_boundaries(block, answer))
+        # A sheet counts as a cache miss when any of its blocks was one
+        if outcome == "miss" or stats["cache_outcomes"][position] is None:
+            stats["cache_outcomes"][position] = outcome or stats["cache_outcomes"][position]
+
+    for result, output_json_path in zip(results, output_json_paths):
+        if output_json_path and result is not None and not isinstance(result, BaseException):
+            with open(output_json_path, 'w') as f:
+                json.dump(result, f, indent=4)
+    return results
+
+
+def _mark_llm(boundaries: dict, heuristic_confidence, prompt: dict) -> dict:
+    boundaries = dict(boundaries, engine="llm", **prompt)
+    if heuristic_confidence is not None:
+        boundaries["heuristic_confidence"] = heuristic_confidence
+    return boundaries
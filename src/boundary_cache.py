@@ -0,0 +1,109 @@
+"""
+Persistent on-disk cache for LLM table-boundary results.
+
+Entries are keyed by a SHA-256 hash of the sampled sheet text, the prompt and the
+model, so an unchanged sheet sent with an unchanged prompt never pays for a second
+API call. Each entry is a small JSON file; when the cache grows beyond its size
+limit the least recently used entries are evicted.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+    "excel-cleaning", "boundaries",
+)
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+class BoundaryCache:
+    """
+    Directory of cached boundary results with size-based LRU eviction.
+
+    Attributes:
+        cache_dir (str): Directory holding one ``<key>.json`` file per entry.
+        max_bytes (int): Total size above which the oldest entries are evicted.
+        hits (int): Lookups answered from the cache by this instance.
+        misses (int): Lookups that had to go to the model.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(sheet_text: str, prompt: str, model: str) -> str:
+        """Hash everything that influences the model's answer into a cache key."""
+        digest = hashlib.sha256()
+        for part in (model, prompt, sheet_text):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def get(self, key: str):
+        """
+        Return the cached boundaries for ``key``, or None on a miss.
+
+        A hit refreshes the entry's modification time so eviction is least-recently-used.
+        """
+        path = self._path(key)
+        try:
+            with open(path, "r") as f:
+                boundaries = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return boundaries
+
+    def put(self, key: str, boundaries: dict):
+        """Store ``boundaries`` under ``key`` and evict old entries if over the size limit."""
+        # Write to a temporary file first so concurrent workers never read a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(boundaries, f)
+        os.replace(tmp_path, self._path(key))
+        self._evict()
+
+    def clear(self) -> int:
+        """Remove every entry. Returns the number of entries removed."""
+        removed = 0
+        for entry in self._entries():
+            try:
+                os.remove(entry.path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _entries(self):
+        with os.scandir(self.cache_dir) as it:
+            return [entry for entry in it if entry.name.endswith(".json") and entry.is_file()]
+
+    def _evict(self):
+        entries = []
+        for entry in self._entries():
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
@@ -0,0 +1,385 @@
+"""
+Out-of-core cleaning: tables streamed through the cleaner in fixed-size row chunks.
+
+``process_table_with_pandas`` holds the sheet grid, the table sliced out of it and
+the filtered table at the same time, so cleaning a sheet takes several times the
+sheet's own size in memory. With ``--chunk-size N`` every table is cleaned N rows
+at a time instead, and no more than about one chunk of it is in memory at once:
+
+    1. The table's rows are streamed from the sheet file with the fast reader
+       (``XlsxWorkbook.iter_rows``), or sliced chunk by chunk from the grid when an
+       earlier stage already holds it. The width of a single-table sheet, which
+       decides the table's columns, is found by a first pass that keeps no cells.
+    2. The header is resolved from the first chunk: header detection never looks
+       deeper than ``MAX_HEADER_ROWS`` rows, the smallest chunk size allowed.
+    3. Every chunk is filtered with the row-filter rules (a footnote rule with
+       ``to_end`` keeps dropping rows in the chunks after its footnote), typed, and
+       appended to every output: rows to the CSV file, rows to a write-only
+       openpyxl workbook, one Parquet row group or Feather record batch per chunk.
+
+A typed output needs the same type in every chunk of a column, and the type
+depends on all of the column's values. When the run coerces types, or writes
+Parquet or Feather, a profiling pass therefore streams the table once before the
+writing pass and summarises every column (``type_coercion.ColumnProfile``, or
+``_NumberProfile`` for the inferred types of untyped runs); the writing pass then
+converts each chunk to the type the whole column decided.
+
+The outputs hold the same columns, rows and values as ``process_table_with_pandas``
+writes. The CSV is the same file: pandas formats a date column from the values it
+writes, which would give each chunk its own layout (dates only, times, fractional
+seconds), so every chunk of a typed date column is formatted with the one layout
+its profile decided for the whole column. The other formats differ only in their
+internal layout (row groups, record batches). The schema report's byte sizes are
+summed over the chunks.
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+
+from process_with_pandas import MAX_HEADER_ROWS, resolve_header, report_dropped_rows, table_output_path
+from row_filters import RowFilter
+from stage_registry import MIN_CHUNK_SIZE
+from type_coercion import ColumnProfile, write_schema_report
+from xlsx_reader import XlsxWorkbook
+
+# The first chunk must hold every header row; the CLI's minimum is kept in stage_registry, which cannot import pandas
+assert MIN_CHUNK_SIZE == MAX_HEADER_ROWS, "stage_registry.MIN_CHUNK_SIZE must equal MAX_HEADER_ROWS"
+
+# Number format pandas gives datetime cells in Excel outputs
+EXCEL_DATETIME_FORMAT = "YYYY-MM-DD HH:MM:SS"
+
+
+def clean_sheet_in_chunks(input_file: str, boundaries_json_path: str, final_excel_path: str, final_csv_path: str,
+                          chunk_size: int, df: pd.DataFrame = None, boundaries: dict = None,
+                          parquet_path: str = None, feather_path: str = None, coerce: bool = False,
+                          schema_json_path: str = None, row_filter: RowFilter = None,
+                          dropped_rows: dict = None) -> list:
+    """
+    Clean a sheet's table(s) ``chunk_size`` rows at a time into the same outputs as ``process_table_with_pandas``.
+
+    The arguments are those of ``process_table_with_pandas``. The rows are streamed
+    from ``input_file`` (its first sheet) with the fast reader, whatever reader the
+    run uses, unless the sheet grid ``df`` is handed over.
+
+    Parameters
+    ----------
+    chunk_size : int
+        Rows per chunk, at least ``MAX_HEADER_ROWS``.
+
+    Returns
+    -------
+    list of dict
+        One dict per table with the 'rows' and 'columns' of the cleaned table.
+    """
+    if chunk_size < MAX_HEADER_ROWS:
+        raise ValueError(f"The chunk size must be at least {MAX_HEADER_ROWS} rows, the deepest header detected")
+    print(f"\n--- Step B: Processing Table with Pandas in Chunks of {chunk_size} Rows ---")
+    if boundaries is None:
+        with open(boundaries_json_path, 'r') as f:
+            boundaries = json.load(f)
+    row_filter = row_filter or RowFilter()
+    paths = (final_excel_path, final_csv_path, parquet_path, feather_path, schema_json_path)
+
+    workbook = None
+    if df is None:
+        workbook = XlsxWorkbook(input_file)
+        print("  [Read] Streaming the original Excel file in chunks of string data.")
+    else:
+        print("  [Read] Using the sheet grid handed over from the previous stage.")
+    try:
+        # Column ranges are cut at the sheet's width, as slicing the grid does
+        width = df.shape[1] if workbook is None else workbook.sheet_width(0)
+        tables = boundaries.get('tables', [{**boundaries, 'col_start': 0}])
+        tables = [{**table, 'col_end': min(table.get('col_end', width - 1), width - 1)} for table in tables]
+        summaries = []
+        for n, table in enumerate(tables, start=1):
+            if 'tables' in boundaries:
+                print(f"  [Table {n}/{len(tables)}] Columns {table['col_start']} to {table['col_end']}.")
+            print(f"  [Slice] Streaming table from row {table['header_start_index']} to {table['data_end_index']}.")
+            chunked = _ChunkedTable(_row_source(workbook, df, table, chunk_size),
+                                    max(table['col_end'] - table['col_start'] + 1, 0), row_filter)
+            table_paths = [table_output_path(path, n, len(tables)) for path in paths]
+            summaries.append(_write_table(chunked, *table_paths, coerce=coerce))
+            report_dropped_rows(chunked.dropped, dropped_rows)
+        return summaries
+    finally:
+        if workbook is not None:
+            workbook.close()
+
+
+def _row_source(workbook: XlsxWorkbook, df: pd.DataFrame, table: dict, chunk_size: int):
+    """A function returning a fresh iterator over the raw chunks of ``table``, from the file or from the grid."""
+    first, last = table['header_start_index'], table['data_end_index'] + 1
+    col_start, col_end = table['col_start'], table['col_end']
+
+    def grid_chunks():
+        block = df.iloc[first:last, col_start:col_end + 1]
+        for offset in range(0, len(block), chunk_size):
+            yield block.iloc[offset:offset + chunk_size].reset_index(drop=True)
+
+    if workbook is None:
+        return grid_chunks
+    return lambda: workbook.iter_rows(0, first, last, chunk_size, col_start, col_end)
+
+
+class _ChunkedTable:
+    """
+    One table streamed in chunks: its header, resolved from the first chunk, and its filtered data chunks.
+
+    Attributes:
+        header (tuple): ``(header_row_count, column_names)``, once the first chunk was read.
+        dropped (dict): Rows each row-filter rule dropped during the last pass.
+    """
+
+    def __init__(self, raw_chunks, width: int, row_filter: RowFilter):
+        self.raw_chunks = raw_chunks
+        self.width = width
+        self.row_filter = row_filter
+        self.header = None
+        self.dropped = {}
+
+    def chunks(self):
+        """One pass over the table's data rows: named, filtered chunks, the first one possibly empty."""
+        self.dropped, state = {}, {}
+        first = True
+        for chunk in self._raw():
+            chunk.columns = range(chunk.shape[1])
+            if first:
+                if self.header is None:
+                    self.header = resolve_header(chunk)
+                chunk = chunk.iloc[self.header[0]:]
+                first = False
+            chunk.columns = self.header[1]
+            kept, dropped = self.row_filter.apply(chunk, state)
+            for name, count in dropped.items():
+                self.dropped[name] = self.dropped.get(name, 0) + count
+            yield kept
+
+    def _raw(self):
+        empty = True
+        for chunk in self.raw_chunks():
+            empty = False
+            yield chunk
+        if empty:
+            # A table without rows still gets its (unnamed) columns
+            yield pd.DataFrame({column: pd.Series(dtype=str) for column in range(self.width)})
+
+
+def _write_table(table: _ChunkedTable, final_excel_path: str, final_csv_path: str, parquet_path: str,
+                 feather_path: str, schema_json_path: str, coerce: bool = False) -> dict:
+    """Profile the table when types are needed, then stream its chunks into every output whose path is given."""
+    profiles = None
+    if coerce or parquet_path or feather_path:
+        for chunk in table.chunks():
+            if profiles is None:
+                profiles = [ColumnProfile() if coerce else _NumberProfile() for _ in chunk.columns]
+            for profile, (_, column) in zip(profiles, chunk.items()):
+                profile.update(column)
+        print(f"  [Profile] Decided the types of {len(profiles)} columns from every chunk.")
+
+    date_columns = {}
+    if coerce:
+        kinds = [profile.decide() for profile in profiles]
+        print(f"  [Types] Coerced {len(kinds)} columns: "
+              + ", ".join(f"{kind} {kinds.count(kind)}" for kind in dict.fromkeys(kinds)) + ".")
+        date_columns = {position: None if profile.dates_only else profile.fraction_digits
+                        for position, profile in enumerate(profiles) if profile.kind == "date"}
+    # (writer, whether it takes the typed chunks); Excel and CSV take the text unless types are coerced
+    writers = []
+    if final_excel_path:
+        writers.append((_ExcelAppender(final_excel_path), coerce))
+    if final_csv_path:
+        writers.append((_CsvAppender(final_csv_path, date_columns), coerce))
+    if parquet_path:
+        writers.append((_ParquetAppender(parquet_path), True))
+    if feather_path:
+        writers.append((_FeatherAppender(feather_path), True))
+    if coerce:
+        schema = [{"column": str(name), "kind": profile.kind, "dtype": str(profile.dtype), "non_null": 0,
+                   "nulls": 0, "bytes_before": 0, "bytes_after": 0}
+                  for name, profile in zip(table.header[1], profiles)]
+
+    rows = 0
+    try:
+        for chunk in table.chunks():
+            rows += len(chunk)
+            typed = None
+            if profiles is not None:
+                typed = pd.DataFrame({position: profile.convert(column)
+                                      for position, (profile, (_, column)) in enumerate(zip(profiles, chunk.items()))},
+                                     index=chunk.index)
+                typed.columns = chunk.columns
+            for writer, takes_typed in writers:
+                writer.write(typed if takes_typed else chunk)
+            if coerce:
+                for entry, (_, before), (_, after) in zip(schema, chunk.items(), typed.items()):
+                    entry["non_null"] += int(after.notna().sum())
+                    entry["nulls"] += int(after.isna().sum())
+                    entry["bytes_before"] += int(before.memory_usage(index=False, deep=True))
+                    entry["bytes_after"] += int(after.memory_usage(index=False, deep=True))
+    finally:
+        for writer, _ in writers:
+            writer.close()
+
+    if coerce and schema_json_path:
+        write_schema_report(schema, schema_json_path)
+        print(f"  [Save] Column schema report generated at '{schema_json_path}'")
+    for label, path in (("Excel", final_excel_path), ("CSV", final_csv_path), ("Parquet", parquet_path),
+                        ("Feather", feather_path)):
+        if path:
+            print(f"  [Save] Final clean {label} file generated at '{path}' ({rows} rows).")
+    return {"rows": rows, "columns": len(table.header[1])}
+
+
+class _NumberProfile:
+    """
+    Running summary of one text column deciding the type ``infer_column_types`` gives it for columnar outputs.
+
+    Used when types are not coerced: the column is numeric when every non-empty
+    cell of every chunk parses as a number, nullable Int64 when all are whole.
+    """
+
+    def __init__(self):
+        self.present = 0
+        self.numbers = self.whole = True
+        self.largest = 0.0
+        self.dtype = None
+
+    def update(self, column: pd.Series):
+        values = column.to_numpy(dtype=object)
+        count = int((~pd.isna(values)).sum())
+        self.present += count
+        if not count or not self.numbers:
+            return
+        numbers = pd.to_numeric(pd.Series(values, dtype=object), errors="coerce")
+        if numbers.notna().sum() != count:
+            self.numbers = False
+            return
+        present = numbers.dropna()
+        self.whole = self.whole and bool((present == present.round()).all())
+        self.largest = max(self.largest, float(present.abs().max()))
+        self.dtype = numbers.dtype if self.dtype is None else np.result_type(self.dtype, numbers.dtype)
+
+    def convert(self, column: pd.Series) -> pd.Series:
+        values = column.to_numpy(dtype=object)
+        if not (self.present and self.numbers):
+            return pd.Series(values, index=column.index, dtype="string")
+        numbers = pd.to_numeric(pd.Series(values, index=column.index, dtype=object), errors="coerce")
+        if self.whole and self.largest < 2 ** 53:
+            return numbers.astype("Int64")
+        return numbers.astype(self.dtype)
+
+
+class _CsvAppender:
+    """CSV output appended chunk by chunk; the header is written with the first chunk."""
+
+    def __init__(self, path: str, date_columns: dict = None):
+        self.path = path
+        # Date column position -> digits of fractional seconds, None for dates without times. pandas picks
+        # a date column's format from the values it writes, so every chunk gets the whole column's instead
+        self.date_columns = date_columns or {}
+        self.file = None
+
+    def write(self, chunk: pd.DataFrame):
+        header = self.file is None
+        if header:
+            self.file = open(self.path, "w", newline="", encoding="utf-8")
+        if self.date_columns:
+            chunk = chunk.copy()
+            for position, digits in self.date_columns.items():
+                chunk.isetitem(position, _date_text(chunk.iloc[:, position], digits))
+        chunk.to_csv(self.file, index=False, header=header)
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+
+def _date_text(dates: pd.Series, digits: int = None) -> pd.Series:
+    """Dates as pandas writes a whole column of them: the date only, or the time with ``digits`` of fractional seconds."""
+    if digits is None:
+        return dates.dt.strftime("%Y-%m-%d")
+    text = dates.dt.strftime("%Y-%m-%d %H:%M:%S")
+    if digits:
+        nanoseconds = dates.dt.microsecond * 1000 + dates.dt.nanosecond
+        fraction = nanoseconds.astype("Int64").astype(str).str.zfill(9).str[:digits]
+        text = (text + "." + fraction).where(dates.notna())
+    return text
+
+
+class _ExcelAppender:
+    """Excel output appended row by row through a write-only openpyxl workbook, which buffers on disk."""
+
+    def __init__(self, path: str):
+        from openpyxl import Workbook
+
+        self.path = path
+        self.book = Workbook(write_only=True)
+        self.sheet = self.book.create_sheet("Sheet1")
+        self.header = False
+
+    def write(self, chunk: pd.DataFrame):
+        from openpyxl.cell import WriteOnlyCell
+
+        if not self.header:
+            self.sheet.append(list(chunk.columns))
+            self.header = True
+        dates = [position for position, dtype in enumerate(chunk.dtypes) if dtype.kind == "M"]
+        # Empty cells are written as empty text, like pandas' na_rep
+        values = chunk.astype(object).where(chunk.notna(), "")
+        for row in values.itertuples(index=False, name=None):
+            if dates:
+                row = list(row)
+                for position in dates:
+                    if row[position] != "":
+                        cell = WriteOnlyCell(self.sheet, value=row[position])
+                        cell.number_format = EXCEL_DATETIME_FORMAT
+                        row[position] = cell
+            self.sheet.append(row)
+
+    def close(self):
+        self.book.save(self.path)
+
+
+class _ParquetAppender:
+    """Parquet output with one row group per chunk."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.writer = None
+
+    def write(self, chunk: pd.DataFrame):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.path, table.schema)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+class _FeatherAppender:
+    """Uncompressed Feather (Arrow IPC file) output with one record batch per chunk, so readers can memory-map it."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.writer = None
+
+    def write(self, chunk: pd.DataFrame):
+        import pyarrow as pa
+
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        if self.writer is None:
+            self.writer = pa.ipc.new_file(self.path, table.schema,
+                                          options=pa.ipc.IpcWriteOptions(compression=None))
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
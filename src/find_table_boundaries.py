@@ -1,70 +1,233 @@
 # script_a_find_table_boundaries.py
 
 import pandas as pd
-import openai
 import json
 import os
-import sys
-from dotenv import load_dotenv # <-- FIX: Re-import load_dotenv
 
-# --- FIX: Load environment variables from .env file ---
-load_dotenv()
-
-# --- FIX: Add a robust pre-flight check for the API key ---
-api_key = os.getenv("OPENAI_API_KEY")
-if not api_key:
-    print("--- CRITICAL ERROR in Script A: OpenAI API key not found. ---")
-    print("--- Please ensure your .env file exists and contains the OPENAI_API_KEY. ---")
-    sys.exit(1)
-openai.api_key = api_key
+from heuristic_boundaries import detect_table_boundaries
+from sheet_sampler import sample_sheet
+from prompt_encoding import (
+    encode_compact, count_tokens, token_counter, DEFAULT_PROMPT_ENCODING, DEFAULT_TOKEN_BUDGET, PROMPT_ENCODINGS,
+)
+from table_regions import find_table_blocks, block_grid, whole_sheet_block, sheet_boundaries
+from xlsx_reader import read_grid, DEFAULT_READER
+from stage_registry import BOUNDARY_ENGINES, DEFAULT_CONFIDENCE_THRESHOLD
 
 SAMPLE_ROW_COUNT = 40
+LLM_MODEL = "gpt-4-turbo"
+
+BOUNDARY_PROMPT = (
+    "You are a meticulous data analyst. Your task is to find the exact boundaries of the main data table in the provided text from an Excel sheet.\n\n"
+    "1.  **header_start_index**: Find the row index for the primary header row. This is the row containing the main column titles, located *immediately above* the first row of actual data. The index is the number on the far left.\n"
+    "2.  **data_end_index**: Find the row index for the final row of data. This is the last entry before any summary totals or footnotes (e.g., '/1 Source...').\n\n"
+    "Analyze carefully. Respond with ONLY a JSON object. For example: {\"header_start_index\": 3, \"data_end_index\": 52}"
+)
+
+
+def _configure_openai():
+    """
+    Pre-flight check for the API key, run only when a sheet actually needs the LLM.
+
+    Offline engines never call this, so they work on machines without a key and
+    never import openai or dotenv. Returns the configured ``openai`` module.
+    """
+    import openai
+    from dotenv import load_dotenv
+
+    # Read the .env file here rather than at import time, so importing this module has no side effects
+    load_dotenv()
+    # --- FIX: Add a robust pre-flight check for the API key ---
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        print("--- CRITICAL ERROR in Script A: OpenAI API key not found. ---")
+        print("--- Please ensure your .env file exists and contains the OPENAI_API_KEY. ---")
+        raise RuntimeError("OpenAI API key not found (OPENAI_API_KEY).")
+    openai.api_key = api_key
+    return openai
+
 
-def find_table_boundaries(file_path: str, output_json_path: str):
+def _build_sheet_text(df: pd.DataFrame, total_rows: int = None, prompt_encoding: str = DEFAULT_PROMPT_ENCODING,
+                      token_budget: int = DEFAULT_TOKEN_BUDGET) -> str:
+    """
+    Render the sheet, or a head/tail sample of large sheets, as prompt text.
+
+    ``df`` is either the full grid or a ``sheet_sampler`` sample, whose index holds
+    the row positions in the full sheet and whose ``total_rows`` is passed along.
+    ``prompt_encoding`` is 'table' (``to_string``) or 'compact' (see
+    ``prompt_encoding``, kept within ``token_budget``).
+    """
+    total_rows = len(df) if total_rows is None else total_rows
+    if prompt_encoding not in PROMPT_ENCODINGS:
+        raise ValueError(f"Unknown prompt encoding '{prompt_encoding}'. Expected one of: {', '.join(PROMPT_ENCODINGS)}")
+    if total_rows > (SAMPLE_ROW_COUNT * 2):
+        print(f"  [Sample] File is large. Creating a sample of the first and last {SAMPLE_ROW_COUNT} rows.")
+    else:
+        print("  [Sample] File is small. Using the full content.")
+
+    if prompt_encoding == "compact":
+        sheet_text = encode_compact(df, total_rows, SAMPLE_ROW_COUNT, LLM_MODEL, token_budget)
+    elif total_rows > (SAMPLE_ROW_COUNT * 2):
+        head_df = df.head(SAMPLE_ROW_COUNT)
+        tail_df = df.tail(SAMPLE_ROW_COUNT)
+        sheet_text = (
+            head_df.to_string(index=True, header=False) +
+            "\n\n [... OMITTED MIDDLE ROWS ...] \n\n" +
+            tail_df.to_string(index=True, header=False)
+        )
+    else:
+        sheet_text = df.to_string(index=True, header=False)
+    return sheet_text
+
+
+def _prompt_stats(sheet_text: str, prompt_encoding: str) -> dict:
+    """Count and report the tokens of a sheet text; returns the fields LLM results record."""
+    tokens = count_tokens(sheet_text, LLM_MODEL)
+    print(f"  [Prompt] {prompt_encoding} encoding: {tokens} tokens "
+          f"({len(sheet_text)} characters, counted with {token_counter(LLM_MODEL)}).")
+    return {"prompt_encoding": prompt_encoding, "prompt_tokens": tokens}
+
+
+def _ask_llm_for_boundaries(df: pd.DataFrame, cache=None, total_rows: int = None,
+                            prompt_encoding: str = DEFAULT_PROMPT_ENCODING,
+                            token_budget: int = DEFAULT_TOKEN_BUDGET) -> dict:
+    """
+    Send the sampled sheet to the model and return its validated boundaries.
+
+    ``df`` may already be a head/tail sample of a sheet with ``total_rows`` rows.
+    The result records the prompt encoding and the sheet text's token count.
+
+    With a ``BoundaryCache``, a result stored for the same sheet text, prompt and
+    model is returned without any network call.
+    """
+    df_string = _build_sheet_text(df, total_rows, prompt_encoding, token_budget)
+    prompt = _prompt_stats(df_string, prompt_encoding)
+
+    cache_key = None
+    if cache is not None:
+        cache_key = cache.make_key(df_string, BOUNDARY_PROMPT, LLM_MODEL)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            print(f"  [Cache] Reusing cached boundaries: header start {cached['header_start_index']}, "
+                  f"data end {cached['data_end_index']}")
+            return {**cached, **prompt}
+
+    openai = _configure_openai()
+    response = openai.chat.completions.create(
+        model=LLM_MODEL,
+        messages=[{"role": "system", "content": BOUNDARY_PROMPT}, {"role": "user", "content": df_string}],
+        response_format={"type": "json_object"}
+    )
+
+    boundaries = json.loads(response.choices[0].message.content)
+
+    if 'header_start_index' not in boundaries or 'data_end_index' not in boundaries:
+        raise ValueError("AI response did not contain the required keys.")
+
+    print(f"  [AI] Identified header start: {boundaries['header_start_index']}, data end: {boundaries['data_end_index']}")
+    if cache is not None:
+        cache.put(cache_key, boundaries)
+    return {**boundaries, **prompt}
+
+
+def _detect_boundaries(df: pd.DataFrame, engine: str, confidence_threshold: float, cache=None,
+                       prompt_encoding: str = DEFAULT_PROMPT_ENCODING, token_budget: int = DEFAULT_TOKEN_BUDGET) -> dict:
+    """Find the boundaries of the one table of ``df`` with ``engine``, see ``find_table_boundaries``."""
+    if engine == "llm":
+        boundaries = _ask_llm_for_boundaries(df, cache, None, prompt_encoding, token_budget)
+        boundaries["engine"] = "llm"
+        return boundaries
+
+    boundaries = detect_table_boundaries(df)
+    boundaries["engine"] = "heuristic"
+    print(f"  [Heuristic] Identified header start: {boundaries['header_start_index']}, "
+          f"data end: {boundaries['data_end_index']} (confidence {boundaries['confidence']:.2f})")
+    if engine == "hybrid" and boundaries["confidence"] < confidence_threshold:
+        print(f"  [Heuristic] Confidence below {confidence_threshold:.2f}; escalating to the LLM.")
+        heuristic_confidence = boundaries["confidence"]
+        boundaries = _ask_llm_for_boundaries(df, cache, None, prompt_encoding, token_budget)
+        boundaries["engine"] = "llm"
+        boundaries["heuristic_confidence"] = heuristic_confidence
+    return boundaries
+
+
+def _find_tables(df: pd.DataFrame, engine: str, confidence_threshold: float, cache=None,
+                 prompt_encoding: str = DEFAULT_PROMPT_ENCODING, token_budget: int = DEFAULT_TOKEN_BUDGET) -> dict:
+    """Boundaries of every table block of ``df``, as ``{'tables': [...]}`` in sheet row positions."""
+    blocks = find_table_blocks(df) or [whole_sheet_block(df)]
+    print(f"  [Tables] Found {len(blocks)} table block(s) on the sheet.")
+    tables = []
+    for n, block in enumerate(blocks, start=1):
+        print(f"  [Table {n}] Rows {block['row_start']}-{block['row_end']}, "
+              f"columns {block['col_start']}-{block['col_end']}.")
+        boundaries = _detect_boundaries(block_grid(df, block), engine, confidence_threshold, cache,
+                                        prompt_encoding, token_budget)
+        tables.append(sheet_boundaries(block, boundaries))
+    return {"tables": tables}
+
+
+def find_table_boundaries(file_path: str, output_json_path: str = None, df: pd.DataFrame = None,
+                          engine: str = "llm", confidence_threshold: float = DEFAULT_CONFIDENCE_THRESHOLD,
+                          cache=None, multi_table: bool = False, prompt_encoding: str = DEFAULT_PROMPT_ENCODING,
+                          token_budget: int = DEFAULT_TOKEN_BUDGET, reader: str = DEFAULT_READER) -> dict:
     """
     Uses pandas to read the original file and AI to find the precise table boundaries.
     Samples large files to avoid token limits and uses a robust prompt.
+
+    When ``df`` is given it is used as the already-parsed sheet grid (as read with
+    ``header=None, dtype=str``) and ``file_path`` is not read. The boundaries are
+    returned, and written to ``output_json_path`` only when a path is given.
+
+    ``engine`` selects how boundaries are found: 'llm' (the model), 'heuristic'
+    (the offline detector in ``heuristic_boundaries``, no network access needed)
+    or 'hybrid' (the offline detector, escalating to the model only when its
+    confidence is below ``confidence_threshold``). The result records the engine
+    that produced it and, for offline results, the detector's confidence.
+
+    ``cache`` is an optional ``boundary_cache.BoundaryCache``; LLM results are
+    looked up there before any request is sent and stored after a successful one.
+
+    With the 'llm' engine and no ``df``, only the head and tail rows the prompt
+    uses are read, in one streaming pass (see ``sheet_sampler``). The offline
+    detector scores every row, so the other engines read the full sheet.
+
+    With ``multi_table`` every table block of the sheet is located first (see
+    ``table_regions``) and the engine runs on each block on its own. The result is
+    then ``{'tables': [...]}``: per block its 'row_start', 'row_end', 'col_start'
+    and 'col_end' and its boundaries, all as sheet positions.
+
+    ``prompt_encoding`` selects how sheet rows are written into the LLM prompt:
+    'table' (``to_string``, the default) or 'compact' (run-length encoded empty
+    cells, cut cell text, no empty columns, within ``token_budget`` tokens; see
+    ``prompt_encoding``). LLM results record the encoding and the prompt's tokens.
+
+    ``reader`` selects the parser for full-sheet reads: 'openpyxl' (``pd.read_excel``,
+    the default) or 'fast' (the streaming parser in ``xlsx_reader``); both return
+    the same grid. The head/tail sample above is always streamed with openpyxl.
     """
+    if engine not in BOUNDARY_ENGINES:
+        raise ValueError(f"Unknown boundary engine '{engine}'. Expected one of: {', '.join(BOUNDARY_ENGINES)}")
+
     print("--- Step A: Finding Table Boundaries using Pandas ---")
     try:
-        df = pd.read_excel(file_path, header=None, sheet_name=0, dtype=str)
-
-        if len(df) > (SAMPLE_ROW_COUNT * 2):
-            print(f"  [Sample] File is large. Creating a sample of the first and last {SAMPLE_ROW_COUNT} rows.")
-            head_df = df.head(SAMPLE_ROW_COUNT)
-            tail_df = df.tail(SAMPLE_ROW_COUNT)
-            df_string = (
-                head_df.to_string(index=True, header=False) +
-                "\n\n [... OMITTED MIDDLE ROWS ...] \n\n" +
-                tail_df.to_string(index=True, header=False)
-            )
+        if df is None and engine == "llm" and not multi_table:
+            sample = sample_sheet(file_path, SAMPLE_ROW_COUNT)
+            print(f"  [Sample] Streamed {sample.total_rows} rows; kept {len(sample.frame)} for the prompt.")
+            boundaries = _ask_llm_for_boundaries(sample.frame, cache, sample.total_rows, prompt_encoding, token_budget)
+            boundaries["engine"] = "llm"
         else:
-            print("  [Sample] File is small. Using the full content.")
-            df_string = df.to_string(index=True, header=False)
-
-        prompt = (
-            "You are a meticulous data analyst. Your task is to find the exact boundaries of the main data table in the provided text from an Excel sheet.\n\n"
-            "1.  **header_start_index**: Find the row index for the primary header row. This is the row containing the main column titles, located *immediately above* the first row of actual data. The index is the number on the far left.\n"
-            "2.  **data_end_index**: Find the row index for the final row of data. This is the last entry before any summary totals or footnotes (e.g., '/1 Source...').\n\n"
-            "Analyze carefully. Respond with ONLY a JSON object. For example: {\"header_start_index\": 3, \"data_end_index\": 52}"
-        )
-
-        response = openai.chat.completions.create(
-            model="gpt-4-turbo",
-            messages=[{"role": "system", "content": prompt}, {"role": "user", "content": df_string}],
-            response_format={"type": "json_object"}
-        )
-        
-        boundaries = json.loads(response.choices[0].message.content)
-        
-        if 'header_start_index' not in boundaries or 'data_end_index' not in boundaries:
-            raise ValueError("AI response did not contain the required keys.")
+            if df is None:
+                df = read_grid(file_path, 0, reader)
+            if multi_table:
+                boundaries = _find_tables(df, engine, confidence_threshold, cache, prompt_encoding, token_budget)
+            else:
+                boundaries = _detect_boundaries(df, engine, confidence_threshold, cache, prompt_encoding, token_budget)
 
-        print(f"  [AI] Identified header start: {boundaries['header_start_index']}, data end: {boundaries['data_end_index']}")
-        with open(output_json_path, 'w') as f:
-            json.dump(boundaries, f, indent=4)
-        print(f"  [AI] Table boundaries saved to '{output_json_path}'")
+        if output_json_path:
+            with open(output_json_path, 'w') as f:
+                json.dump(boundaries, f, indent=4)
+            print(f"  [AI] Table boundaries saved to '{output_json_path}'")
+        return boundaries
 
     except Exception as e:
         print(f"  [Error] An error occurred in Script A: {e}")
-        raise
\ No newline at end of file
+        raise
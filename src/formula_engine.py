@@ -0,0 +1,883 @@
+"""
+Headless formula recalculation in pure Python.
+
+An alternative to driving Excel through xlwings for the refresh step. The
+workbook's formulas are parsed with openpyxl's tokenizer, a dependency graph of
+formula cells is built, and the formulas are evaluated in topological order.
+The results are then written into the cached ``<v>`` values of the sheet XML,
+so readers that open the file with ``data_only=True`` (openpyxl, pandas) see
+up-to-date numbers while the formulas themselves stay untouched.
+
+Supported:
+    - numbers, text, booleans, error values and cell/range references,
+      including other sheets, whole columns/rows and workbook-level defined names,
+    - arithmetic (``+ - * / ^``, unary minus, ``%``), ``&`` and comparisons,
+    - the functions listed in ``FUNCTIONS`` (SUM, AVERAGE, IF, VLOOKUP, ...).
+
+Formulas using anything else (array literals, external workbooks, unknown
+functions), and cells that are part of a circular reference, keep the value
+Excel cached for them last time. Data connections are not refreshed.
+"""
+
+import math
+import os
+import re
+import tempfile
+import zipfile
+from datetime import date, datetime, time
+from decimal import Decimal, ROUND_DOWN, ROUND_HALF_UP, ROUND_UP
+from graphlib import CycleError, TopologicalSorter
+from xml.sax.saxutils import escape
+
+import openpyxl
+from openpyxl.formula import Tokenizer
+from openpyxl.formula.tokenizer import Token
+from openpyxl.utils.cell import get_column_letter, range_boundaries
+from openpyxl.utils.datetime import to_excel
+from openpyxl.worksheet.formula import ArrayFormula
+
+from sheets_to_excel import _read_package
+
+# Ranges up to this many cells are expanded cell by cell when building the
+# dependency graph; larger ones are matched against the sheet's formula cells.
+EXPAND_RANGE_LIMIT = 4096
+
+CELL_PATTERN = re.compile(rb'<c\b([^>]*?)(?<!/)>(.*?)</c>', re.S)
+CELL_REF_ATTR = re.compile(rb'\br="\$?([A-Z]+)\$?(\d+)"')
+CELL_TYPE_ATTR = re.compile(rb'\s+t="[^"]*"')
+VALUE_ELEMENT = re.compile(rb'<v>.*?</v>|<v\s*/>', re.S)
+FORMULA_END = re.compile(rb'</f>|<f\b[^>]*/>')
+
+
+class ExcelError(str):
+    """An Excel error value such as ``#DIV/0!``; it flows through formulas like any other value."""
+
+
+DIV0 = ExcelError("#DIV/0!")
+NA = ExcelError("#N/A")
+NUM = ExcelError("#NUM!")
+REF = ExcelError("#REF!")
+VALUE = ExcelError("#VALUE!")
+
+
+class UnsupportedFormula(Exception):
+    """Raised for syntax or functions this engine does not implement."""
+
+
+class _ErrorResult(Exception):
+    """Short-circuits an evaluation whose operand is an error value."""
+
+    def __init__(self, error):
+        super().__init__(error)
+        self.error = error
+
+
+class CellRange:
+    """A rectangular block of cells on one sheet (1-based, inclusive bounds)."""
+
+    __slots__ = ("sheet", "min_row", "min_col", "max_row", "max_col")
+
+    def __init__(self, sheet, min_row, min_col, max_row, max_col):
+        self.sheet = sheet
+        self.min_row = min_row
+        self.min_col = min_col
+        self.max_row = max_row
+        self.max_col = max_col
+
+    @property
+    def size(self):
+        return (self.max_row - self.min_row + 1) * (self.max_col - self.min_col + 1)
+
+    def __contains__(self, key):
+        sheet, row, col = key
+        return (sheet == self.sheet and self.min_row <= row <= self.max_row
+                and self.min_col <= col <= self.max_col)
+
+
+class _Area(tuple):
+    """The evaluated values of a multi-cell range, as a tuple of rows."""
+
+
+# --- Parsing -----------------------------------------------------------------
+
+# Binding powers: comparisons < & < + - < * / < ^ < % < unary minus (so -2^2 is 4, as in Excel)
+_INFIX_POWER = {"=": 1, "<>": 1, "<": 1, ">": 1, "<=": 1, ">=": 1, "&": 2, "+": 3, "-": 3, "*": 4, "/": 4, "^": 5}
+_POSTFIX_POWER = 6
+_PREFIX_POWER = 7
+
+
+class _Parser:
+    """Pratt parser turning openpyxl formula tokens into a small tuple-based syntax tree."""
+
+    def __init__(self, formula: str, resolve_ref):
+        self.tokens = [token for token in Tokenizer(formula).items if token.type != Token.WSPACE]
+        self.pos = 0
+        self.resolve_ref = resolve_ref
+
+    def parse(self):
+        node = self._expression(0)
+        if self.pos != len(self.tokens):
+            raise UnsupportedFormula(f"unexpected '{self.tokens[self.pos].value}'")
+        return node
+
+    def _peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def _next(self):
+        token = self._peek()
+        if token is None:
+            raise UnsupportedFormula("unexpected end of formula")
+        self.pos += 1
+        return token
+
+    def _expression(self, min_power):
+        left = self._operand()
+        while True:
+            token = self._peek()
+            if token is None:
+                return left
+            if token.type == Token.OP_POST and _POSTFIX_POWER > min_power:
+                self.pos += 1
+                left = ("percent", left)
+                continue
+            if token.type != Token.OP_IN:
+                return left
+            power = _INFIX_POWER.get(token.value)
+            if power is None:
+                raise UnsupportedFormula(f"operator '{token.value}'")
+            if power <= min_power:
+                return left
+            self.pos += 1
+            left = ("binary", token.value, left, self._expression(power))
+
+    def _operand(self):
+        token = self._next()
+        if token.type == Token.OPERAND:
+            if token.subtype == Token.NUMBER:
+                return ("value", float(token.value))
+            if token.subtype == Token.TEXT:
+                return ("value", token.value[1:-1].replace('""', '"'))
+            if token.subtype == Token.LOGICAL:
+                return ("value", token.value.upper() == "TRUE")
+            if token.subtype == Token.ERROR:
+                return ("value", ExcelError(token.value))
+            return ("ref", self.resolve_ref(token.value))
+        if token.type == Token.OP_PRE:
+            operand = self._expression(_PREFIX_POWER)
+            return ("negate", operand) if token.value == "-" else operand
+        if token.type == Token.PAREN and token.subtype == Token.OPEN:
+            node = self._expression(0)
+            self._expect(Token.PAREN, Token.CLOSE)
+            return node
+        if token.type == Token.FUNC and token.subtype == Token.OPEN:
+            return self._call(token.value[:-1].upper().replace("_XLFN.", ""))
+        raise UnsupportedFormula(f"unexpected '{token.value}'")
+
+    def _call(self, name):
+        args = []
+        token = self._peek()
+        if token is not None and token.type == Token.FUNC and token.subtype == Token.CLOSE:
+            self.pos += 1
+            return ("call", name, args)
+        while True:
+            token = self._peek()
+            closes = token is not None and token.type == Token.FUNC and token.subtype == Token.CLOSE
+            if token is not None and token.type == Token.SEP or closes:
+                args.append(("value", None))  # omitted argument, e.g. IF(A1,,1)
+            else:
+                args.append(self._expression(0))
+            token = self._next()
+            if token.type == Token.FUNC and token.subtype == Token.CLOSE:
+                return ("call", name, args)
+            if token.type != Token.SEP or token.subtype != Token.ARG:
+                raise UnsupportedFormula(f"unexpected '{token.value}' in {name}()")
+
+    def _expect(self, token_type, subtype):
+        token = self._next()
+        if token.type != token_type or token.subtype != subtype:
+            raise UnsupportedFormula(f"unexpected '{token.value}'")
+
+
+def _collect_ranges(node, found):
+    """Append every ``CellRange`` referenced by a syntax tree to ``found``."""
+    kind = node[0]
+    if kind == "ref":
+        found.append(node[1])
+    elif kind in ("negate", "percent"):
+        _collect_ranges(node[1], found)
+    elif kind == "binary":
+        _collect_ranges(node[2], found)
+        _collect_ranges(node[3], found)
+    elif kind == "call":
+        for arg in node[2]:
+            _collect_ranges(arg, found)
+    return found
+
+
+# --- Value coercion ----------------------------------------------------------
+
+def _scalar(value):
+    """Reduce a value to a single cell value, raising on error values."""
+    if isinstance(value, _Area):
+        if len(value) == 1 and len(value[0]) == 1:
+            value = value[0][0]
+        else:
+            raise _ErrorResult(VALUE)
+    if isinstance(value, ExcelError):
+        raise _ErrorResult(value)
+    return value
+
+
+def _to_number(value):
+    value = _scalar(value)
+    if value is None:
+        return 0.0
+    if isinstance(value, (bool, int, float)):
+        return float(value)
+    try:
+        return float(value.strip())
+    except ValueError:
+        raise _ErrorResult(VALUE)
+
+
+def _to_text(value):
+    value = _scalar(value)
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, float):
+        return str(int(value)) if value.is_integer() else format(value, ".15g")
+    return str(value)
+
+
+def _to_bool(value):
+    value = _scalar(value)
+    if value is None:
+        return False
+    if isinstance(value, (bool, int, float)):
+        return bool(value)
+    if value.upper() in ("TRUE", "FALSE"):
+        return value.upper() == "TRUE"
+    raise _ErrorResult(VALUE)
+
+
+def _rank(value):
+    # Excel orders numbers < text < booleans
+    if isinstance(value, bool):
+        return 2
+    if isinstance(value, str):
+        return 1
+    return 0
+
+
+def _compare(left, right) -> int:
+    """Excel comparison of two cell values: -1, 0 or 1 (text compares case-insensitively)."""
+    if left is None:
+        left = "" if isinstance(right, str) else (False if isinstance(right, bool) else 0.0)
+    if right is None:
+        right = "" if isinstance(left, str) else (False if isinstance(left, bool) else 0.0)
+    if _rank(left) != _rank(right):
+        return -1 if _rank(left) < _rank(right) else 1
+    if isinstance(left, str):
+        left, right = left.lower(), right.lower()
+    return (left > right) - (left < right)
+
+
+def _values(args):
+    """Yield ``(value, from_range)`` for every value in the arguments, flattening ranges."""
+    for arg in args:
+        if isinstance(arg, _Area):
+            for row in arg:
+                for value in row:
+                    yield value, True
+        else:
+            yield arg, False
+
+
+def _numbers(args):
+    """
+    Numbers of the arguments the way SUM and friends see them: inside ranges only
+    numeric cells count, direct arguments are coerced. Error values propagate.
+    """
+    numbers = []
+    for value, from_range in _values(args):
+        if isinstance(value, ExcelError):
+            raise _ErrorResult(value)
+        if from_range:
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                numbers.append(float(value))
+        elif value is not None:
+            numbers.append(_to_number(value))
+    return numbers
+
+
+def _criteria_matcher(criteria):
+    """Build the predicate behind SUMIF/COUNTIF criteria such as 5, ">=10", "<>x" or "ab*"."""
+    criteria = _scalar(criteria)
+    operator = "="
+    if isinstance(criteria, str):
+        match = re.match(r"^(<=|>=|<>|<|>|=)?(.*)$", criteria, re.S)
+        operator = match.group(1) or "="
+        operand = match.group(2)
+        try:
+            operand = float(operand)
+        except ValueError:
+            pass
+    else:
+        operand = criteria
+
+    if isinstance(operand, str) and operator in ("=", "<>") and any(ch in operand for ch in "*?"):
+        pattern = re.compile(
+            "^" + "".join(".*" if ch == "*" else "." if ch == "?" else re.escape(ch) for ch in operand) + "$",
+            re.I | re.S,
+        )
+        matches = lambda value: isinstance(value, str) and bool(pattern.match(value))
+        return matches if operator == "=" else (lambda value: not matches(value))
+
+    def predicate(value):
+        if isinstance(value, ExcelError):
+            return False
+        if operator == "<>":
+            return value is None or _rank(value) != _rank(operand) or _compare(value, operand) != 0
+        if value is None or _rank(value) != _rank(operand):
+            return False
+        result = _compare(value, operand)
+        return {"=": result == 0, "<": result < 0, ">": result > 0, "<=": result <= 0, ">=": result >= 0}[operator]
+
+    return predicate
+
+
+def _round(value, digits, rounding):
+    number = _to_number(value)
+    exponent = Decimal(1).scaleb(-int(_to_number(digits)))
+    return float(Decimal(repr(number)).quantize(exponent, rounding=rounding))
+
+
+# --- Functions ---------------------------------------------------------------
+
+def _average(*args):
+    numbers = _numbers(args)
+    if not numbers:
+        raise _ErrorResult(DIV0)
+    return sum(numbers) / len(numbers)
+
+
+def _count(*args):
+    count = 0
+    for value, from_range in _values(args):
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            count += 1
+        elif not from_range and value is not None and not isinstance(value, ExcelError):
+            try:
+                _to_number(value)
+                count += 1
+            except _ErrorResult:
+                pass
+    return float(count)
+
+
+def _logical(args, combine):
+    flags = []
+    for value, from_range in _values(args):
+        if isinstance(value, ExcelError):
+            raise _ErrorResult(value)
+        if from_range and (value is None or isinstance(value, str)):
+            continue
+        flags.append(_to_bool(value))
+    if not flags:
+        raise _ErrorResult(VALUE)
+    return combine(flags)
+
+
+def _if(condition, if_true=True, if_false=False):
+    return if_true if _to_bool(condition) else if_false
+
+
+def _iferror(value, fallback):
+    if isinstance(value, _Area):
+        return value
+    return fallback if isinstance(value, ExcelError) else value
+
+
+def _ifna(value, fallback):
+    return fallback if isinstance(value, ExcelError) and value == NA else value
+
+
+def _product(numbers):
+    return math.prod(numbers) if numbers else 0.0
+
+
+def _mod(number, divisor):
+    divisor = _to_number(divisor)
+    if divisor == 0:
+        raise _ErrorResult(DIV0)
+    return _to_number(number) % divisor
+
+
+def _lookup_position(lookup, keys, approximate):
+    """Position of ``lookup`` among ``keys``; approximate mode takes the last key not above it."""
+    lookup = _scalar(lookup)
+    found = None
+    for position, key in enumerate(keys):
+        if key is None or isinstance(key, ExcelError) or _rank(key) != _rank(lookup):
+            continue
+        result = _compare(key, lookup)
+        if result == 0 and not approximate:
+            return position
+        if approximate:
+            if result > 0:
+                break
+            found = position
+    if found is None:
+        raise _ErrorResult(NA)
+    return found
+
+
+def _vlookup(lookup, table, col_index, range_lookup=True):
+    if not isinstance(table, _Area):
+        table = _Area(((table,),))
+    col = int(_to_number(col_index))
+    if col < 1:
+        raise _ErrorResult(VALUE)
+    if col > len(table[0]):
+        raise _ErrorResult(REF)
+    position = _lookup_position(lookup, [row[0] for row in table], _to_bool(range_lookup))
+    return table[position][col - 1]
+
+
+def _hlookup(lookup, table, row_index, range_lookup=True):
+    if not isinstance(table, _Area):
+        table = _Area(((table,),))
+    row = int(_to_number(row_index))
+    if row < 1:
+        raise _ErrorResult(VALUE)
+    if row > len(table):
+        raise _ErrorResult(REF)
+    position = _lookup_position(lookup, list(table[0]), _to_bool(range_lookup))
+    return table[row - 1][position]
+
+
+def _match(lookup, area, match_type=1.0):
+    if not isinstance(area, _Area):
+        area = _Area(((area,),))
+    keys = [value for row in area for value in row]
+    match_type = _to_number(match_type)
+    if match_type < 0:
+        raise UnsupportedFormula("MATCH with match_type -1")
+    return float(_lookup_position(lookup, keys, match_type > 0) + 1)
+
+
+def _index(area, row_num, col_num=None):
+    if not isinstance(area, _Area):
+        area = _Area(((area,),))
+    row = int(_to_number(row_num))
+    col = int(_to_number(col_num)) if col_num is not None else 1
+    if len(area) == 1 and col_num is None:
+        row, col = 1, row  # INDEX over a single row takes the position as the column
+    if row < 1 or col < 1 or row > len(area) or col > len(area[0]):
+        raise _ErrorResult(REF)
+    return area[row - 1][col - 1]
+
+
+def _sumif(area, criteria, sum_area=None):
+    predicate = _criteria_matcher(criteria)
+    sum_area = area if sum_area is None else sum_area
+    total = 0.0
+    for row, sum_row in zip(area, sum_area):
+        for value, addend in zip(row, sum_row):
+            if predicate(value) and isinstance(addend, (int, float)) and not isinstance(addend, bool):
+                total += addend
+    return total
+
+
+def _countif(area, criteria):
+    predicate = _criteria_matcher(criteria)
+    return float(sum(predicate(value) for value, _ in _values([area])))
+
+
+def _sumproduct(*areas):
+    if not all(isinstance(area, _Area) for area in areas):
+        return float(math.prod(_to_number(area) for area in areas))
+    shape = (len(areas[0]), len(areas[0][0]))
+    if any((len(area), len(area[0])) != shape for area in areas):
+        raise _ErrorResult(VALUE)
+    total = 0.0
+    for rows in zip(*areas):
+        for values in zip(*rows):
+            for value in values:
+                if isinstance(value, ExcelError):
+                    raise _ErrorResult(value)
+            numbers = [value if isinstance(value, (int, float)) and not isinstance(value, bool) else 0.0
+                       for value in values]
+            total += math.prod(numbers)
+    return total
+
+
+def _mid(text, start, length):
+    start, length = int(_to_number(start)), int(_to_number(length))
+    if start < 1 or length < 0:
+        raise _ErrorResult(VALUE)
+    return _to_text(text)[start - 1:start - 1 + length]
+
+
+def _left(text, count=1.0):
+    count = int(_to_number(count))
+    if count < 0:
+        raise _ErrorResult(VALUE)
+    return _to_text(text)[:count]
+
+
+def _right(text, count=1.0):
+    count = int(_to_number(count))
+    if count < 0:
+        raise _ErrorResult(VALUE)
+    return _to_text(text)[len(_to_text(text)) - count:] if count else ""
+
+
+def _power(base, exponent):
+    try:
+        result = base ** exponent
+    except ZeroDivisionError:
+        raise _ErrorResult(DIV0)
+    except OverflowError:
+        raise _ErrorResult(NUM)
+    if isinstance(result, complex):
+        raise _ErrorResult(NUM)
+    return result
+
+
+FUNCTIONS = {
+    "SUM": lambda *args: sum(_numbers(args)),
+    "AVERAGE": _average,
+    "MIN": lambda *args: min(_numbers(args), default=0.0),
+    "MAX": lambda *args: max(_numbers(args), default=0.0),
+    "PRODUCT": lambda *args: _product(_numbers(args)),
+    "COUNT": _count,
+    "COUNTA": lambda *args: float(sum(value is not None for value, _ in _values(args))),
+    "COUNTBLANK": lambda area: float(sum(value is None or value == "" for value, _ in _values([area]))),
+    "SUMIF": _sumif,
+    "COUNTIF": _countif,
+    "SUMPRODUCT": _sumproduct,
+    "ROUND": lambda value, digits=0.0: _round(value, digits, ROUND_HALF_UP),
+    "ROUNDUP": lambda value, digits=0.0: _round(value, digits, ROUND_UP),
+    "ROUNDDOWN": lambda value, digits=0.0: _round(value, digits, ROUND_DOWN),
+    "INT": lambda value: float(math.floor(_to_number(value))),
+    "ABS": lambda value: abs(_to_number(value)),
+    "MOD": _mod,
+    "IF": _if,
+    "IFERROR": _iferror,
+    "IFNA": _ifna,
+    "AND": lambda *args: _logical(args, all),
+    "OR": lambda *args: _logical(args, any),
+    "NOT": lambda value: not _to_bool(value),
+    "ISBLANK": lambda value: value is None,
+    "ISERROR": lambda value: isinstance(value, ExcelError),
+    "ISNA": lambda value: isinstance(value, ExcelError) and value == NA,
+    "ISNUMBER": lambda value: isinstance(value, (int, float)) and not isinstance(value, bool),
+    "ISTEXT": lambda value: isinstance(value, str) and not isinstance(value, ExcelError),
+    "VLOOKUP": _vlookup,
+    "HLOOKUP": _hlookup,
+    "MATCH": _match,
+    "INDEX": _index,
+    "CONCATENATE": lambda *args: "".join(_to_text(arg) for arg in args),
+    "CONCAT": lambda *args: "".join(_to_text(value) for value, _ in _values(args)),
+    "LEN": lambda text: float(len(_to_text(text))),
+    "LEFT": _left,
+    "RIGHT": _right,
+    "MID": _mid,
+    "UPPER": lambda text: _to_text(text).upper(),
+    "LOWER": lambda text: _to_text(text).lower(),
+    "TRIM": lambda text: re.sub(" +", " ", _to_text(text).strip(" ")),
+    "VALUE": lambda text: _to_number(text),
+}
+
+
+# --- Workbook evaluation -----------------------------------------------------
+
+class _Workbook:
+    """Cell values and formulas of one workbook, and the evaluation state."""
+
+    def __init__(self, path: str):
+        self.path = path
+        wb = openpyxl.load_workbook(path)
+        self.sheet_names = wb.sheetnames
+        self.defined_names = {name: defined.attr_text for name, defined in wb.defined_names.items()}
+        self.bounds = {}
+        self.constants = {}
+        self.formulas = {}
+        for ws in wb.worksheets:
+            self.bounds[ws.title] = (ws.max_row, ws.max_column)
+            # Only stored cells; iter_rows() would create every empty cell in the used range
+            for (row, col), cell in ws._cells.items():
+                value = cell.value
+                key = (ws.title, row, col)
+                if isinstance(value, ArrayFormula):
+                    self.formulas[key] = value.text if value.ref in (None, cell.coordinate) else None
+                elif cell.data_type == "f" and isinstance(value, str):
+                    self.formulas[key] = value
+                elif isinstance(value, (datetime, date, time)):
+                    self.constants[key] = to_excel(value, wb.epoch)
+                elif isinstance(value, int) and not isinstance(value, bool):
+                    self.constants[key] = float(value)
+                elif value is not None:
+                    self.constants[key] = value
+        wb.close()
+        self.results = {}
+        self._cached = None
+
+    def resolve_ref(self, reference: str, sheet: str) -> CellRange:
+        if reference.startswith("["):
+            raise UnsupportedFormula(f"external reference {reference}")
+        if "!" in reference:
+            sheet, reference = reference.rsplit("!", 1)
+            if sheet.startswith("'"):
+                sheet = sheet[1:-1].replace("''", "'")
+        if sheet not in self.bounds:
+            raise UnsupportedFormula(f"reference to sheet '{sheet}', which is not in this workbook")
+        try:
+            min_col, min_row, max_col, max_row = range_boundaries(reference.replace("$", ""))
+        except ValueError:
+            target = self.defined_names.get(reference)
+            if target is None or "," in target:
+                raise UnsupportedFormula(f"unknown name {reference}")
+            return self.resolve_ref(target, sheet)
+        max_rows, max_cols = self.bounds[sheet]
+        return CellRange(sheet, min_row or 1, min_col or 1, max_row or max_rows, max_col or max_cols)
+
+    def value_at(self, sheet, row, col):
+        key = (sheet, row, col)
+        if key in self.results:
+            return self.results[key]
+        return self.constants.get(key)
+
+    def cached_value(self, key):
+        """The value Excel last cached for a formula cell, used when the engine cannot evaluate it."""
+        if self._cached is None:
+            wb = openpyxl.load_workbook(self.path, data_only=True)
+            self._cached = {}
+            for ws in wb.worksheets:
+                for (row, col), cell in ws._cells.items():
+                    if (ws.title, row, col) in self.formulas:
+                        value = cell.value
+                        if isinstance(value, (datetime, date, time)):
+                            value = to_excel(value, wb.epoch)
+                        self._cached[(ws.title, row, col)] = value
+            wb.close()
+        return self._cached.get(key)
+
+    def evaluate(self, node):
+        kind = node[0]
+        if kind == "value":
+            return node[1]
+        if kind == "ref":
+            area = node[1]
+            if area.size == 1:
+                return self.value_at(area.sheet, area.min_row, area.min_col)
+            return _Area(
+                tuple(self.value_at(area.sheet, row, col) for col in range(area.min_col, area.max_col + 1))
+                for row in range(area.min_row, area.max_row + 1)
+            )
+        if kind == "negate":
+            return -_to_number(self.evaluate(node[1]))
+        if kind == "percent":
+            return _to_number(self.evaluate(node[1])) / 100
+        if kind == "binary":
+            return self._binary(node[1], self.evaluate(node[2]), self.evaluate(node[3]))
+        function = FUNCTIONS.get(node[1])
+        if function is None:
+            raise UnsupportedFormula(f"function {node[1]}")
+        args = []
+        for arg in node[2]:
+            try:
+                args.append(self.evaluate(arg))
+            except _ErrorResult as e:
+                args.append(e.error)
+        try:
+            return function(*args)
+        except TypeError:
+            raise UnsupportedFormula(f"{node[1]} with {len(args)} arguments")
+
+    @staticmethod
+    def _binary(operator, left, right):
+        if operator == "&":
+            return _to_text(left) + _to_text(right)
+        if operator in ("=", "<>", "<", ">", "<=", ">="):
+            result = _compare(_scalar(left), _scalar(right))
+            return {"=": result == 0, "<>": result != 0, "<": result < 0, ">": result > 0,
+                    "<=": result <= 0, ">=": result >= 0}[operator]
+        left, right = _to_number(left), _to_number(right)
+        if operator == "+":
+            return left + right
+        if operator == "-":
+            return left - right
+        if operator == "*":
+            return left * right
+        if operator == "/":
+            if right == 0:
+                raise _ErrorResult(DIV0)
+            return left / right
+        return _power(left, right)
+
+
+def recalculate_workbook(input_file_path: str) -> dict:
+    """
+    Recalculate every formula of a workbook in place and store the results as cached values.
+
+    Parameters
+    ----------
+    input_file_path : str
+        Path to the .xlsx workbook to update.
+
+    Returns
+    -------
+    dict
+        Counts of 'formulas', 'evaluated', 'unsupported' (kept their cached value)
+        and 'circular' (part of a reference cycle, kept their cached value).
+    """
+    book = _Workbook(input_file_path)
+
+    # Parse every formula and link it to the formula cells it reads
+    trees = {}
+    unsupported = set()
+    by_sheet = {}
+    for key in book.formulas:
+        by_sheet.setdefault(key[0], []).append(key)
+    graph = {}
+    for key, formula in book.formulas.items():
+        if formula is None:
+            unsupported.add(key)
+            continue
+        try:
+            tree = _Parser(formula, lambda ref, sheet=key[0]: book.resolve_ref(ref, sheet)).parse()
+        except (UnsupportedFormula, ValueError) as e:
+            print(f"  [Recalc] Keeping cached value of {key[0]}!{_coordinate(key)}: {e}")
+            unsupported.add(key)
+            continue
+        trees[key] = tree
+        dependencies = set()
+        for area in _collect_ranges(tree, []):
+            if area.size <= EXPAND_RANGE_LIMIT:
+                dependencies.update(
+                    (area.sheet, row, col)
+                    for row in range(area.min_row, area.max_row + 1)
+                    for col in range(area.min_col, area.max_col + 1)
+                    if (area.sheet, row, col) in book.formulas
+                )
+            else:
+                dependencies.update(cell for cell in by_sheet.get(area.sheet, ()) if cell in area)
+        graph[key] = dependencies
+
+    # Cells on a reference cycle cannot be ordered; they keep their cached values
+    circular = set()
+    while True:
+        try:
+            order = list(TopologicalSorter(graph).static_order())
+            break
+        except CycleError as e:
+            cycle = set(e.args[1])
+            circular |= cycle
+            for key in cycle:
+                graph.pop(key, None)
+            for dependencies in graph.values():
+                dependencies -= cycle
+
+    for key in unsupported | circular:
+        book.results[key] = book.cached_value(key)
+
+    evaluated = {}
+    for key in order:
+        if key not in trees or key in circular:
+            continue
+        try:
+            result = book.evaluate(trees[key])
+            if isinstance(result, _Area):
+                result = result[0][0]  # implicit intersection is not modelled; use the top-left value
+        except _ErrorResult as e:
+            result = e.error
+        except (UnsupportedFormula, ArithmeticError) as e:
+            print(f"  [Recalc] Keeping cached value of {key[0]}!{_coordinate(key)}: {e}")
+            unsupported.add(key)
+            book.results[key] = book.cached_value(key)
+            continue
+        book.results[key] = 0.0 if result is None else result
+        evaluated[key] = book.results[key]
+
+    _write_cached_values(input_file_path, evaluated)
+    stats = {"formulas": len(book.formulas), "evaluated": len(evaluated),
+             "unsupported": len(unsupported), "circular": len(circular)}
+    print(f"  [Recalc] Evaluated {stats['evaluated']} of {stats['formulas']} formulas "
+          f"({stats['unsupported']} unsupported, {stats['circular']} circular).")
+    return stats
+
+
+def _coordinate(key):
+    return f"{get_column_letter(key[2])}{key[1]}"
+
+
+def _column_index(letters: bytes) -> int:
+    index = 0
+    for letter in letters:
+        index = index * 26 + letter - 64
+    return index
+
+
+def _encode_value(value):
+    """Return the ``t`` attribute and ``<v>`` text that store ``value`` as a formula result."""
+    if isinstance(value, ExcelError):
+        return b' t="e"', escape(value).encode("utf-8")
+    if isinstance(value, bool):
+        return b' t="b"', b"1" if value else b"0"
+    if isinstance(value, str):
+        return b' t="str"', escape(value).encode("utf-8")
+    value = float(value)
+    if value.is_integer() and abs(value) < 1e15:
+        return b"", str(int(value)).encode("ascii")
+    return b"", repr(value).encode("ascii")
+
+
+def _write_cached_values(input_file_path: str, values: dict):
+    """Rewrite the ``<v>`` of every evaluated formula cell in the sheet XML, leaving all else untouched."""
+    if not values:
+        return
+    by_sheet = {}
+    for (sheet, row, col), value in values.items():
+        by_sheet.setdefault(sheet, {})[(row, col)] = value
+
+    with zipfile.ZipFile(input_file_path) as source:
+        parts = {sheet["part"]: by_sheet[sheet["name"]] for sheet in _read_package(source)["sheets"]
+                 if sheet["name"] in by_sheet}
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(input_file_path)), suffix=".xlsx")
+        os.close(fd)
+        try:
+            with zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_DEFLATED) as target:
+                for info in source.infolist():
+                    data = source.read(info.filename)
+                    if info.filename in parts:
+                        data = _rewrite_sheet_values(data, parts[info.filename])
+                    target.writestr(info, data)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+    os.replace(tmp_path, input_file_path)
+
+
+def _rewrite_sheet_values(xml: bytes, values: dict) -> bytes:
+    def replace(match):
+        attrs, body = match.group(1), match.group(2)
+        if b"<f" not in body:
+            return match.group(0)
+        ref = CELL_REF_ATTR.search(attrs)
+        if ref is None:
+            return match.group(0)
+        key = (int(ref.group(2)), _column_index(ref.group(1)))
+        if key not in values:
+            return match.group(0)
+        cell_type, text = _encode_value(values[key])
+        body = VALUE_ELEMENT.sub(b"", body)
+        formula_end = FORMULA_END.search(body)
+        position = formula_end.end() if formula_end else len(body)
+        body = body[:position] + b"<v>" + text + b"</v>" + body[position:]
+        return b"<c" + CELL_TYPE_ATTR.sub(b"", attrs) + cell_type + b">" + body + b"</c>"
+
+    return CELL_PATTERN.sub(replace, xml)
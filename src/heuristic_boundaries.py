@@ -0,0 +1,194 @@
+"""
+Offline table-boundary detection.
+
+Finds the same ``header_start_index`` / ``data_end_index`` pair that the LLM step
+returns, using a vectorized analysis of the sheet grid instead of a network call.
+The grid is expected in the shape ``pd.read_excel(..., header=None, dtype=str)``
+produces: positional row and column labels and NaN for empty cells.
+
+Signals used:
+    - row fill density relative to the table width,
+    - per-column type consistency (numeric vs. text) inside the data body,
+    - footer markers such as 'TOTAL', '/1 Source' or 'Note:' in the first filled cell,
+    - year-like numbers, which count as header text outside columns that hold years.
+
+Every result carries a ``confidence`` between 0 and 1 so callers can decide
+whether to trust it or escalate the sheet to the LLM.
+"""
+
+import numpy as np
+import pandas as pd
+
+from process_with_pandas import MAX_HEADER_ROWS
+from type_coercion import parse_numbers
+
+# Rows whose first filled cell matches this are totals or footnotes, never data.
+FOOTER_PATTERN = r"^(?:grand\s+)?totals?\b|^/\d+|^\(?\d+\)\s|^(?:sources?|notes?|footnotes?)\b|^\*"
+# Four-digit years are typical column-group headers ("2019 | 2020") and must not look like data.
+YEAR_PATTERN = r"^(?:19|20)\d{2}$"
+# Data rows separated by at most this many other rows still belong to the same body.
+MAX_BODY_GAP = 3
+# A row is dense when it fills at least this share of the table width.
+DENSE_ROW_RATIO = 0.5
+# A column is numeric when at least this share of its filled body cells are numbers.
+NUMERIC_COLUMN_RATIO = 0.6
+
+
+def detect_table_boundaries(df: pd.DataFrame) -> dict:
+    """
+    Detect the main table of a sheet grid without calling the LLM.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Sheet grid read with ``header=None, dtype=str``.
+
+    Returns
+    -------
+    dict
+        ``header_start_index`` and ``data_end_index`` (row positions in ``df``) and
+        ``confidence`` (0 to 1).
+    """
+    if df.empty:
+        return {"header_start_index": 0, "data_end_index": 0, "confidence": 0.0}
+
+    filled, numeric, year, first_text = _cell_features(df)
+    fill = filled.sum(axis=1)
+    filled_rows = np.flatnonzero(fill)
+    if filled_rows.size == 0:
+        return {"header_start_index": 0, "data_end_index": 0, "confidence": 0.0}
+
+    # Table width: the fill count most wide rows reach, robust to one stray wide row
+    width = max(float(np.percentile(fill[filled_rows], 90)), 1.0)
+    dense = fill >= max(2.0, DENSE_ROW_RATIO * width)
+    footer = pd.Series(first_text).str.contains(FOOTER_PATTERN, case=False, regex=True, na=False).to_numpy()
+
+    # Column types are learned from the dense rows, which are mostly data
+    dense_filled = filled[dense].sum(axis=0)
+    numeric_ratio = np.divide(numeric[dense].sum(axis=0), dense_filled,
+                              out=np.zeros(filled.shape[1]), where=dense_filled > 0)
+    numeric_cols = numeric_ratio >= NUMERIC_COLUMN_RATIO
+    year_ratio = np.divide(year[dense].sum(axis=0), dense_filled,
+                           out=np.zeros(filled.shape[1]), where=dense_filled > 0)
+    # A year only counts as a number in columns that actually hold years
+    numeric = numeric & ~(year & (year_ratio < NUMERIC_COLUMN_RATIO))
+
+    if numeric_cols.any():
+        # Share of filled cells in numeric columns that really are numbers, per row
+        typed_filled = filled[:, numeric_cols].sum(axis=1)
+        typed_numeric = numeric[:, numeric_cols].sum(axis=1)
+        row_type_score = np.divide(typed_numeric, typed_filled, out=np.zeros(len(fill)), where=typed_filled > 0)
+        data_like = dense & (row_type_score >= 0.5)
+    else:
+        # Text-only table: density is the only signal, the first dense row is the header
+        row_type_score = np.zeros(len(fill))
+        data_like = dense.copy()
+
+    data_rows = np.flatnonzero(data_like)
+    if data_rows.size == 0:
+        return {
+            "header_start_index": int(filled_rows[0]),
+            "data_end_index": int(filled_rows[-1]),
+            "confidence": 0.1,
+        }
+
+    # The body is the largest group of data rows with only small gaps between them
+    groups = np.split(data_rows, np.flatnonzero(np.diff(data_rows) > MAX_BODY_GAP + 1) + 1)
+    body = max(groups, key=len)
+    first_data = int(body[0])
+
+    # Trailing totals are data-like but not data; interior subtotals are filtered later
+    non_footer = body[~footer[body]]
+    data_end = int(non_footer[-1]) if non_footer.size else int(body[-1])
+
+    if numeric_cols.any():
+        header_start = _find_header_start(first_data, fill, filled, dense)
+        has_header = header_start < first_data
+        if not has_header:
+            header_start = max(first_data - 1, 0)
+    else:
+        header_start = first_data
+        has_header = first_data < data_end
+
+    # --- Confidence: agreement of the independent signals ---
+    body_slice = slice(first_data, data_end + 1)
+    body_rows = filled_rows[(filled_rows >= first_data) & (filled_rows <= data_end)]
+    body_score = data_like[body_rows].mean() if body_rows.size else 0.0
+
+    if numeric_cols.any():
+        body_filled = filled[body_slice][:, numeric_cols].sum(axis=0)
+        body_numeric = numeric[body_slice][:, numeric_cols].sum(axis=0)
+        type_score = float(np.mean(np.divide(body_numeric, body_filled, out=np.zeros(body_filled.shape),
+                                             where=body_filled > 0)))
+        header_rows = np.arange(header_start, first_data)
+        header_score = 1.0 - float(row_type_score[header_rows].mean()) if has_header else 0.3
+    else:
+        type_score = 0.6
+        header_score = 0.7 if has_header else 0.3
+
+    trailing = data_like[data_end + 1:] & ~footer[data_end + 1:]
+    end_score = 1.0 if not trailing.any() else 0.5
+
+    confidence = 0.35 * body_score + 0.25 * type_score + 0.2 * header_score + 0.2 * end_score
+    return {
+        "header_start_index": int(header_start),
+        "data_end_index": int(data_end),
+        "confidence": round(float(confidence), 3),
+    }
+
+
+def _cell_features(df: pd.DataFrame):
+    """
+    Compute per-cell masks in one vectorized pass over all non-empty cells.
+
+    Returns
+    -------
+    tuple
+        ``filled``, ``numeric`` and ``year`` boolean arrays shaped like ``df``, and the
+        stripped text of the first filled cell of every row (empty string for empty rows).
+    """
+    values = df.to_numpy(dtype=object)
+    present = pd.notna(values)
+    rows, cols = np.nonzero(present)
+
+    text = pd.Series(values[rows, cols], dtype=object).astype(str).str.strip()
+    non_blank = (text != "").to_numpy()
+
+    # Numbers as type coercion reads them ("1,234", "$5", "(12)", "12%")
+    numbers, _ = parse_numbers(pd.Series(text, dtype="string").mask(~non_blank))
+    is_number = numbers.notna().to_numpy()
+
+    filled = np.zeros(values.shape, dtype=bool)
+    filled[rows, cols] = non_blank
+    numeric = np.zeros(values.shape, dtype=bool)
+    numeric[rows, cols] = is_number
+    year = np.zeros(values.shape, dtype=bool)
+    year[rows, cols] = text.str.match(YEAR_PATTERN).to_numpy()
+
+    # np.nonzero walks row-major, so the first entry per row is its leftmost filled cell
+    first_text = np.full(values.shape[0], "", dtype=object)
+    keep = non_blank
+    if keep.any():
+        kept_rows = rows[keep]
+        first_pos = np.flatnonzero(np.r_[True, kept_rows[1:] != kept_rows[:-1]])
+        first_text[kept_rows[first_pos]] = text.to_numpy()[keep][first_pos]
+    return filled, numeric, year, first_text
+
+
+def _find_header_start(first_data: int, fill: np.ndarray, filled: np.ndarray, dense: np.ndarray) -> int:
+    """
+    Walk up from the first data row over the rows that form its header block.
+
+    The block ends at an empty row, at a title-like row (a single cell in the
+    leftmost column of a wide table), or after ``MAX_HEADER_ROWS`` rows.
+    """
+    table_start_col = int(np.argmax(filled[dense].any(axis=0))) if dense.any() else 0
+    header_start = first_data
+    for row in range(first_data - 1, max(first_data - 1 - MAX_HEADER_ROWS, -1), -1):
+        if fill[row] == 0:
+            break
+        is_title = fill[row] == 1 and filled[row, table_start_col] and filled.shape[1] > 2
+        if is_title:
+            break
+        header_start = row
+    return header_start
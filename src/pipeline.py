@@ -0,0 +1,771 @@
+"""
+Per-sheet pipeline runner.
+
+Runs the refresh, boundary detection and cleaning stages for each split sheet file,
+either one after another or in a pool of worker processes. Each sheet is isolated:
+a failure is recorded in its summary entry and never stops the other sheets.
+
+Two hand-off styles are supported:
+    - on disk:   every stage reads the previous stage's file (split -> refreshed ->
+                 boundaries JSON -> cleaned outputs).
+    - in memory: the workbook is refreshed once, each sheet grid is parsed once, and
+                 the same DataFrame and boundaries dict are handed to every stage.
+                 Intermediate files are written only when asked for.
+
+Every stage is measured by a ``telemetry.StageRecorder``; each summary entry carries
+its sheet's stage records under 'telemetry'.
+
+On-disk runs can be incremental: with the previous run's stage records for a sheet
+(see ``run_manifest``), every stage whose input content and settings are unchanged
+is skipped and its recorded outputs are reused.
+
+With batched boundary detection the stages run across all sheets in turn instead:
+every sheet is refreshed and parsed first, then the LLM requests for all of them
+go out concurrently from ``async_boundaries``, then every sheet is cleaned.
+"""
+
+import glob
+import json
+import os
+import shutil
+import tempfile
+import time
+import traceback
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pandas as pd
+
+from boundary_cache import BoundaryCache, DEFAULT_MAX_BYTES
+from sheets_to_excel import sheet_file_name
+from preprocessing_excel_sheets import recalculate_and_refresh_sheets
+from refresh_analyzer import analyze_refresh_need, describe_refresh_need
+from find_table_boundaries import find_table_boundaries, DEFAULT_CONFIDENCE_THRESHOLD
+from prompt_encoding import DEFAULT_PROMPT_ENCODING, DEFAULT_TOKEN_BUDGET
+from stage_registry import (
+    load_backend, DEFAULT_CONCURRENCY, DEFAULT_MAX_RETRIES, DEFAULT_REQUEST_TIMEOUT, DEFAULT_REQUESTS_PER_SECOND,
+)
+from process_with_pandas import (
+    process_table_with_pandas, cleaned_output_paths, table_output_path, DEFAULT_OUTPUT_FORMATS,
+)
+from run_manifest import file_hash, combined_hash, stage_settings, make_record, current_record
+from telemetry import StageRecorder, file_sizes
+from xlsx_reader import open_workbook, read_grid, DEFAULT_READER
+from row_filters import RowFilter
+from chunked_cleaning import clean_sheet_in_chunks
+
+
+def _boundary_options(options: dict) -> dict:
+    """
+    Keyword arguments for ``find_table_boundaries`` taken from the run options.
+
+    A fresh ``BoundaryCache`` handle is opened per sheet so that its hit and miss
+    counters describe that sheet alone, whichever worker process runs it.
+    """
+    cache = None
+    if options.get("boundary_cache_dir"):
+        cache = BoundaryCache(options["boundary_cache_dir"], options.get("boundary_cache_max_bytes", DEFAULT_MAX_BYTES))
+    return {
+        "engine": options.get("boundary_engine", "llm"),
+        "confidence_threshold": options.get("confidence_threshold", DEFAULT_CONFIDENCE_THRESHOLD),
+        "cache": cache,
+        "multi_table": bool(options.get("multi_table")),
+        "prompt_encoding": options.get("prompt_encoding", DEFAULT_PROMPT_ENCODING),
+        "token_budget": options.get("token_budget", DEFAULT_TOKEN_BUDGET),
+    }
+
+
+def _cache_stats(boundary_kwargs: dict) -> dict:
+    cache = boundary_kwargs["cache"]
+    if cache is None:
+        return {"hits": 0, "misses": 0}
+    return {"hits": cache.hits, "misses": cache.misses}
+
+
+def _refresh(workbook_file: str, options: dict, scope: str = "") -> tuple:
+    """
+    Run the refresh stage on ``workbook_file`` in place, unless nothing in it needs a refresh.
+
+    Returns
+    -------
+    tuple
+        The 'refresh' summary entry ('ran', 'reason', 'scan_seconds' and
+        'refresh_seconds'), and the ``analyze_refresh_need`` result, or None when
+        the workbook was not scanned.
+    """
+    engine = options.get("refresh_engine", "excel")
+    info = {"ran": False, "reason": "", "scan_seconds": 0.0, "refresh_seconds": 0.0}
+    analysis = None
+    if engine == "none":
+        info["reason"] = "refresh engine 'none'"
+        print(f"  [2.1] Skipping refresh{scope}: {info['reason']}.")
+        return info, analysis
+
+    if options.get("always_refresh"):
+        info["reason"] = "--always-refresh"
+    else:
+        started = time.perf_counter()
+        analysis = analyze_refresh_need(workbook_file)
+        info["scan_seconds"] = round(time.perf_counter() - started, 4)
+        info["reason"] = describe_refresh_need(analysis)
+        if not analysis["needs_refresh"]:
+            print(f"  [2.1] Skipping refresh{scope}: {info['reason']} (scanned in {info['scan_seconds']:.3f}s).")
+            return info, analysis
+
+    print(f"  [2.1] Refreshing formulas and data{scope} ({info['reason']}) ...")
+    started = time.perf_counter()
+    recalculate_and_refresh_sheets(workbook_file, return_values=False, engine=engine)
+    info["refresh_seconds"] = round(time.perf_counter() - started, 4)
+    info["ran"] = True
+    return info, analysis
+
+
+def _write_cleaned(refreshed_file, boundaries_json, sheet_file: str, dirs: dict, options: dict,
+                   df: pd.DataFrame = None, boundaries: dict = None, metrics: dict = None) -> dict:
+    """
+    Clean one sheet into every requested output format and return the written paths by format (plus 'schema').
+
+    With several tables on the sheet (multi-table boundaries) the paths are keyed by
+    format and table number instead, e.g. 'xlsx_table1', 'csv_table2'.
+
+    With the ``chunk_size`` option the tables are cleaned in chunks of that many rows
+    (see ``chunked_cleaning``) instead of whole.
+
+    ``metrics`` is the telemetry record of the clean stage; it gets the size of the
+    cleaned table, the rows each row-filter rule dropped ('rows_dropped') and the
+    bytes read and written.
+    """
+    label = os.path.basename(sheet_file)
+    paths = cleaned_output_paths(os.path.join(dirs["cleaned"], label.replace(".xlsx", "_cleaned")),
+                                 options.get("formats", DEFAULT_OUTPUT_FORMATS))
+    coerce = bool(options.get("coerce_types"))
+    if coerce:
+        paths["schema"] = os.path.join(dirs["cleaned"], label.replace(".xlsx", "_schema.json"))
+    if boundaries is None:
+        with open(boundaries_json, "r") as f:
+            boundaries = json.load(f)
+    dropped_rows = {}
+    if options.get("chunk_size"):
+        tables = clean_sheet_in_chunks(refreshed_file, boundaries_json, paths.get("xlsx"), paths.get("csv"),
+                                       options["chunk_size"], df=df, boundaries=boundaries,
+                                       parquet_path=paths.get("parquet"), feather_path=paths.get("feather"),
+                                       coerce=coerce, schema_json_path=paths.get("schema"),
+                                       row_filter=RowFilter(options.get("row_filter_rules")),
+                                       dropped_rows=dropped_rows)
+    else:
+        cleaned = process_table_with_pandas(refreshed_file, boundaries_json, paths.get("xlsx"), paths.get("csv"),
+                                            df=df, boundaries=boundaries, parquet_path=paths.get("parquet"),
+                                            feather_path=paths.get("feather"), coerce=coerce,
+                                            schema_json_path=paths.get("schema"),
+                                            reader=options.get("reader", DEFAULT_READER),
+                                            row_filter=RowFilter(options.get("row_filter_rules")),
+                                            dropped_rows=dropped_rows)
+        tables = [{"rows": len(data_df), "columns": data_df.shape[1]}
+                  for data_df in (cleaned if isinstance(cleaned, list) else [cleaned])]
+    # A sheet with several tables has outputs per table, keyed e.g. 'csv_table2'
+    table_count = len(boundaries.get("tables", [None]))
+    if table_count > 1:
+        outputs = {f"{key}_table{n}": table_output_path(path, n, table_count)
+                   for n in range(1, table_count + 1) for key, path in paths.items()}
+    else:
+        outputs = paths
+    if metrics is not None:
+        metrics["rows"] = sum(table["rows"] for table in tables)
+        metrics["cells"] = sum(table["rows"] * table["columns"] for table in tables)
+        metrics["rows_dropped"] = dropped_rows
+        metrics["bytes_read"] = file_sizes(refreshed_file, boundaries_json)
+        metrics["bytes_written"] = file_sizes(*outputs.values())
+    return outputs
+
+
+def split_workbook(input_file: str, split_dir: str, options: dict, previous_record: dict = None) -> dict:
+    """
+    Split stage: write every sheet of ``input_file`` to its own file in ``split_dir``.
+
+    When ``previous_record`` (the manifest's split record from the last run) matches
+    the workbook's content hash and split options, and its files still exist, the
+    split is skipped and those files are reused.
+
+    Returns
+    -------
+    dict
+        'sheet_files' (sorted paths), 'record' (the split record for the manifest),
+        'reused' (whether the previous split was reused) and 'telemetry' (the stage record).
+    """
+    recorder = StageRecorder(None, options.get("events_jsonl"))
+    workbook_hash = file_hash(input_file)
+    settings = stage_settings("split", options)
+    record = current_record({"split": previous_record}, "split", workbook_hash, settings)
+    if record:
+        print(f"\n[1/4] Reusing the split sheets in '{split_dir}' (workbook unchanged since the last run).")
+        recorder.reused("split")
+        return {"sheet_files": sorted(record["outputs"].values()), "record": record, "reused": True,
+                "telemetry": recorder.stages}
+
+    print(f"\n[1/4] Splitting sheets from '{input_file}' into '{split_dir}' ...")
+    base_name = os.path.splitext(os.path.basename(input_file))[0]
+    with recorder.stage("split") as metrics:
+        try:
+            engine = options.get("split_engine", "openpyxl")
+            split = load_backend("split", engine)
+            if engine == "zip":
+                split(input_file, split_dir)
+            else:
+                split(input_file, split_dir, mode=options.get("split_mode", "full"),
+                      values_only=options.get("values_only", False))
+        except SystemExit as e:
+            # The splitters exit on invalid input; make that an error of this workbook only
+            raise ValueError(f"could not split '{input_file}', see the messages above") from e
+        sheet_files = sorted(glob.glob(os.path.join(split_dir, f"{glob.escape(base_name)}_sheet*.xlsx")))
+        metrics["bytes_read"], metrics["bytes_written"] = file_sizes(input_file), file_sizes(*sheet_files)
+    outputs = {os.path.basename(sheet_file): sheet_file for sheet_file in sheet_files}
+    return {"sheet_files": sheet_files, "record": make_record(workbook_hash, settings, outputs), "reused": False,
+            "telemetry": recorder.stages}
+
+
+def record_sheets(manifest, sheet_files: list, summary: list):
+    """Store every sheet's stage records from ``summary`` in ``manifest`` and save it."""
+    labels = [os.path.basename(sheet_file) for sheet_file in sheet_files]
+    manifest.keep_sheets(labels)
+    for label, entry in zip(labels, summary):
+        # A worker that died returned no records; its previous ones are still valid
+        manifest.record_sheet(label, entry["status"], entry.get("stages", manifest.sheet_stages(label)))
+    manifest.save()
+
+
+# Long-lived pool of warm worker processes shared by every run of this process (see daemon.py)
+_worker_pool = None
+
+
+def set_worker_pool(pool):
+    """
+    Run the jobs of every ``workers > 1`` run on ``pool`` instead of a new pool per call.
+
+    The pool's own size then bounds the concurrency; None goes back to a pool per call.
+    """
+    global _worker_pool
+    _worker_pool = pool
+
+
+def _run_jobs(func, jobs: list, workers: int, labels: list) -> list:
+    """
+    Call ``func(*job)`` for every job, in a process pool when ``workers > 1``.
+
+    Returns one entry per job, in order: the function's result, or the exception
+    it raised. A failing job is reported and never stops the others. A worker
+    process that dies breaks its pool and every job still in it; the unfinished
+    jobs then run again in a new pool, one at a time, so a job that crashes its
+    worker a second time is the only one that fails.
+    """
+    if workers <= 1 or len(jobs) <= 1:
+        results = []
+        for job, label in zip(jobs, labels):
+            try:
+                results.append(func(*job))
+            except Exception as e:
+                print(f"❌ Error processing '{label}': {e}")
+                traceback.print_exc()
+                results.append(e)
+        return results
+
+    results = [None] * len(jobs)
+    pending = list(range(len(jobs)))
+    pool = _worker_pool or ProcessPoolExecutor(max_workers=min(workers, len(jobs)))
+    retrying = False
+    try:
+        while pending:
+            batch = pending[:1] if retrying else pending
+            futures = [(index, _submit(pool, func, jobs[index])) for index in batch]
+            broken = False
+            for index, future in futures:
+                try:
+                    results[index] = future.result()
+                except BrokenProcessPool as e:
+                    broken = True
+                    if not retrying:
+                        continue
+                    print(f"❌ Worker crashed again while processing '{labels[index]}': {e}")
+                    results[index] = e
+                except Exception as e:
+                    print(f"❌ Worker failed while processing '{labels[index]}': {e}")
+                    results[index] = e
+                pending.remove(index)
+            if broken:
+                if not retrying:
+                    print(f"⚠️  A worker process crashed; retrying the {len(pending)} unfinished job(s) "
+                          f"one at a time in a new pool.")
+                    retrying = True
+                # A shared pool is replaced by its owner (see daemon.py); this call continues on its own pool
+                if pool is not _worker_pool:
+                    pool.shutdown(wait=False)
+                pool = ProcessPoolExecutor(max_workers=min(workers, len(jobs)))
+    finally:
+        if pool is not _worker_pool:
+            pool.shutdown()
+    return results
+
+
+def _submit(pool, func, job: tuple) -> Future:
+    """Submit ``func(*job)`` to ``pool``; a pool that is already broken gives a future failed with ``BrokenProcessPool``."""
+    try:
+        return pool.submit(func, *job)
+    except BrokenProcessPool as e:
+        future = Future()
+        future.set_exception(e)
+        return future
+
+
+def process_sheet_file(sheet_file: str, dirs: dict, options: dict = None, previous_stages: dict = None) -> dict:
+    """
+    Refresh, find boundaries for, and clean a single split sheet file.
+
+    Parameters
+    ----------
+    sheet_file : str
+        Path to the split single-sheet workbook.
+    dirs : dict
+        Output folders keyed by 'refreshed', 'boundaries' and 'cleaned'.
+    options : dict, optional
+        Run options from the command line, such as 'refresh_engine', 'boundary_engine',
+        'confidence_threshold', 'boundary_cache_dir' (None disables the cache) and
+        'formats' (the cleaned output formats), 'coerce_types', 'multi_table'
+        (clean every table block of a sheet to its own outputs), 'prompt_encoding'
+        and 'token_budget' (how sheet rows are written into the LLM prompt), and
+        'reader' (the sheet parser, see ``xlsx_reader``) and 'row_filter_rules' (the
+        rules that drop totals, footnotes and empty rows, see ``row_filters``; None
+        for the defaults). Missing keys fall back to the stage defaults.
+    previous_stages : dict, optional
+        Stage records of this sheet from the previous run's manifest. Stages whose
+        input hash and settings still match are skipped.
+
+    Returns
+    -------
+    dict
+        Summary entry with 'sheet_file', 'status' ('Success' or 'Failed'),
+        'outputs' (the cleaned output paths by format on success), 'boundary_cache'
+        (hit and miss counts of the boundary cache for this sheet), 'refresh'
+        (whether the refresh stage ran, why, and how long the scan and refresh took),
+        'stages' (the stage records for the manifest, up to the first failed stage),
+        'reused' (the stages skipped because their inputs were unchanged) and
+        'telemetry' (timing, memory and size records of every stage that ran).
+    """
+    options = options or {}
+    boundary_kwargs = _boundary_options(options)
+    sheet_name = os.path.basename(sheet_file)
+    recorder = StageRecorder(sheet_name, options.get("events_jsonl"))
+    refresh = None
+    # One record per run_manifest.SHEET_STAGES entry
+    stages, reused = {}, []
+    try:
+        print(f"\n--- Processing sheet file: {sheet_name} ---")
+
+        # Step 2: Refresh and recalculate, when the sheet has anything to refresh
+        sheet_hash = file_hash(sheet_file)
+        settings = stage_settings("refresh", options)
+        record = current_record(previous_stages, "refresh", sheet_hash, settings)
+        if record:
+            refreshed_file, refresh = record["outputs"]["refreshed"], record["refresh"]
+            reused.append("refresh")
+            recorder.reused("refresh")
+            print("  [2.1] Reusing the refreshed sheet from the previous run (sheet unchanged).")
+        else:
+            refreshed_file = os.path.join(dirs["refreshed"], sheet_name.replace(".xlsx", "_refreshed.xlsx"))
+            with recorder.stage("refresh") as metrics:
+                # Copy the split file to refreshed_dir first, then refresh in place
+                shutil.copy2(sheet_file, refreshed_file)
+                refresh, _ = _refresh(refreshed_file, options)
+                metrics["bytes_read"], metrics["bytes_written"] = file_sizes(sheet_file), file_sizes(refreshed_file)
+            record = make_record(sheet_hash, settings, {"refreshed": refreshed_file}, refresh=refresh)
+        stages["refresh"] = record
+
+        # Step 3: Find table boundaries
+        refreshed_hash = file_hash(refreshed_file)
+        settings = stage_settings("boundaries", options)
+        record = current_record(previous_stages, "boundaries", refreshed_hash, settings)
+        if record:
+            boundaries_json = record["outputs"]["boundaries"]
+            reused.append("boundaries")
+            recorder.reused("boundaries")
+            print("  [2.2] Reusing the table boundaries from the previous run (refreshed sheet unchanged).")
+        else:
+            print("  [2.2] Finding table boundaries ...")
+            boundaries_json = os.path.join(dirs["boundaries"], sheet_name.replace(".xlsx", "_boundaries.json"))
+            with recorder.stage("boundaries") as metrics:
+                find_table_boundaries(refreshed_file, boundaries_json, reader=options.get("reader", DEFAULT_READER),
+                                      **boundary_kwargs)
+                metrics["bytes_read"], metrics["bytes_written"] = file_sizes(refreshed_file), file_sizes(boundaries_json)
+            record = make_record(refreshed_hash, settings, {"boundaries": boundaries_json})
+        stages["boundaries"] = record
+
+        # Step 4: Process with pandas
+        clean_hash = combined_hash(refreshed_hash, file_hash(boundaries_json))
+        settings = stage_settings("clean", options)
+        record = current_record(previous_stages, "clean", clean_hash, settings)
+        if record:
+            outputs = record["outputs"]
+            reused.append("clean")
+            recorder.reused("clean")
+            print("  [2.3] Reusing the cleaned outputs from the previous run (inputs unchanged).")
+        else:
+            print("  [2.3] Cleaning and saving final outputs ...")
+            with recorder.stage("clean") as metrics:
+                outputs = _write_cleaned(refreshed_file, boundaries_json, sheet_file, dirs, options, metrics=metrics)
+            record = make_record(clean_hash, settings, outputs)
+        stages["clean"] = record
+
+        print(f"✅ Finished processing '{sheet_name}'.")
+        return {"sheet_file": sheet_file, "status": "Success", "outputs": outputs,
+                "boundary_cache": _cache_stats(boundary_kwargs), "refresh": refresh,
+                "stages": stages, "reused": reused, "telemetry": recorder.stages}
+    except Exception as e:
+        print(f"❌ Error processing '{sheet_name}': {e}")
+        traceback.print_exc()
+        return {"sheet_file": sheet_file, "status": "Failed", "outputs": {},
+                "boundary_cache": _cache_stats(boundary_kwargs), "refresh": refresh,
+                "stages": stages, "reused": reused, "telemetry": recorder.stages}
+
+
+def process_sheet_files(sheet_files: list, dirs: dict, workers: int = 1, options: dict = None,
+                        manifest=None, recorder: StageRecorder = None) -> list:
+    """
+    Run ``process_sheet_file`` for every sheet, optionally in a process pool.
+
+    Sheets are independent, so with ``workers > 1`` they are processed concurrently.
+    Results are always returned in the order of ``sheet_files``. A worker that dies
+    (for example from a crash inside a native library) breaks the pool; the sheets
+    it took down with it are retried, and only a sheet that crashes its worker again
+    fails (see ``_run_jobs``).
+
+    Parameters
+    ----------
+    sheet_files : list of str
+        Paths to the split sheet files.
+    dirs : dict
+        Output folders, see ``process_sheet_file``.
+    workers : int, default 1
+        Number of worker processes. 1 runs sequentially in the current process.
+    options : dict, optional
+        Run options, see ``process_sheet_file``.
+    manifest : RunManifest, optional
+        Manifest of the previous run. Unchanged stages are skipped, and the manifest
+        is updated with this run's stage records and saved. Batched runs ignore it.
+    recorder : StageRecorder, optional
+        Records the workbook-level stages of batched runs, see ``process_sheets_batched``.
+
+    Returns
+    -------
+    list of dict
+        One summary entry per sheet file, in input order.
+    """
+    if options and options.get("async_boundaries"):
+        return process_sheets_batched(sheet_files, dirs, workers=workers, options=options, recorder=recorder)
+
+    labels = [os.path.basename(sheet_file) for sheet_file in sheet_files]
+    jobs = [
+        (sheet_file, dirs, options, manifest.sheet_stages(label) if manifest else None)
+        for sheet_file, label in zip(sheet_files, labels)
+    ]
+    results = _run_jobs(process_sheet_file, jobs, workers, labels)
+    summary = [
+        {"sheet_file": sheet_file, "status": "Failed", "outputs": {}} if isinstance(result, BaseException) else result
+        for sheet_file, result in zip(sheet_files, results)
+    ]
+    if manifest is not None:
+        record_sheets(manifest, sheet_files, summary)
+    return summary
+
+
+def process_sheet_in_memory(workbook_file, sheet_name: str, sheet_file: str, dirs: dict,
+                            keep_intermediates: bool = False, options: dict = None) -> dict:
+    """
+    Parse one sheet of an already refreshed workbook once and hand it to every stage.
+
+    Parameters
+    ----------
+    workbook_file : str, pd.ExcelFile or XlsxWorkbook
+        Path to the refreshed source workbook, or the workbook already opened.
+    sheet_name : str
+        Title of the sheet to process.
+    sheet_file : str
+        Name the sheet would have as a split file; used for output names and the summary.
+    dirs : dict
+        Output folders keyed by 'boundaries' and 'cleaned'.
+    keep_intermediates : bool, default False
+        Also write the boundaries JSON.
+    options : dict, optional
+        Run options, see ``process_sheet_file``.
+
+    Returns
+    -------
+    dict
+        Summary entry, see ``process_sheet_file``.
+    """
+    options = options or {}
+    boundary_kwargs = _boundary_options(options)
+    label = os.path.basename(sheet_file)
+    recorder = StageRecorder(label, options.get("events_jsonl"))
+    try:
+        print(f"\n--- Processing sheet: {sheet_name} ({label}) ---")
+        with recorder.stage("parse") as metrics:
+            grid = read_grid(workbook_file, sheet_name, options.get("reader", DEFAULT_READER))
+            metrics["rows"], metrics["cells"] = len(grid), int(grid.size)
+
+        print("  [2.2] Finding table boundaries ...")
+        boundaries_json = None
+        if keep_intermediates:
+            boundaries_json = os.path.join(dirs["boundaries"], label.replace(".xlsx", "_boundaries.json"))
+        with recorder.stage("boundaries") as metrics:
+            boundaries = find_table_boundaries(None, boundaries_json, df=grid, **boundary_kwargs)
+            metrics["rows"], metrics["cells"] = len(grid), int(grid.size)
+            metrics["bytes_written"] = file_sizes(boundaries_json)
+
+        print("  [2.3] Cleaning and saving final outputs ...")
+        with recorder.stage("clean") as metrics:
+            outputs = _write_cleaned(None, None, sheet_file, dirs, options, df=grid, boundaries=boundaries,
+                                     metrics=metrics)
+
+        print(f"✅ Finished processing '{label}'.")
+        return {"sheet_file": sheet_file, "status": "Success", "outputs": outputs,
+                "boundary_cache": _cache_stats(boundary_kwargs), "telemetry": recorder.stages}
+    except Exception as e:
+        print(f"❌ Error processing '{label}': {e}")
+        traceback.print_exc()
+        return {"sheet_file": sheet_file, "status": "Failed", "outputs": {}, "boundary_cache": _cache_stats(boundary_kwargs),
+                "telemetry": recorder.stages}
+
+
+def process_workbook_in_memory(input_file: str, dirs: dict, workers: int = 1, keep_intermediates: bool = False,
+                               options: dict = None, recorder: StageRecorder = None) -> list:
+    """
+    Run the pipeline for every sheet of ``input_file`` without per-sheet intermediate files.
+
+    The whole workbook is refreshed once (one Excel session instead of one per sheet),
+    and only when one of its sheets needs it, then each sheet grid is parsed once and shared by boundary detection and cleaning.
+    With ``keep_intermediates`` the refreshed workbook and boundaries JSON files are
+    kept in their usual folders; otherwise the refreshed copy lives in a temporary
+    folder that is removed afterwards.
+
+    Parameters
+    ----------
+    input_file : str
+        Path to the source workbook. It is never modified.
+    dirs : dict
+        Output folders keyed by 'split', 'refreshed', 'boundaries' and 'cleaned'.
+    workers : int, default 1
+        Number of worker processes; each worker parses only its own sheet.
+    keep_intermediates : bool, default False
+        Write the refreshed workbook and boundaries JSON files.
+    options : dict, optional
+        Run options, see ``process_sheet_file``.
+    recorder : StageRecorder, optional
+        Records the workbook-level stages (the refresh, and batched boundary detection).
+
+    Returns
+    -------
+    list of dict
+        One summary entry per sheet, in workbook order.
+    """
+    options = options or {}
+    recorder = recorder or StageRecorder(None, options.get("events_jsonl"))
+    base_name = os.path.splitext(os.path.basename(input_file))[0]
+    temp_dir = None
+    if keep_intermediates:
+        refreshed_file = os.path.join(dirs["refreshed"], f"{base_name}_refreshed.xlsx")
+    else:
+        temp_dir = tempfile.mkdtemp(prefix="excel_pipeline_")
+        refreshed_file = os.path.join(temp_dir, f"{base_name}_refreshed.xlsx")
+
+    try:
+        with recorder.stage("refresh") as metrics:
+            shutil.copy2(input_file, refreshed_file)
+            refresh, analysis = _refresh(refreshed_file, options, scope=" for the whole workbook")
+            metrics["bytes_read"], metrics["bytes_written"] = file_sizes(input_file), file_sizes(refreshed_file)
+        summary = _process_refreshed_workbook(refreshed_file, base_name, dirs, workers, keep_intermediates, options,
+                                              recorder)
+        # The workbook is refreshed as a whole; each sheet reports the reasons found in it
+        sheet_names = list(analysis["sheets"]) if analysis else [None] * len(summary)
+        for entry, name in zip(summary, sheet_names):
+            entry["refresh"] = dict(refresh)
+            if analysis is not None:
+                entry["refresh"]["reason"] = describe_refresh_need(analysis, name)
+        return summary
+    finally:
+        if temp_dir is not None:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def _process_refreshed_workbook(refreshed_file: str, base_name: str, dirs: dict, workers: int,
+                                keep_intermediates: bool, options: dict, recorder: StageRecorder) -> list:
+    """Boundary detection and cleaning for every sheet of a refreshed workbook, see ``process_workbook_in_memory``."""
+    with open_workbook(refreshed_file, options.get("reader", DEFAULT_READER)) as workbook:
+        labels = [
+            (name, sheet_file_name(dirs["split"], base_name, idx, name))
+            for idx, name in enumerate(workbook.sheet_names, start=1)
+        ]
+        batched = bool(options.get("async_boundaries"))
+        sequential = workers <= 1 or len(labels) <= 1
+        if batched:
+            # Sequential runs read every sheet from the one open workbook; pool workers open their own
+            return process_sheets_batched(
+                [sheet_file for _, sheet_file in labels], dirs, workers=workers, options=options,
+                workbook_file=workbook if sequential else refreshed_file,
+                sheet_names=[name for name, _ in labels], keep_intermediates=keep_intermediates,
+                recorder=recorder,
+            )
+        if sequential:
+            # One open workbook serves every sheet, so shared strings are parsed once
+            return [
+                process_sheet_in_memory(workbook, name, sheet_file, dirs, keep_intermediates, options)
+                for name, sheet_file in labels
+            ]
+
+    jobs = [(refreshed_file, name, sheet_file, dirs, keep_intermediates, options) for name, sheet_file in labels]
+    results = _run_jobs(process_sheet_in_memory, jobs, workers, [name for name, _ in labels])
+    return [
+        {"sheet_file": sheet_file, "status": "Failed", "outputs": {}} if isinstance(result, BaseException) else result
+        for (_, sheet_file), result in zip(labels, results)
+    ]
+
+
+def _refresh_and_load(sheet_file: str, dirs: dict, options: dict) -> tuple:
+    """Batched stage 1 for split files: refresh a copy of the sheet if needed and parse its grid."""
+    sheet_name = os.path.basename(sheet_file)
+    recorder = StageRecorder(sheet_name, options.get("events_jsonl"))
+    refreshed_file = os.path.join(dirs["refreshed"], sheet_name.replace(".xlsx", "_refreshed.xlsx"))
+    with recorder.stage("refresh") as metrics:
+        shutil.copy2(sheet_file, refreshed_file)
+        refresh, _ = _refresh(refreshed_file, options, scope=f" of '{sheet_name}'")
+        metrics["bytes_read"], metrics["bytes_written"] = file_sizes(sheet_file), file_sizes(refreshed_file)
+    with recorder.stage("parse") as metrics:
+        grid = read_grid(refreshed_file, 0, options.get("reader", DEFAULT_READER))
+        metrics["rows"], metrics["cells"] = len(grid), int(grid.size)
+        metrics["bytes_read"] = file_sizes(refreshed_file)
+    return grid, refresh, recorder.stages
+
+
+def _load_sheet_grid(workbook_file, sheet_name: str, label: str, options: dict) -> tuple:
+    """Batched stage 1 for in-memory runs: parse one sheet of the refreshed workbook."""
+    recorder = StageRecorder(label, options.get("events_jsonl"))
+    with recorder.stage("parse") as metrics:
+        grid = read_grid(workbook_file, sheet_name, options.get("reader", DEFAULT_READER))
+        metrics["rows"], metrics["cells"] = len(grid), int(grid.size)
+    return grid, None, recorder.stages
+
+
+def _clean_sheet(grid: pd.DataFrame, boundaries: dict, sheet_file: str, dirs: dict, options: dict) -> tuple:
+    """Batched stage 3: clean one parsed grid; returns the written output paths and the stage's telemetry."""
+    label = os.path.basename(sheet_file)
+    print(f"  [2.3] Cleaning and saving final outputs for '{label}' ...")
+    recorder = StageRecorder(label, options.get("events_jsonl"))
+    with recorder.stage("clean") as metrics:
+        outputs = _write_cleaned(None, None, sheet_file, dirs, options, df=grid, boundaries=boundaries,
+                                 metrics=metrics)
+    return outputs, recorder.stages
+
+
+def process_sheets_batched(sheet_files: list, dirs: dict, workers: int = 1, options: dict = None,
+                           workbook_file=None, sheet_names: list = None, keep_intermediates: bool = True,
+                           recorder: StageRecorder = None) -> list:
+    """
+    Run the pipeline stage by stage so that all LLM boundary requests go out together.
+
+    1. Every sheet is refreshed (split files only) and parsed, in the worker pool.
+    2. Boundaries for all grids are found by ``find_table_boundaries_batch`` from
+       this process, with the concurrency, rate and retry limits from ``options``.
+    3. Every sheet is cleaned from its parsed grid, in the worker pool.
+
+    All parsed grids are held by this process between the stages, so this mode
+    trades memory for not waiting on one LLM round trip per sheet.
+
+    Parameters
+    ----------
+    sheet_files : list of str
+        Split sheet files, or in in-memory runs the names they would have.
+    dirs : dict
+        Output folders, see ``process_sheet_file``.
+    workers : int, default 1
+        Number of worker processes for the refresh/parse and cleaning stages.
+    options : dict, optional
+        Run options, see ``process_sheet_file``, plus 'llm_concurrency', 'llm_rate',
+        'llm_timeout' and 'llm_max_retries'.
+    workbook_file : str, pd.ExcelFile or XlsxWorkbook, optional
+        Refreshed source workbook for in-memory runs; ``sheet_names`` then names
+        the sheet to read for each entry of ``sheet_files``.
+    sheet_names : list of str, optional
+        Sheet titles inside ``workbook_file``.
+    keep_intermediates : bool, default True
+        Write boundaries JSON files in in-memory runs; split-file runs always do.
+    recorder : StageRecorder, optional
+        Records the batched boundary detection, which spans all sheets. The other
+        stages are recorded per sheet in each summary entry's 'telemetry'.
+
+    Returns
+    -------
+    list of dict
+        One summary entry per sheet, in input order, see ``process_sheet_file``.
+    """
+    options = options or {}
+    recorder = recorder or StageRecorder(None, options.get("events_jsonl"))
+    labels = [os.path.basename(sheet_file) for sheet_file in sheet_files]
+    if workbook_file is None:
+        prepared = _run_jobs(_refresh_and_load, [(sheet_file, dirs, options) for sheet_file in sheet_files],
+                             workers, labels)
+    else:
+        # The caller refreshed the whole workbook, so there is no per-sheet refresh
+        prepared = _run_jobs(_load_sheet_grid, [(workbook_file, name, label, options)
+                                                for name, label in zip(sheet_names, labels)], workers, labels)
+    grids = [result if isinstance(result, BaseException) else result[0] for result in prepared]
+    refreshes = [None if isinstance(result, BaseException) else result[1] for result in prepared]
+    telemetry = [[] if isinstance(result, BaseException) else list(result[2]) for result in prepared]
+
+    loaded = [position for position, grid in enumerate(grids) if not isinstance(grid, BaseException)]
+    boundaries = [None] * len(sheet_files)
+    cache_outcomes = [None] * len(sheet_files)
+    if loaded:
+        json_paths = None
+        if workbook_file is None or keep_intermediates:
+            json_paths = [
+                os.path.join(dirs["boundaries"], labels[position].replace(".xlsx", "_boundaries.json"))
+                for position in loaded
+            ]
+        boundary_kwargs = _boundary_options(options)
+        stats = {}
+        with recorder.stage("boundaries") as metrics:
+            # The batched backend (and with it the async client) is only imported by runs that select it
+            found = load_backend("boundaries", "batched")(
+                [grids[position] for position in loaded], json_paths, stats=stats,
+                concurrency=options.get("llm_concurrency", DEFAULT_CONCURRENCY),
+                requests_per_second=options.get("llm_rate", DEFAULT_REQUESTS_PER_SECOND),
+                timeout=options.get("llm_timeout", DEFAULT_REQUEST_TIMEOUT),
+                max_retries=options.get("llm_max_retries", DEFAULT_MAX_RETRIES),
+                **boundary_kwargs,
+            )
+            metrics["rows"] = sum(len(grids[position]) for position in loaded)
+            metrics["cells"] = sum(int(grids[position].size) for position in loaded)
+            metrics["bytes_written"] = file_sizes(*(json_paths or []))
+        for slot, position in enumerate(loaded):
+            boundaries[position] = found[slot]
+            cache_outcomes[position] = stats["cache_outcomes"][slot]
+
+    ready = [
+        position for position in loaded
+        if boundaries[position] is not None and not isinstance(boundaries[position], BaseException)
+    ]
+    cleaned = _run_jobs(_clean_sheet, [(grids[p], boundaries[p], sheet_files[p], dirs, options) for p in ready],
+                        workers, [labels[p] for p in ready])
+    outputs = dict(zip(ready, cleaned))
+
+    summary = []
+    for position, sheet_file in enumerate(sheet_files):
+        outcome = cache_outcomes[position]
+        cache_stats = {"hits": int(outcome == "hit"), "misses": int(outcome == "miss")}
+        result = outputs.get(position)
+        if result is None or isinstance(result, BaseException):
+            summary.append({"sheet_file": sheet_file, "status": "Failed", "outputs": {}, "boundary_cache": cache_stats,
+                            "refresh": refreshes[position], "telemetry": telemetry[position]})
+        else:
+            print(f"✅ Finished processing '{labels[position]}'.")
+            summary.append({"sheet_file": sheet_file, "status": "Success", "outputs": result[0],
+                            "boundary_cache": cache_stats, "refresh": refreshes[position],
+                            "telemetry": telemetry[position] + result[1]})
+    return summary
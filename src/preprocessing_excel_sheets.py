@@ -4,13 +4,41 @@ Module for refreshing and extracting data from Excel sheets.
 This module provides a function to programmatically open an Excel file,
 refresh all data connections and formulas, save the file, and then load
 the resulting data into a pandas DataFrame for further processing.
+
+Three refresh engines are available:
+    - excel:  drive Microsoft Excel through xlwings (formulas and data connections),
+    - python: recalculate formulas headlessly with ``formula_engine`` (no Excel needed),
+    - none:   leave the workbook as it is and trust the cached values.
 """
 
 import pandas as pd
 import openpyxl
-import xlwings as xw  
 
-def recalculate_and_refresh_sheets(input_file_path: str) -> pd.DataFrame:
+from xlsx_reader import XlsxWorkbook
+from stage_registry import REFRESH_ENGINES, READERS, DEFAULT_READER, load_backend
+
+
+def refresh_with_excel(input_file_path: str):
+    """Refresh all data connections and formulas of the workbook in Microsoft Excel and save it in place."""
+    # Imported here so the other engines work on machines without Excel
+    import xlwings as xw
+
+    # Start an invisible Excel application instance
+    app_excel = xw.App(visible=False)
+    # Open the specified Excel workbook
+    wbk = app_excel.books.open(input_file_path)
+    # Refresh all data connections and formulas in the workbook
+    wbk.api.RefreshAll()
+    # Save the workbook after refreshing
+    wbk.save(input_file_path)
+    # Close the workbook
+    wbk.close()
+    # Quit the Excel application
+    app_excel.quit()
+
+
+def recalculate_and_refresh_sheets(input_file_path: str, return_values: bool = True,
+                                   engine: str = "excel", reader: str = DEFAULT_READER) -> pd.DataFrame:
     """
     Opens an Excel file, refreshes all data connections and formulas, saves the file,
     and loads the resulting data into a pandas DataFrame.
@@ -24,32 +52,46 @@ def recalculate_and_refresh_sheets(input_file_path: str) -> pd.DataFrame:
     ----------
     input_file_path : str
         The file path to the Excel workbook to be refreshed and read.
+    return_values : bool, default True
+        Reload the refreshed workbook and return the active worksheet. Pass False when
+        a later stage reads the file itself, to skip a full openpyxl parse.
+    engine : str, default 'excel'
+        One of ``REFRESH_ENGINES``. 'python' rewrites the cached formula results
+        without starting Excel; 'none' skips the refresh.
+    reader : str, default 'openpyxl'
+        How the refreshed worksheet is read back. 'openpyxl' returns the cell values
+        as openpyxl loads them; 'fast' parses the sheet with ``xlsx_reader`` and
+        returns the string grid the later stages use (as ``pd.read_excel(header=None,
+        dtype=str)`` reads it).
 
     Returns
     -------
-    pd.DataFrame
-        A DataFrame containing the values from the active worksheet of the refreshed Excel file.
+    pd.DataFrame or None
+        A DataFrame containing the values from the active worksheet of the refreshed Excel file,
+        or None when ``return_values`` is False.
 
     Notes
     -----
-    - Requires Microsoft Excel to be installed on the system (for xlwings).
+    - The 'excel' engine requires Microsoft Excel to be installed on the system (for xlwings).
     - Only the active worksheet is loaded into the DataFrame.
     - Formulas are evaluated and only their resulting values are returned.
     """
+    if engine not in REFRESH_ENGINES:
+        raise ValueError(f"Unknown refresh engine '{engine}'. Expected one of: {', '.join(REFRESH_ENGINES)}")
+    if reader not in READERS:
+        raise ValueError(f"Unknown reader '{reader}'. Expected one of: {', '.join(READERS)}")
 
+    # Only the selected engine's module is imported: xlwings for 'excel', formula_engine for 'python'
+    refresh = load_backend("refresh", engine)
+    if refresh is not None:
+        refresh(input_file_path)
 
-    # Start an invisible Excel application instance
-    app_excel = xw.App(visible=False)
-    # Open the specified Excel workbook
-    wbk = app_excel.books.open(input_file_path)
-    # Refresh all data connections and formulas in the workbook
-    wbk.api.RefreshAll()
-    # Save the workbook after refreshing
-    wbk.save(input_file_path)
-    # Close the workbook
-    wbk.close()
-    # Quit the Excel application
-    app_excel.quit()
+    if not return_values:
+        return None
+
+    if reader == "fast":
+        with XlsxWorkbook(input_file_path) as workbook:
+            return workbook.read_sheet(workbook.active_sheet)
 
     # Load the workbook with openpyxl, reading only the values (not formulas)
     wb_data = openpyxl.load_workbook(input_file_path, data_only=True)
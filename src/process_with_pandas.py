@@ -1,30 +1,139 @@
 # script_b_process_with_pandas.py
 
+import numpy as np
 import pandas as pd
 import json
-from collections import defaultdict
+import os
 
-def process_table_with_pandas(input_file: str, boundaries_json_path: str, final_excel_path: str, final_csv_path: str):
+from type_coercion import coerce_types, write_schema_report
+from xlsx_reader import read_grid, DEFAULT_READER
+from row_filters import RowFilter
+from stage_registry import OUTPUT_FORMATS, DEFAULT_OUTPUT_FORMATS, COLUMNAR_FORMATS
+
+HEADER_LEVEL_SEPARATOR = '_'
+# Header detection looks at most this many rows deep
+MAX_HEADER_ROWS = 5
+
+def process_table_with_pandas(input_file: str, boundaries_json_path: str, final_excel_path: str, final_csv_path: str,
+                              df: pd.DataFrame = None, boundaries: dict = None, parquet_path: str = None,
+                              feather_path: str = None, coerce: bool = False,
+                              schema_json_path: str = None, reader: str = DEFAULT_READER,
+                              row_filter: RowFilter = None, dropped_rows: dict = None) -> pd.DataFrame:
     """
     Reads the original Excel file and uses the AI-found boundaries to perform
     a definitive, in-memory cleaning and structuring process with pandas.
     This version adaptively handles both simple and complex multi-level headers.
+
+    An already-parsed sheet grid (``df``) and boundaries dict (``boundaries``) can be
+    handed over from earlier stages; the file and JSON are then not read again.
+    Returns the cleaned DataFrame.
+
+    Each output is written only when its path is given, so slow writers (Excel in
+    particular) can be skipped. Parquet and Feather outputs get an inferred schema:
+    columns whose values are all numbers are stored as numbers, the rest as text.
+    Feather files are written uncompressed so readers can memory-map them.
+
+    With ``coerce`` the table is converted to compact typed columns (numbers in
+    accounting notation, percentages, dates, categoricals) before it is saved, and
+    the per-column schema report is written to ``schema_json_path`` when given.
+
+    Multi-table boundaries (``{'tables': [...]}``, see ``find_table_boundaries``)
+    are all cleaned from the one grid: every table is sliced to its rows and
+    columns and saved to its own outputs, named with a ``_table{n}`` suffix when the
+    sheet has more than one table (see ``table_output_path``). A list with one
+    cleaned DataFrame per table is returned then.
+
+    ``reader`` selects the parser when the grid is read from ``input_file``:
+    'openpyxl' (``pd.read_excel``) or 'fast' (``xlsx_reader``).
+
+    Totals, footnotes and empty rows are dropped with ``row_filter``, a compiled
+    ``row_filters.RowFilter``; the default rules drop rows whose first column
+    mentions TOTAL or DEPARTMENTS and rows without any value. The rows each rule
+    dropped, summed over all tables, are added to ``dropped_rows`` when given.
+
+    Tables too large to hold in memory several times over can be cleaned in row
+    chunks into the same outputs with ``chunked_cleaning.clean_sheet_in_chunks``.
     """
     print("\n--- Step B: Processing Table with Pandas-First Approach ---")
 
     # --- Step 1: Load Boundaries and the ORIGINAL Data with Pandas ---
-    with open(boundaries_json_path, 'r') as f:
-        boundaries = json.load(f)
-    header_start = boundaries['header_start_index']
-    data_end = boundaries['data_end_index']
+    if boundaries is None:
+        with open(boundaries_json_path, 'r') as f:
+            boundaries = json.load(f)
     
-    df = pd.read_excel(input_file, header=None, sheet_name=0, dtype=str)
-    print("  [Read] Successfully loaded original Excel file into memory as string data.")
+    if df is None:
+        df = read_grid(input_file, 0, reader)
+        print("  [Read] Successfully loaded original Excel file into memory as string data.")
+    else:
+        print("  [Read] Using the sheet grid handed over from the previous stage.")
+
+    paths = (final_excel_path, final_csv_path, parquet_path, feather_path, schema_json_path)
+    if 'tables' not in boundaries:
+        data_df = _clean_table(df, boundaries['header_start_index'], boundaries['data_end_index'],
+                               row_filter, dropped_rows)
+        return _save_table(data_df, *paths, coerce=coerce)
+
+    tables = boundaries['tables']
+    cleaned = []
+    for n, table in enumerate(tables, start=1):
+        print(f"  [Table {n}/{len(tables)}] Columns {table['col_start']} to {table['col_end']}.")
+        block = df.iloc[:, table['col_start'] : table['col_end'] + 1]
+        data_df = _clean_table(block, table['header_start_index'], table['data_end_index'], row_filter, dropped_rows)
+        table_paths = [table_output_path(path, n, len(tables)) for path in paths]
+        cleaned.append(_save_table(data_df, *table_paths, coerce=coerce))
+    return cleaned
+
+
+def table_output_path(path: str, table_number: int, table_count: int) -> str:
+    """
+    Output path of table ``table_number`` (1-based) of a sheet with ``table_count`` tables.
+
+    A sheet with one table keeps the path; otherwise ``_table{n}`` goes before the
+    extension (``..._cleaned.csv`` -> ``..._cleaned_table2.csv``). None stays None.
+    """
+    if not path or table_count <= 1:
+        return path
+    stem, extension = os.path.splitext(path)
+    return f"{stem}_table{table_number}{extension}"
+
 
+def _clean_table(df: pd.DataFrame, header_start: int, data_end: int, row_filter: RowFilter = None,
+                 dropped_rows: dict = None) -> pd.DataFrame:
+    """
+    Slice one table out of the sheet grid, name its columns from its header rows and filter its rows.
+
+    The rows are filtered with ``row_filter`` (the default rules when None), and the
+    rows each rule dropped are added to ``dropped_rows`` when given.
+    """
     # --- Step 2: Slice and Process ---
     table_df = df.iloc[header_start : data_end + 1].copy().reset_index(drop=True)
+    table_df.columns = range(table_df.shape[1])
     print(f"  [Slice] Extracted table from row {header_start} to {data_end}.")
 
+    header_row_count, final_columns = resolve_header(table_df)
+    data_df = table_df.iloc[header_row_count:].copy()
+
+    # --- Step 2c: Assign Headers and Clean Final DataFrame ---
+    data_df.columns = final_columns
+
+    # --- Step 2d: Drop totals, footnotes and empty rows with the row-filter rules, in one pass ---
+    data_df, dropped = (row_filter or RowFilter()).apply(data_df)
+    report_dropped_rows(dropped, dropped_rows)
+    return data_df
+
+
+def resolve_header(table_df: pd.DataFrame) -> tuple:
+    """
+    Find how many of a table's first rows are header rows and name the columns from them.
+
+    Only the first ``MAX_HEADER_ROWS`` rows are looked at, so a table's first chunk
+    is enough to resolve its header (see ``chunked_cleaning``).
+
+    Returns
+    -------
+    tuple
+        ``(header_row_count, column_names)``, the names normalised and de-duplicated.
+    """
     # --- Step 2a: ROBUST ADAPTIVE HEADER DETECTION ---
     # Heuristic: A "simple" header is a single row followed by a data row. A data row
     # typically has a value in the first column. A complex header has multiple header
@@ -41,57 +150,183 @@ def process_table_with_pandas(input_file: str, boundaries_json_path: str, final_
         print("  [Analyze] Detected a simple, single-row header. Using direct processing.")
         header_row_count = 1
         header_df = table_df.iloc[:header_row_count]
-        data_df = table_df.iloc[header_row_count:].copy()
-        
-        new_columns_raw = [
-            str(name).strip().replace(' ', '_').replace('%', 'pct').replace('/', '_').lower()
-            for name in header_df.values[0]
-        ]
+
+        new_columns_raw = _normalize_names(
+            pd.Series(_as_text(header_df.to_numpy(dtype=object)[0]), dtype=object).str.strip()
+        ).tolist()
         
     else:
         # --- PATH B: COMPLEX HEADER ---
         print("  [Analyze] Detected a complex, multi-row header. Applying dynamic analysis.")
         
         header_row_count = 1
-        for i in range(1, min(5, len(table_df))):
+        for i in range(1, min(MAX_HEADER_ROWS, len(table_df))):
             if pd.notna(table_df.iloc[i, 0]) and str(table_df.iloc[i, 0]).strip():
                 header_row_count = i
                 break
             header_row_count = i + 1
         print(f"  [Analyze] Dynamically determined header is {header_row_count} rows deep.")
         
-        header_df = table_df.iloc[:header_row_count].copy()
-        data_df = table_df.iloc[header_row_count:].copy()
-        header_df.ffill(axis=1, inplace=True)
-
-        new_columns_raw = []
-        for col_idx in range(header_df.shape[1]):
-            levels = [str(header_df.iloc[row_idx, col_idx]) for row_idx in range(header_row_count)]
-            cleaned_levels = [lvl.strip() for lvl in levels if 'unnamed' not in lvl.lower() and lvl.lower() != 'nan']
-            unique_levels = list(pd.Series(cleaned_levels).unique())
-            new_name = '_'.join(unique_levels).replace(' ', '_').replace('%', 'pct').replace('/', '_').lower()
-            new_columns_raw.append(new_name or f'unnamed_col_{col_idx}')
+        header_df = table_df.iloc[:header_row_count]
+        new_columns_raw = build_header_names(header_df.to_numpy(dtype=object))
 
     # --- Step 2b: De-duplicate and Finalize Column Names ---
-    final_columns = []
-    counts = defaultdict(int)
-    for name in new_columns_raw:
-        counts[name] += 1
-        final_columns.append(f"{name}_{counts[name]-1}" if counts[name] > 1 else name)
+    final_columns = deduplicate_names(new_columns_raw)
     print("  [Clean] Headers have been finalized and de-duplicated.")
+    return header_row_count, final_columns
 
-    # --- Step 2c: Assign Headers and Clean Final DataFrame ---
-    data_df.columns = final_columns
-    
-    first_column_name = data_df.columns[0]
-    if first_column_name:
-        data_df = data_df[~data_df[first_column_name].astype(str).str.contains('TOTAL|DEPARTMENTS', case=False, na=False)]
-    
-    data_df.dropna(how='all', inplace=True)
-    data_df.reset_index(drop=True, inplace=True)
+
+def report_dropped_rows(dropped: dict, dropped_rows: dict = None):
+    """Print the rows each row-filter rule dropped from a table and add them to ``dropped_rows`` when given."""
+    if any(dropped.values()):
+        print("  [Filter] Dropped rows: " + ", ".join(f"{name} {count}" for name, count in dropped.items() if count) + ".")
+    if dropped_rows is not None:
+        for name, count in dropped.items():
+            dropped_rows[name] = dropped_rows.get(name, 0) + count
+
+
+def _save_table(data_df: pd.DataFrame, final_excel_path: str, final_csv_path: str, parquet_path: str,
+                feather_path: str, schema_json_path: str, coerce: bool = False) -> pd.DataFrame:
+    """Optionally coerce the cleaned table's types, write every output whose path is given, and return the table."""
+    if coerce:
+        data_df, schema = coerce_types(data_df)
+        print(f"  [Types] Coerced {len(schema)} columns: "
+              + ", ".join(f"{kind} {sum(col['kind'] == kind for col in schema)}"
+                          for kind in dict.fromkeys(col['kind'] for col in schema)) + ".")
+        if schema_json_path:
+            write_schema_report(schema, schema_json_path)
+            print(f"  [Save] Column schema report generated at '{schema_json_path}'")
 
     # --- Step 3: Save Final Outputs ---
-    data_df.to_excel(final_excel_path, index=False)
-    print(f"  [Save] Final clean Excel file generated at '{final_excel_path}'")
-    data_df.to_csv(final_csv_path, index=False)
-    print(f"  [Save] Final clean CSV file generated at '{final_csv_path}'")
\ No newline at end of file
+    if final_excel_path:
+        data_df.to_excel(final_excel_path, index=False)
+        print(f"  [Save] Final clean Excel file generated at '{final_excel_path}'")
+    if final_csv_path:
+        data_df.to_csv(final_csv_path, index=False)
+        print(f"  [Save] Final clean CSV file generated at '{final_csv_path}'")
+    if parquet_path or feather_path:
+        typed_df = data_df if coerce else infer_column_types(data_df)
+        if parquet_path:
+            typed_df.to_parquet(parquet_path, index=False, engine="pyarrow")
+            print(f"  [Save] Final clean Parquet file generated at '{parquet_path}'")
+        if feather_path:
+            typed_df.to_feather(feather_path, compression="uncompressed")
+            print(f"  [Save] Final clean Feather file generated at '{feather_path}'")
+    return data_df
+
+
+def cleaned_output_paths(base_path: str, formats=DEFAULT_OUTPUT_FORMATS) -> dict:
+    """
+    Output file path for every requested format, keyed by format.
+
+    ``base_path`` is the output path without extension, e.g. ``.../MyBook_sheet1_Data_cleaned``.
+    """
+    unknown = [fmt for fmt in formats if fmt not in OUTPUT_FORMATS]
+    if unknown:
+        raise ValueError(f"Unknown output format(s) {', '.join(unknown)}. Expected: {', '.join(OUTPUT_FORMATS)}")
+    return {fmt: f"{base_path}.{fmt}" for fmt in formats}
+
+
+def infer_column_types(data_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Typed copy of the cleaned table for columnar outputs.
+
+    A column becomes numeric (nullable Int64 when every value is whole, float64 otherwise)
+    when all of its non-empty cells parse as numbers; every other column is text.
+    Empty cells become nulls.
+    """
+    typed = []
+    for _, column in data_df.items():
+        values = column.to_numpy(dtype=object)
+        missing = pd.isna(values)
+        numbers = pd.to_numeric(pd.Series(values, dtype=object), errors="coerce")
+        if (~missing).any() and numbers.notna().sum() == (~missing).sum():
+            whole = numbers.dropna()
+            if (whole == whole.round()).all() and whole.abs().max() < 2 ** 53:
+                numbers = numbers.astype("Int64")
+            typed.append(numbers)
+        else:
+            typed.append(pd.Series(values, dtype="string"))
+    typed_df = pd.DataFrame(dict(enumerate(typed)))
+    typed_df.columns = data_df.columns
+    return typed_df
+
+def _as_text(values: np.ndarray) -> np.ndarray:
+    """``str()`` of every value, as objects: empty cells become 'nan', like ``str(np.nan)``."""
+    return values.astype(str).astype(object)
+
+
+def _normalize_names(names: pd.Series) -> pd.Series:
+    """Apply the column-name normalisation (spaces, '%' and '/' replaced, lower case) to a Series of strings."""
+    return (names.str.replace(' ', '_', regex=False).str.replace('%', 'pct', regex=False)
+            .str.replace('/', '_', regex=False).str.lower())
+
+
+def build_header_names(header_values: np.ndarray) -> list:
+    """
+    Build one column name per column from a multi-row header, for all columns at once.
+
+    Each header row is forward-filled to the right (merged group titles cover the
+    columns below them), then for every column the levels from top to bottom are
+    joined with '_', skipping empty and 'Unnamed' levels and levels already used
+    higher up in the same column. Columns without any level become
+    ``unnamed_col_{index}``.
+
+    Every step works on whole header rows as arrays, so the cost grows with the
+    number of header rows (at most a handful) rather than with cells one by one.
+
+    Parameters
+    ----------
+    header_values : np.ndarray
+        The header rows of the table, shape (header rows, columns), object dtype.
+
+    Returns
+    -------
+    list of str
+        The normalised, not yet de-duplicated column names.
+    """
+    row_count, col_count = header_values.shape
+
+    # Forward-fill along each row: every cell takes the last non-empty cell at or left of it
+    present = ~pd.isna(header_values)
+    source_col = np.where(present, np.arange(col_count), 0)
+    np.maximum.accumulate(source_col, axis=1, out=source_col)
+    filled = np.take_along_axis(header_values, source_col, axis=1)
+
+    levels, keep = [], []
+    for row in range(row_count):
+        text = pd.Series(_as_text(filled[row]), dtype=object)
+        lowered = text.str.lower()
+        keep.append((~lowered.str.contains('unnamed', regex=False) & (lowered != 'nan')).to_numpy())
+        levels.append(text.str.strip().to_numpy(dtype=object))
+
+    names = np.full(col_count, '', dtype=object)
+    has_level = np.zeros(col_count, dtype=bool)
+    for row in range(row_count):
+        # A level repeated from a higher row of the same column is used only once
+        take = keep[row].copy()
+        for above in range(row):
+            take &= ~(keep[above] & (levels[above] == levels[row]))
+        separator = np.where(has_level & take, HEADER_LEVEL_SEPARATOR, '')
+        names = np.where(take, names + separator + levels[row], names)
+        has_level |= take
+
+    names = _normalize_names(pd.Series(names, dtype=object))
+    empty = (names == '').to_numpy()
+    if empty.any():
+        names[empty] = [f'unnamed_col_{col_idx}' for col_idx in np.flatnonzero(empty)]
+    return names.tolist()
+
+
+def deduplicate_names(names: list) -> list:
+    """
+    Make repeated column names distinct: the n-th repeat of ``name`` becomes ``name_n``.
+
+    Occurrences are numbered with a single group-wise cumulative count instead of a
+    Python loop; the first occurrence keeps its name.
+    """
+    names = np.asarray(names, dtype=object)
+    occurrence = pd.Series(names, dtype=object).groupby(names, sort=False).cumcount().to_numpy()
+    repeated = np.flatnonzero(occurrence)
+    names[repeated] = names[repeated] + '_' + occurrence[repeated].astype(str).astype(object)
+    return names.tolist()
@@ -0,0 +1,166 @@
+"""
+Sheet encodings for the LLM boundary prompt, and prompt token counting.
+
+Two encodings of the sampled sheet rows are available:
+
+    table     ``DataFrame.to_string``: fixed-width columns, 'NaN' in every empty
+              cell. The original encoding, kept as the default so cached answers
+              stay valid.
+    compact   One line per row, ``<row index>: <cells>`` with cells separated by
+              ' | '. Runs of empty cells become ``~n``, trailing empty cells and
+              columns that are empty in every shown row are dropped, runs of empty
+              rows collapse into one ``<first>-<last>: (empty)`` line, and cell text
+              is cut to ``max_cell_chars``. Row indices are kept exactly, so the
+              model's answer needs no translation.
+
+The compact text is kept within a token budget: when it is too long, long cells
+are cut shorter first, then fewer head and tail rows are shown.
+
+Tokens are counted with ``tiktoken`` when it is installed and its encoding can
+be loaded, otherwise estimated as one token per ``CHARS_PER_TOKEN`` characters.
+"""
+
+import functools
+import math
+
+import pandas as pd
+
+from stage_registry import PROMPT_ENCODINGS, DEFAULT_PROMPT_ENCODING, DEFAULT_TOKEN_BUDGET
+
+DEFAULT_MAX_CELL_CHARS = 40
+# The compact encoding never cuts cells shorter than this, nor shows fewer head/tail rows
+MIN_CELL_CHARS = 12
+MIN_SAMPLE_ROWS = 8
+# Rough size of a token in English and number-heavy text, used without tiktoken
+CHARS_PER_TOKEN = 4
+OMITTED_ROWS_LINE = "[... rows {first}-{last} omitted ...]"
+
+
+@functools.lru_cache(maxsize=None)
+def _tiktoken_encoding(model: str):
+    """The tiktoken encoding of ``model``, or None when tiktoken or its data is unavailable."""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:  # the encoding files are downloaded on first use, which fails offline
+        return None
+
+
+def token_counter(model: str) -> str:
+    """Name of the method ``count_tokens`` uses for ``model``: 'tiktoken' or 'chars/4'."""
+    return "tiktoken" if _tiktoken_encoding(model) is not None else f"chars/{CHARS_PER_TOKEN}"
+
+
+def count_tokens(text: str, model: str) -> int:
+    """Tokens of ``text`` for ``model``; estimated from its length without tiktoken."""
+    encoding = _tiktoken_encoding(model)
+    if encoding is None:
+        return math.ceil(len(text) / CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def encode_compact(df: pd.DataFrame, total_rows: int, sample_rows: int, model: str,
+                   token_budget: int = DEFAULT_TOKEN_BUDGET, max_cell_chars: int = DEFAULT_MAX_CELL_CHARS) -> str:
+    """
+    Encode the sheet, or its head and tail rows, in the compact encoding.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        The sheet grid, or a head/tail sample of it, indexed by sheet row position.
+    total_rows : int
+        Rows of the full sheet; above ``2 * sample_rows`` only the head and tail are shown.
+    sample_rows : int
+        Head and tail rows to show of a large sheet, before the budget shrinks them.
+    model : str
+        Model whose tokenizer measures the budget.
+    token_budget : int
+        Upper limit of tokens for the encoded text; None or 0 for no limit. The
+        limit is met unless even the smallest cell width and row sample exceed it.
+    max_cell_chars : int
+        Longest cell text before it is cut and marked with '…'.
+
+    Returns
+    -------
+    str
+        The encoded text.
+    """
+    if len(df) > 2 * sample_rows:
+        df = pd.concat([df.iloc[:sample_rows], df.iloc[-sample_rows:]])
+    values = df.to_numpy(dtype=object)
+    present = pd.notna(values)
+    if present.any():
+        text = pd.Series(values[present], dtype=object).astype(str).str.strip()
+        present[present] = (text != "").to_numpy()
+    positions = [int(position) for position in df.index]
+
+    shown = list(range(len(df)))
+    while True:
+        encoded = _render(values, present, positions, shown, total_rows, max_cell_chars)
+        if not token_budget or count_tokens(encoded, model) <= token_budget:
+            return encoded
+        if max_cell_chars > MIN_CELL_CHARS:
+            max_cell_chars = max(MIN_CELL_CHARS, max_cell_chars // 2)
+        elif sample_rows > MIN_SAMPLE_ROWS and len(shown) > 2 * MIN_SAMPLE_ROWS:
+            sample_rows = max(MIN_SAMPLE_ROWS, min(sample_rows, len(shown) // 2) // 2)
+            shown = list(range(sample_rows)) + list(range(len(df) - sample_rows, len(df)))
+        else:
+            return encoded
+
+
+def _render(values, present, positions: list, shown: list, total_rows: int, max_cell_chars: int) -> str:
+    """The compact text of rows ``shown`` (row numbers into ``values``)."""
+    kept_columns = [col for col in range(values.shape[1]) if present[shown, col].any()] if shown else []
+    dropped = values.shape[1] - len(kept_columns)
+    lines = [
+        f"Sheet of {total_rows} rows x {values.shape[1]} columns. Each line is '<row index>: <cells>', "
+        f"cells separated by ' | '; '~n' stands for n empty cells"
+        + (f"; {dropped} empty columns are left out" if dropped else "") + "."
+    ]
+    previous = None
+    empty_from = None
+    for row in shown:
+        position = positions[row]
+        if previous is not None and position > positions[previous] + 1:
+            lines.extend(_empty_run(empty_from, positions[previous]))
+            empty_from = None
+            lines.append(OMITTED_ROWS_LINE.format(first=positions[previous] + 1, last=position - 1))
+        previous = row
+        cells = _row_cells(values[row], present[row], kept_columns, max_cell_chars)
+        if not cells:
+            empty_from = position if empty_from is None else empty_from
+            continue
+        lines.extend(_empty_run(empty_from, position - 1))
+        empty_from = None
+        lines.append(f"{position}: {cells}")
+    if previous is not None:
+        lines.extend(_empty_run(empty_from, positions[previous]))
+    return "\n".join(lines)
+
+
+def _empty_run(first, last) -> list:
+    if first is None:
+        return []
+    return [f"{first}: (empty)" if first == last else f"{first}-{last}: (empty)"]
+
+
+def _row_cells(row_values, row_present, kept_columns: list, max_cell_chars: int) -> str:
+    """One row's cells, with runs of empty cells as '~n' and trailing empty cells dropped."""
+    cells, empty_run = [], 0
+    for col in kept_columns:
+        if not row_present[col]:
+            empty_run += 1
+            continue
+        if empty_run:
+            cells.append(f"~{empty_run}")
+            empty_run = 0
+        text = " ".join(str(row_values[col]).split()).replace("|", "/")
+        if len(text) > max_cell_chars:
+            text = text[:max_cell_chars - 1] + "…"
+        cells.append(text)
+    return " | ".join(cells)
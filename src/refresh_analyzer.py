@@ -0,0 +1,107 @@
+"""
+Refresh-necessity analysis.
+
+Decides, without loading the workbook, whether the refresh stage can change
+anything. Refreshing only matters when a workbook has formula cells (their cached
+values may be stale), data connections or query tables (their data may be stale),
+pivot caches, or links to external workbooks. A sheet of literal values looks the
+same before and after a refresh, so the stage can be skipped for it.
+
+The checks read the package structure and scan each worksheet XML part as a
+byte stream for formula elements, stopping at the first one found, so the cost
+is a fraction of opening the workbook.
+"""
+
+import re
+import zipfile
+
+from sheets_to_excel import _read_package, _read_relationships
+
+# A formula element: <f>, <f t="shared" .../>, or a prefixed <x:f>. <formula> (used by
+# conditional formats and data validation) does not match, and needs no refresh.
+FORMULA_TAG_PATTERN = re.compile(rb'<(?:\w+:)?f[\s>/]')
+FORMULA_SCAN_CHUNK_SIZE = 1024 * 1024
+
+# Workbook-level parts that make a refresh necessary, keyed by archive folder
+WORKBOOK_REFRESH_PARTS = {
+    "xl/connections.xml": "data connections",
+    "xl/pivotCache/": "pivot caches",
+    "xl/externalLinks/": "external workbook links",
+}
+# Worksheet relationships that make a refresh necessary, keyed by relationship type suffix
+SHEET_REFRESH_RELATIONSHIPS = {
+    "/pivotTable": "pivot tables",
+    "/queryTable": "query tables",
+}
+
+
+def analyze_refresh_need(workbook_path: str) -> dict:
+    """
+    Find out which sheets of a workbook need the refresh stage, and why.
+
+    Parameters
+    ----------
+    workbook_path : str
+        Path to the .xlsx workbook.
+
+    Returns
+    -------
+    dict
+        'needs_refresh' (True when any sheet needs it), 'workbook_reasons' (reasons that
+        apply to the whole workbook, such as data connections) and 'sheets', mapping
+        each sheet name to the list of reasons found in that sheet (empty when the
+        sheet holds only literal values).
+    """
+    with zipfile.ZipFile(workbook_path) as archive:
+        names = archive.namelist()
+        workbook_reasons = [
+            reason for prefix, reason in WORKBOOK_REFRESH_PARTS.items()
+            if any(name.startswith(prefix) for name in names)
+        ]
+        sheets = {}
+        for sheet in _read_package(archive)["sheets"]:
+            reasons = []
+            if sheet["part"] in archive.NameToInfo and _has_formula_cells(archive, sheet["part"]):
+                reasons.append("formula cells")
+            for rel in _read_relationships(archive, sheet["part"]):
+                for suffix, reason in SHEET_REFRESH_RELATIONSHIPS.items():
+                    if rel["type"].endswith(suffix) and reason not in reasons:
+                        reasons.append(reason)
+            sheets[sheet["name"]] = reasons
+
+    return {
+        "needs_refresh": bool(workbook_reasons) or any(sheets.values()),
+        "workbook_reasons": workbook_reasons,
+        "sheets": sheets,
+    }
+
+
+def describe_refresh_need(analysis: dict, sheet_name: str = None) -> str:
+    """
+    One-line reason for running or skipping the refresh of a workbook or one of its sheets.
+
+    Without ``sheet_name`` the reasons of every sheet are combined.
+    """
+    if sheet_name is None:
+        sheet_reasons = [reason for reasons in analysis["sheets"].values() for reason in reasons]
+    else:
+        sheet_reasons = analysis["sheets"].get(sheet_name, [])
+    reasons = list(dict.fromkeys(analysis["workbook_reasons"] + sheet_reasons))
+    if reasons:
+        return "contains " + ", ".join(reasons)
+    return "no formulas, data connections, pivot caches or external links"
+
+
+def _has_formula_cells(archive, worksheet_path: str) -> bool:
+    """Scan a worksheet part for a formula element, stopping at the first match."""
+    tail = b""
+    with archive.open(worksheet_path) as src:
+        while True:
+            chunk = src.read(FORMULA_SCAN_CHUNK_SIZE)
+            if not chunk:
+                return False
+            buffer = tail + chunk
+            if FORMULA_TAG_PATTERN.search(buffer):
+                return True
+            # Keep an overlap so a tag split across two chunks is still found
+            tail = buffer[-16:]
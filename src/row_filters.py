@@ -0,0 +1,274 @@
+"""
+Declarative row filters for cleaned tables.
+
+Which rows of a table are totals, footnotes or padding differs from one report
+layout to the next, so the filter is a list of rules instead of code. Rules are
+JSON objects, kept in a rule file (a list, or ``{"rules": [...]}``) handed to the
+pipeline with ``--row-filters``. Every rule drops the rows it matches:
+
+    regex          ``pattern`` is searched in the text of ``column`` ('*' for any column).
+    column         the stripped text of ``column`` is one of ``values``.
+    empty          all (``how: "all"``) or any (``how: "any"``) of ``columns`` are empty;
+                   with ``blank_text`` whitespace-only text counts as empty too.
+    numeric_range  the number in ``column`` lies outside ``min``..``max`` (or inside,
+                   with ``drop: "inside"``); text that is not a number is kept unless
+                   ``non_numeric: "drop"``. Numbers are parsed like ``--coerce-types``
+                   does (thousands separators, currency, accounting negatives, %).
+    footnote       the text of ``column`` starts like a footnote (``pattern``, by default
+                   ``DEFAULT_FOOTNOTE_PATTERN``: '/1', '(1)', '*', 'Note', 'Source', ...);
+                   with ``to_end`` every row from the first footnote on is dropped,
+                   also across the chunks of a table cleaned with ``--chunk-size``.
+
+``column`` is a column name or a position (0 is the first column) and defaults to
+the first column, which is skipped when it has no name; rules on a column the
+table does not have match nothing. Text rules match case-insensitively unless
+``case`` is true. Every rule may carry a ``name`` for the report.
+
+``RowFilter`` validates and compiles the rules once. Applying it evaluates every
+rule as a vectorized operation over whole columns, converting each column it
+touches to text (and numbers) only once however many rules read it, ORs the
+rule masks into one boolean mask, and slices the table once. The rows each rule
+dropped are counted; a row matched by several rules is counted for the first.
+
+Without a rule file ``DEFAULT_RULES`` apply: rows whose first column mentions
+TOTAL or DEPARTMENTS, and rows with no value at all.
+"""
+
+import json
+import re
+
+import numpy as np
+import pandas as pd
+
+from type_coercion import parse_numbers
+
+RULE_TYPES = ("regex", "column", "empty", "numeric_range", "footnote")
+DEFAULT_FOOTNOTE_PATTERN = r"\s*(?:/\d+|\(\d+\)|\d+/|\*|†|‡|notes?\b|sources?\b|footnotes?\b)"
+DEFAULT_RULES = [
+    {"name": "totals", "type": "regex", "pattern": "TOTAL|DEPARTMENTS"},
+    {"name": "empty_rows", "type": "empty", "how": "all"},
+]
+# Keys every rule may have, and the extra keys of each rule type
+COMMON_KEYS = {"name", "type"}
+RULE_KEYS = {
+    "regex": {"pattern", "column", "case"},
+    "column": {"column", "values", "case"},
+    "empty": {"how", "columns", "blank_text"},
+    "numeric_range": {"column", "min", "max", "drop", "non_numeric"},
+    "footnote": {"pattern", "column", "case", "to_end"},
+}
+
+
+class RowFilter:
+    """
+    A compiled list of row-filter rules.
+
+    Attributes:
+        rules (list of dict): The validated rules, each with its 'name' filled in.
+    """
+
+    def __init__(self, rules: list = None):
+        rules = DEFAULT_RULES if rules is None else rules
+        if not isinstance(rules, list):
+            raise ValueError("Row filter rules must be a list of rule objects")
+        self.rules = []
+        self._compiled = []
+        for position, rule in enumerate(rules, start=1):
+            rule = _validate(rule, position)
+            self.rules.append(rule)
+            self._compiled.append(_compile(rule))
+
+    @classmethod
+    def from_file(cls, path: str) -> "RowFilter":
+        """Load the rules from a JSON rule file: a list of rules or an object with a 'rules' list."""
+        return cls(load_rules(path))
+
+    def mask(self, data_df: pd.DataFrame, state: dict = None) -> tuple:
+        """
+        Evaluate every rule on ``data_df``.
+
+        ``state`` carries what a rule needs to know about earlier rows when a table
+        is filtered in consecutive chunks (see ``chunked_cleaning``): pass the same
+        dict, initially empty, for every chunk of one table. A ``footnote`` rule with
+        ``to_end`` then keeps dropping every row after a footnote found in an earlier chunk.
+
+        Returns
+        -------
+        tuple
+            ``(drop, dropped)``: a boolean array, True for the rows to drop, and the
+            number of rows each rule dropped by rule name, in rule order.
+        """
+        columns = _ColumnCache(data_df)
+        drop = np.zeros(len(data_df), dtype=bool)
+        dropped = {}
+        for position, (rule, evaluate) in enumerate(zip(self.rules, self._compiled)):
+            matched = evaluate(columns)
+            if state is not None and rule.get("to_end"):
+                if state.get(position):
+                    matched = np.ones(len(data_df), dtype=bool)
+                elif matched.any():
+                    state[position] = True
+            dropped[rule["name"]] = dropped.get(rule["name"], 0) + int((matched & ~drop).sum())
+            drop |= matched
+        return drop, dropped
+
+    def apply(self, data_df: pd.DataFrame, state: dict = None) -> tuple:
+        """Drop the matching rows in one slice; returns ``(kept_df, dropped)``, see ``mask``."""
+        drop, dropped = self.mask(data_df, state)
+        kept = data_df[~drop] if drop.any() else data_df
+        return kept.reset_index(drop=True), dropped
+
+
+def load_rules(path: str) -> list:
+    """Read the rule list of a JSON rule file."""
+    with open(path, "r") as f:
+        rules = json.load(f)
+    if isinstance(rules, dict):
+        rules = rules.get("rules")
+    if not isinstance(rules, list):
+        raise ValueError(f"Row filter file '{path}' must hold a list of rules or an object with a 'rules' list")
+    return rules
+
+
+def _validate(rule, position: int) -> dict:
+    """Check a rule's type and keys and fill in its default name."""
+    if not isinstance(rule, dict):
+        raise ValueError(f"Row filter rule {position} must be an object, not {type(rule).__name__}")
+    rule_type = rule.get("type")
+    if rule_type not in RULE_TYPES:
+        raise ValueError(f"Row filter rule {position} has unknown type '{rule_type}'. "
+                         f"Expected one of: {', '.join(RULE_TYPES)}")
+    unknown = set(rule) - COMMON_KEYS - RULE_KEYS[rule_type]
+    if unknown:
+        raise ValueError(f"Row filter rule {position} ({rule_type}) has unknown keys: {', '.join(sorted(unknown))}")
+    if rule_type == "column" and not isinstance(rule.get("values"), list):
+        raise ValueError(f"Row filter rule {position} (column) needs a 'values' list")
+    if rule_type == "regex" and not rule.get("pattern"):
+        raise ValueError(f"Row filter rule {position} (regex) needs a 'pattern'")
+    if rule_type == "numeric_range" and rule.get("min") is None and rule.get("max") is None:
+        raise ValueError(f"Row filter rule {position} (numeric_range) needs 'min' and/or 'max'")
+    if rule_type == "empty" and rule.get("how", "all") not in ("all", "any"):
+        raise ValueError(f"Row filter rule {position} (empty) has 'how' '{rule['how']}'; expected 'all' or 'any'")
+    if rule_type == "numeric_range" and (rule.get("drop", "outside") not in ("outside", "inside")
+                                         or rule.get("non_numeric", "keep") not in ("keep", "drop")):
+        raise ValueError(f"Row filter rule {position} (numeric_range) needs 'drop' outside|inside "
+                         f"and 'non_numeric' keep|drop")
+    return {**rule, "name": str(rule.get("name") or f"{rule_type}_{position}")}
+
+
+def _compile(rule: dict):
+    """The rule as a function of a ``_ColumnCache`` returning the boolean mask of the rows it matches."""
+    rule_type = rule["type"]
+    column = rule.get("column")
+    flags = 0 if rule.get("case") else re.IGNORECASE
+
+    if rule_type == "regex":
+        pattern = re.compile(rule["pattern"], flags)
+        if column == "*":
+            def any_column(columns):
+                matched = columns.false()
+                for position in columns.all():
+                    matched |= columns.text(position).str.contains(pattern, na=False).to_numpy(dtype=bool)
+                return matched
+            return any_column
+        return lambda columns: columns.matches(column, lambda text: text.str.contains(pattern, na=False))
+
+    if rule_type == "footnote":
+        pattern = re.compile(rule.get("pattern") or DEFAULT_FOOTNOTE_PATTERN, flags)
+        to_end = bool(rule.get("to_end"))
+
+        def footnotes(columns):
+            matched = columns.matches(column, lambda text: text.str.match(pattern, na=False))
+            return np.logical_or.accumulate(matched) if to_end and len(matched) else matched
+        return footnotes
+
+    if rule_type == "column":
+        case = bool(rule.get("case"))
+        values = {str(value).strip() if case else str(value).strip().lower() for value in rule["values"]}
+        return lambda columns: columns.matches(
+            column, lambda text: (text.str.strip() if case else text.str.strip().str.lower()).isin(values))
+
+    if rule_type == "empty":
+        how, blank_text, selected = rule.get("how", "all"), bool(rule.get("blank_text")), rule.get("columns")
+
+        def empty(columns):
+            targets = columns.all() if selected is None else [columns.resolve(col) for col in selected]
+            masks = [columns.empty(col, blank_text) for col in targets if col is not None]
+            if not masks:
+                return columns.false()
+            stacked = np.vstack(masks)
+            return stacked.all(axis=0) if how == "all" else stacked.any(axis=0)
+        return empty
+
+    low = -np.inf if rule.get("min") is None else float(rule["min"])
+    high = np.inf if rule.get("max") is None else float(rule["max"])
+    inside, drop_text = rule.get("drop", "outside") == "inside", rule.get("non_numeric", "keep") == "drop"
+
+    def numeric_range(columns):
+        position = columns.resolve(column)
+        if position is None:
+            return columns.false()
+        numbers, present = columns.numbers(position)
+        within = (numbers >= low) & (numbers <= high)
+        matched = (within if inside else ~within) & ~np.isnan(numbers)
+        if drop_text:
+            matched |= present & np.isnan(numbers)
+        return matched
+    return numeric_range
+
+
+class _ColumnCache:
+    """Per-column text and number conversions of one table, each computed once and shared by all rules."""
+
+    def __init__(self, data_df: pd.DataFrame):
+        self.data_df = data_df
+        self._text, self._numbers = {}, {}
+
+    def all(self) -> list:
+        return list(range(self.data_df.shape[1]))
+
+    def false(self) -> np.ndarray:
+        return np.zeros(len(self.data_df), dtype=bool)
+
+    def resolve(self, column):
+        """
+        Position of ``column`` (a name or a position), or None when the table lacks it.
+
+        None stands for the first column, which is left alone when it has no name
+        (a headerless row-label column), as the hard-coded filter did.
+        """
+        names = self.data_df.columns
+        if column is None:
+            return 0 if len(names) and names[0] else None
+        if isinstance(column, int) and not isinstance(column, bool):
+            return column if -len(names) <= column < len(names) else None
+        matches = np.flatnonzero(names == column)
+        return int(matches[0]) if len(matches) else None
+
+    def text(self, position: int) -> pd.Series:
+        if position not in self._text:
+            self._text[position] = self.data_df.iloc[:, position].astype(str)
+        return self._text[position]
+
+    def matches(self, column, test) -> np.ndarray:
+        """Boolean mask of ``test`` applied to the text of ``column``; all False when the table lacks it."""
+        position = self.resolve(column)
+        if position is None:
+            return self.false()
+        return test(self.text(position)).to_numpy(dtype=bool)
+
+    def empty(self, position: int, blank_text: bool) -> np.ndarray:
+        missing = self.data_df.iloc[:, position].isna().to_numpy()
+        if blank_text:
+            missing = missing | (self.text(position).str.strip() == "").fillna(False).to_numpy(dtype=bool)
+        return missing
+
+    def numbers(self, position: int) -> tuple:
+        """Parsed numbers of a column (NaN where not a number) and the mask of its non-empty cells."""
+        if position not in self._numbers:
+            column = self.data_df.iloc[:, position]
+            text = pd.Series(column.to_numpy(dtype=object), dtype="string").str.strip()
+            text = text.mask(text == "")
+            numbers, _ = parse_numbers(text)
+            self._numbers[position] = (numbers.to_numpy(dtype=float, na_value=np.nan), text.notna().to_numpy())
+        return self._numbers[position]
@@ -0,0 +1,122 @@
+"""
+Run manifest for incremental, resumable pipeline runs.
+
+``run_manifest.json`` in the output directory records, for the split stage and
+for every sheet's refresh, boundaries and clean stages, the content hash of the
+stage input, the settings that influence the stage, and the files it wrote. On
+the next run a stage whose input hash and settings match and whose outputs still
+exist is skipped and its recorded outputs are reused. A stage that failed has no
+record, so a re-run resumes from it; everything before it is reused.
+
+Stage records travel through worker processes as plain dicts; only the main
+process reads and writes the manifest file.
+"""
+
+import datetime
+import hashlib
+import json
+import os
+import tempfile
+
+MANIFEST_FILE_NAME = "run_manifest.json"
+MANIFEST_VERSION = 1
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Run options that change each stage's result; a changed value reruns the stage.
+STAGE_SETTINGS = {
+    "split": ("split_engine", "split_mode", "values_only"),
+    "refresh": ("refresh_engine", "always_refresh"),
+    "boundaries": ("boundary_engine", "confidence_threshold", "multi_table", "prompt_encoding", "token_budget"),
+    "clean": ("formats", "coerce_types", "row_filter_rules"),
+}
+# The stages every sheet runs, in order, after the workbook-level split (see ``pipeline.process_sheet_file``).
+SHEET_STAGES = ("refresh", "boundaries", "clean")
+
+
+def file_hash(path: str) -> str:
+    """SHA-256 of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def combined_hash(*hashes: str) -> str:
+    """One hash for a stage that reads several inputs."""
+    return hashlib.sha256("\0".join(hashes).encode("utf-8")).hexdigest()
+
+
+def stage_settings(stage: str, options: dict) -> dict:
+    """The run options that influence ``stage``, as stored in its record."""
+    settings = {}
+    for key in STAGE_SETTINGS[stage]:
+        value = options.get(key)
+        settings[key] = list(value) if isinstance(value, tuple) else value
+    return settings
+
+
+def make_record(input_hash: str, settings: dict, outputs: dict, **details) -> dict:
+    """A completed stage: its input hash, settings, output paths by name, and any extra details."""
+    return {"input_hash": input_hash, "settings": settings, "outputs": outputs, **details}
+
+
+def current_record(records: dict, stage: str, input_hash: str, settings: dict):
+    """
+    Return the record of ``stage`` when it can be reused, otherwise None.
+
+    A record is reusable when it was made from the same input hash and settings and
+    every output file it lists still exists.
+    """
+    record = (records or {}).get(stage)
+    if not record or record["input_hash"] != input_hash or record["settings"] != settings:
+        return None
+    if not all(os.path.exists(path) for path in record["outputs"].values()):
+        return None
+    return record
+
+
+class RunManifest:
+    """
+    The ``run_manifest.json`` of one output directory.
+
+    Attributes:
+        path (str): Location of the manifest file.
+        data (dict): 'version', 'input_file', 'split' (the split stage record) and
+            'sheets' (per sheet label: 'status' and its stage records).
+    """
+
+    def __init__(self, output_dir: str, fresh: bool = False):
+        self.path = os.path.join(output_dir, MANIFEST_FILE_NAME)
+        self.data = {"version": MANIFEST_VERSION, "input_file": None, "split": None, "sheets": {}}
+        if not fresh:
+            self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") == MANIFEST_VERSION:
+            self.data = data
+
+    def sheet_stages(self, label: str) -> dict:
+        """Stage records of a sheet from the previous run (empty when there are none)."""
+        return self.data["sheets"].get(label, {}).get("stages", {})
+
+    def record_sheet(self, label: str, status: str, stages: dict):
+        self.data["sheets"][label] = {"status": status, "stages": stages}
+
+    def keep_sheets(self, labels: list):
+        """Forget sheets that are no longer part of the workbook."""
+        self.data["sheets"] = {label: entry for label, entry in self.data["sheets"].items() if label in labels}
+
+    def save(self):
+        """Write the manifest atomically, so an interrupted run never leaves a partial file."""
+        self.data["updated"] = datetime.datetime.now().isoformat(timespec="seconds")
+        directory = os.path.dirname(self.path) or "."
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(self.data, f, indent=2)
+        os.replace(tmp_path, self.path)
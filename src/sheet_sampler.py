@@ -0,0 +1,132 @@
+"""
+Constant-memory head/tail sample of a worksheet for LLM boundary detection.
+
+The model only ever sees the first and the last ``SAMPLE_ROW_COUNT`` rows of a
+large sheet, so parsing the whole sheet with ``pd.read_excel`` just to throw
+nearly all of it away is wasted work. ``sample_sheet`` streams the sheet once
+with openpyxl's read-only iterator instead: the first N rows are kept as they
+arrive, the last N rows live in a bounded ring buffer, and the rows are counted
+in the same pass. Memory stays the same whether the sheet has a hundred rows or
+a million.
+
+Cells are converted exactly like ``pd.read_excel(header=None, dtype=str)`` does
+(the same cell conversion, trailing empty rows trimmed, default NA texts read
+as missing, and in every column the first of the equal values ``True``/``1``
+or ``False``/``0`` standing in for the later ones, as pandas' string
+conversion does), and the sample is indexed by the row positions of that full read.
+So the prompt built from a sample is identical to the one built from the full
+grid, boundary cache keys stay the same, and the indices the model answers
+match what ``process_table_with_pandas`` later slices.
+"""
+
+import collections
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+from openpyxl.cell.cell import TYPE_ERROR, TYPE_NUMERIC
+
+# Cell texts pandas reads as missing by default (the ``na_values`` of ``read_excel``)
+NA_TEXTS = frozenset({
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+})
+
+
+class SheetSample:
+    """
+    Head and tail rows of one worksheet.
+
+    Attributes:
+        frame (pd.DataFrame): The sampled rows as strings, indexed by their row
+            position in the full sheet. Holds every row when the sheet has at
+            most ``2 * sample_rows`` rows.
+        total_rows (int): Row count of the full sheet, as ``pd.read_excel`` reads it.
+        total_columns (int): Column count of the full sheet.
+    """
+
+    def __init__(self, frame: pd.DataFrame, total_rows: int, total_columns: int):
+        self.frame = frame
+        self.total_rows = total_rows
+        self.total_columns = total_columns
+
+
+def _convert_cell(cell):
+    """Cell value as pandas' openpyxl reader converts it; empty cells become ''."""
+    if cell.value is None:
+        return ""
+    if cell.data_type == TYPE_ERROR:
+        return np.nan
+    if cell.data_type == TYPE_NUMERIC:
+        value = int(cell.value)
+        return value if value == cell.value else float(cell.value)
+    return cell.value
+
+
+def _as_text(value):
+    """The string ``read_excel(dtype=str)`` holds for a converted cell value, or NaN."""
+    if isinstance(value, float) and np.isnan(value):
+        return np.nan
+    text = str(value)
+    return np.nan if text in NA_TEXTS else text
+
+
+def sample_sheet(file_path: str, sample_rows: int, sheet_name=0) -> SheetSample:
+    """
+    Stream a worksheet once and keep only its first and last ``sample_rows`` rows.
+
+    Parameters
+    ----------
+    file_path : str
+        The .xlsx file to read.
+    sample_rows : int
+        Rows to keep from the head and from the tail of the sheet.
+    sheet_name : int or str
+        Sheet position or title, as for ``pd.read_excel``.
+
+    Returns
+    -------
+    SheetSample
+        The sampled rows with their original row positions and the size of the sheet.
+    """
+    workbook = load_workbook(file_path, read_only=True, data_only=True, keep_links=False)
+    try:
+        sheet = workbook.worksheets[sheet_name] if isinstance(sheet_name, int) else workbook[sheet_name]
+        # Stored dimensions are often stale; iterate over the rows that are really there
+        sheet.reset_dimensions()
+
+        head = []
+        tail = collections.deque(maxlen=sample_rows)
+        last_row_with_data = -1
+        width = 0
+        # (column, value) -> first equal value seen in that column; at most two per column
+        first_seen = {}
+        for position, row in enumerate(sheet.rows):
+            values = [_convert_cell(cell) for cell in row]
+            while values and values[-1] == "":
+                values.pop()
+            for column, value in enumerate(values):
+                if type(value) in (bool, int) and value in (0, 1):
+                    values[column] = first_seen.setdefault((column, value), value)
+            if position < sample_rows:
+                head.append((position, values))
+            if not values:
+                continue
+            # Empty rows only count once a row with data follows them (trailing ones are
+            # trimmed), so they enter the ring buffer together with that row
+            for blank in range(max(last_row_with_data + 1, position - sample_rows), position):
+                tail.append((blank, []))
+            tail.append((position, values))
+            last_row_with_data = position
+            width = max(width, len(values))
+    finally:
+        workbook.close()
+
+    total_rows = last_row_with_data + 1
+    rows = dict(head[:total_rows])
+    rows.update(tail)
+    positions = sorted(rows)
+    grid = [[_as_text(value) for value in rows[position]] + [np.nan] * (width - len(rows[position]))
+            for position in positions]
+    frame = pd.DataFrame(grid, index=positions, columns=range(width), dtype=str)
+    return SheetSample(frame, total_rows, width)
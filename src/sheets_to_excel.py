@@ -5,12 +5,33 @@ Splits each sheet of an Excel (.xlsx) file into a separate Excel file using open
 Preserves cell formatting, formulas, merged cells, and styles, but may not preserve charts or images.
 Works on Windows, macOS, and Linux.
 
+Two split engines are available:
+    - openpyxl:  rebuilds each sheet through openpyxl cell objects (default).
+    - zip:       copies the worksheet XML and the parts it references straight from the
+                 source archive, next to the shared strings, styles and theme, and writes
+                 a rewritten workbook.xml and relationship files. Time scales with bytes
+                 copied rather than cell count.
+
+The openpyxl engine has two split modes:
+    - full:      loads the whole workbook and copies every cell with its styles (default).
+    - streaming: iterates the source in read-only mode and writes each sheet with a
+                 write-only workbook, so memory stays bounded by roughly one row.
+                 Values, formulas, number formats and merged ranges are carried over;
+                 fonts, fills, borders and alignment are not.
+
+In full mode each distinct source style is translated once and shared by every cell that
+uses it. With --values-only, styling is skipped entirely and only values, formulas and
+merged ranges are copied.
+
 Usage:
-    python v3_sheets_to_excel.py <input_excel_file.xlsx> <output_folder>
+    python v3_sheets_to_excel.py <input_excel_file.xlsx> <output_folder> [--engine openpyxl|zip] [--mode full|streaming] [--values-only]
 
 Args:
     input_excel_file.xlsx: Path to the source Excel file.
     output_folder: Directory where the separated sheet files will be saved.
+    --engine: Split engine, either 'openpyxl' (default) or 'zip'.
+    --mode: Split mode of the openpyxl engine, either 'full' (default) or 'streaming'.
+    --values-only: Skip all styling, including number formats.
 
 Dependencies:
     - openpyxl
@@ -21,11 +42,34 @@ Example:
 """
 
 import openpyxl
+from openpyxl.cell import WriteOnlyCell
+from copy import copy
 import os
+import re
 import sys
 import argparse
+import posixpath
+import shutil
+import zipfile
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape, quoteattr
+
+from stage_registry import SPLIT_ENGINES, SPLIT_MODES
+
+SHEET_MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+DOC_REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+CONTENT_TYPES_NS = "http://schemas.openxmlformats.org/package/2006/content-types"
+OFFICE_DOCUMENT_REL = DOC_REL_NS + "/officeDocument"
+# Workbook-level parts every split sheet may depend on; copied whole into each output.
+SHARED_WORKBOOK_PARTS = ("styles", "sharedStrings", "theme")
+ZIP_COPY_CHUNK_SIZE = 1024 * 1024
 
-def separate_sheets_with_openpyxl(input_file, output_folder):
+# Matches <mergeCell ref="A1:B2"/> entries in raw worksheet XML.
+MERGE_CELL_PATTERN = re.compile(rb'<(?:\w+:)?mergeCell\s+ref="([^"]+)"')
+MERGE_SCAN_CHUNK_SIZE = 1024 * 1024
+
+def separate_sheets_with_openpyxl(input_file, output_folder, mode="full", values_only=False):
     """
     Split each sheet of an Excel file into a new workbook using openpyxl.
 
@@ -35,9 +79,123 @@ def separate_sheets_with_openpyxl(input_file, output_folder):
     Args:
         input_file (str): Path to the source Excel file (.xlsx).
         output_folder (str): Directory where the separated sheet files will be saved.
+        mode (str): 'full' copies every cell with its styles from a fully loaded workbook.
+            'streaming' uses read-only iteration and write-only output workbooks so that
+            peak memory does not grow with the size of the workbook.
+        values_only (bool): Skip styling entirely and copy only values, formulas and merged
+            ranges. Downstream stages read values only, so this is the fastest split.
 
     Raises:
         SystemExit: If the input file does not exist or output directory cannot be created.
+        ValueError: If ``mode`` is not one of ``SPLIT_MODES``.
+    """
+    if mode not in SPLIT_MODES:
+        raise ValueError(f"Unknown split mode '{mode}'. Expected one of: {', '.join(SPLIT_MODES)}")
+
+    _validate_source(input_file, output_folder)
+
+    try:
+        source_wb = openpyxl.load_workbook(input_file, read_only=(mode == "streaming"))
+    except Exception as e:
+        print(f"❌ Error: Failed to read the Excel file '{input_file}': {e}")
+        print("   This may indicate the file is corrupted or not a true .xlsx file.")
+        print("   Please try opening and re-saving the file in Excel, or verify its integrity.")
+        sys.exit(1)
+
+    base_name = os.path.splitext(os.path.basename(input_file))[0]
+    print(f"\nProcessing '{os.path.basename(input_file)}'...")
+
+    style_cache = StyleCache()
+    for idx, sheet_name in enumerate(source_wb.sheetnames, start=1):
+        print(f"  - Processing sheet {idx}: '{sheet_name}'")
+        output_filename = sheet_file_name(output_folder, base_name, idx, sheet_name)
+
+        if mode == "streaming":
+            _stream_sheet(input_file, source_wb[sheet_name], output_filename, values_only=values_only)
+        else:
+            _copy_sheet(source_wb[sheet_name], output_filename, style_cache, values_only=values_only)
+
+    if mode == "streaming":
+        source_wb.close()
+    elif not values_only:
+        print(f"\n  Style cache: {style_cache.misses} distinct styles shared by {style_cache.hits + style_cache.misses} styled cells.")
+
+    print("\n🎉 Separation complete using openpyxl.")
+
+
+def separate_sheets_with_zip(input_file, output_folder):
+    """
+    Split each sheet of an Excel file into a new workbook by copying package parts.
+
+    A .xlsx file is a ZIP package in which every worksheet is already its own XML part.
+    Instead of rebuilding sheets cell by cell, each output workbook is assembled from the
+    source archive: the worksheet XML and everything it references (drawings, comments,
+    tables, pivot tables) are copied byte for byte together with the shared strings,
+    styles and theme, and only the small workbook.xml, relationship and content-type
+    parts are rewritten. Splitting time therefore scales with bytes copied, not with
+    cell count, and formatting is preserved exactly.
+
+    Output files use the same ``{base}_sheet{idx}_{name}.xlsx`` names as
+    ``separate_sheets_with_openpyxl``.
+
+    Args:
+        input_file (str): Path to the source Excel file (.xlsx).
+        output_folder (str): Directory where the separated sheet files will be saved.
+
+    Raises:
+        SystemExit: If the input file does not exist, is not a valid package, or the output
+            directory cannot be created.
+    """
+    _validate_source(input_file, output_folder)
+
+    try:
+        source_zip = zipfile.ZipFile(input_file)
+        package = _read_package(source_zip)
+    except Exception as e:
+        print(f"❌ Error: Failed to read the Excel package '{input_file}': {e}")
+        print("   This may indicate the file is corrupted or not a true .xlsx file.")
+        sys.exit(1)
+
+    base_name = os.path.splitext(os.path.basename(input_file))[0]
+    print(f"\nProcessing '{os.path.basename(input_file)}'...")
+
+    with source_zip:
+        for idx, sheet in enumerate(package["sheets"], start=1):
+            print(f"  - Processing sheet {idx}: '{sheet['name']}'")
+            output_filename = sheet_file_name(output_folder, base_name, idx, sheet["name"])
+            try:
+                print(f"    -> Saving to '{output_filename}'")
+                _write_sheet_package(source_zip, package, idx - 1, output_filename)
+            except Exception as e:
+                print(f"    -> ❌ Error saving '{output_filename}': {e}")
+
+    print("\n🎉 Separation complete using zip part copying.")
+
+
+def sheet_file_name(output_folder, base_name, idx, sheet_name):
+    """
+    Build the output path ``{base}_sheet{idx}_{name}.xlsx`` for one sheet.
+
+    Args:
+        output_folder (str): Directory of the split files.
+        base_name (str): Source file name without extension.
+        idx (int): One-based position of the sheet in the source workbook.
+        sheet_name (str): Sheet title; sanitized for use in a file name.
+    """
+    # Sanitize sheet name for filename
+    safe_sheet_name = "".join([c for c in sheet_name if c.isalnum() or c in (' ', '_', '-')]).rstrip().replace(' ', '_')
+
+    # Create output filename -> {originalfilename}_sheet{idx}_{sheetname}.xlsx
+    return os.path.join(output_folder, f"{base_name}_sheet{idx}_{safe_sheet_name}.xlsx")
+
+
+def _validate_source(input_file, output_folder):
+    """
+    Check that the input exists and looks like an .xlsx package, and prepare the output folder.
+
+    Raises:
+        SystemExit: If the input file does not exist, is not a ZIP package, or the output
+            directory cannot be created.
     """
     if not os.path.exists(input_file):
         print(f"❌ Error: The input file was not found at '{input_file}'")
@@ -63,83 +221,409 @@ def separate_sheets_with_openpyxl(input_file, output_folder):
         print(f"❌ Error: Could not read the file '{input_file}' for format validation: {e}")
         sys.exit(1)
 
-    try:
-        source_wb = openpyxl.load_workbook(input_file)
-    except Exception as e:
-        print(f"❌ Error: Failed to read the Excel file '{input_file}': {e}")
-        print("   This may indicate the file is corrupted or not a true .xlsx file.")
-        print("   Please try opening and re-saving the file in Excel, or verify its integrity.")
-        sys.exit(1)
 
-    base_name = os.path.splitext(os.path.basename(input_file))[0]
-    print(f"\nProcessing '{os.path.basename(input_file)}'...")
+class StyleCache:
+    """
+    Interns target styles so each distinct source style is translated only once.
 
-    for idx, sheet_name in enumerate(source_wb.sheetnames, start=1):
-        print(f"  - Processing sheet {idx}: '{sheet_name}'")
+    The splitter used to build new ``Font``, ``PatternFill``, ``Border`` and ``Alignment``
+    objects for every styled cell. The cache maps each source style id to a single shared
+    set of those objects, reused by every cell and every output workbook of a split run.
+
+    Attributes:
+        hits (int): Styled cells served from the cache.
+        misses (int): Distinct source styles that had to be translated.
+    """
+
+    def __init__(self):
+        self._styles = {}
+        self.hits = 0
+        self.misses = 0
+
+    def apply(self, cell, new_cell):
+        """
+        Give ``new_cell`` the target style matching the style of ``cell``.
 
-        # Create a new workbook for the sheet
-        new_wb = openpyxl.Workbook()
-        default_sheet = new_wb.active
-        new_wb.remove(default_sheet)
+        Args:
+            cell (Cell): Styled cell from the source workbook.
+            new_cell (Cell): Cell in the output workbook.
+        """
+        style_id = cell.style_id
+        target = self._styles.get(style_id)
+        if target is None:
+            self.misses += 1
+            target = (
+                openpyxl.styles.Font(
+                    name=cell.font.name,
+                    size=cell.font.size,
+                    bold=cell.font.bold,
+                    italic=cell.font.italic,
+                    color=cell.font.color,
+                ),
+                openpyxl.styles.PatternFill(
+                    fill_type=cell.fill.fill_type,
+                    start_color=cell.fill.start_color,
+                    end_color=cell.fill.end_color,
+                ),
+                openpyxl.styles.Border(
+                    left=cell.border.left,
+                    right=cell.border.right,
+                    top=cell.border.top,
+                    bottom=cell.border.bottom,
+                ),
+                openpyxl.styles.Alignment(
+                    horizontal=cell.alignment.horizontal,
+                    vertical=cell.alignment.vertical,
+                    wrap_text=cell.alignment.wrap_text,
+                ),
+                cell.number_format,
+            )
+            self._styles[style_id] = target
+        else:
+            self.hits += 1
+        new_cell.font, new_cell.fill, new_cell.border, new_cell.alignment, new_cell.number_format = target
 
-        # Get the source sheet
-        source_sheet = source_wb[sheet_name]
 
-        # Create a new sheet in the new workbook with the same title
-        new_sheet = new_wb.create_sheet(title=sheet_name)
+def _copy_sheet(source_sheet, output_filename, style_cache, values_only=False):
+    """
+    Copy one fully loaded sheet, cell by cell and with its styles, into a new workbook.
+
+    Args:
+        source_sheet (Worksheet): Sheet from a workbook loaded in full mode.
+        output_filename (str): Path of the single-sheet workbook to write.
+        style_cache (StyleCache): Shared translation of source styles to target styles.
+        values_only (bool): Copy values and formulas only, skipping all styling.
+    """
+    # Create a new workbook for the sheet
+    new_wb = openpyxl.Workbook()
+    default_sheet = new_wb.active
+    new_wb.remove(default_sheet)
 
-        # Copy data and formatting from the source to the new sheet
+    # Create a new sheet in the new workbook with the same title
+    new_sheet = new_wb.create_sheet(title=source_sheet.title)
+
+    if values_only:
+        # Rows are appended from A1, so cell positions are unchanged
+        for row in source_sheet.iter_rows(values_only=True):
+            new_sheet.append(row)
+    else:
+        # Source style id -> style array already registered in this output workbook.
+        # Copying the array skips re-hashing the shared style objects for every cell.
+        applied = {}
         for row in source_sheet.iter_rows():
             for cell in row:
                 new_cell = new_sheet.cell(row=cell.row, column=cell.column, value=cell.value)
                 if cell.has_style:
-                    # Copy cell font
-                    new_cell.font = openpyxl.styles.Font(
-                        name=cell.font.name,
-                        size=cell.font.size,
-                        bold=cell.font.bold,
-                        italic=cell.font.italic,
-                        color=cell.font.color,
-                    )
-                    # Copy cell fill
-                    new_cell.fill = openpyxl.styles.PatternFill(
-                        fill_type=cell.fill.fill_type,
-                        start_color=cell.fill.start_color,
-                        end_color=cell.fill.end_color,
-                    )
-                    # Copy cell border
-                    new_cell.border = openpyxl.styles.Border(
-                        left=cell.border.left,
-                        right=cell.border.right,
-                        top=cell.border.top,
-                        bottom=cell.border.bottom,
-                    )
-                    # Copy cell alignment
-                    new_cell.alignment = openpyxl.styles.Alignment(
-                        horizontal=cell.alignment.horizontal,
-                        vertical=cell.alignment.vertical,
-                        wrap_text=cell.alignment.wrap_text,
-                    )
-                    # Copy number format
-                    new_cell.number_format = cell.number_format
-
-        # Copy merged cells
-        for merge_range in source_sheet.merged_cells.ranges:
-            new_sheet.merge_cells(str(merge_range))
-
-        # Sanitize sheet name for filename
-        safe_sheet_name = "".join([c for c in sheet_name if c.isalnum() or c in (' ', '_', '-')]).rstrip().replace(' ', '_')
-
-        # Create output filename -> {originalfilename}_sheet{idx}_{sheetname}.xlsx
-        output_filename = os.path.join(output_folder, f"{base_name}_sheet{idx}_{safe_sheet_name}.xlsx")
-
-        try:
-            print(f"    -> Saving to '{output_filename}'")
-            new_wb.save(output_filename)
-        except Exception as e:
-            print(f"    -> ❌ Error saving '{output_filename}': {e}")
+                    style_array = applied.get(cell.style_id)
+                    if style_array is None:
+                        style_cache.apply(cell, new_cell)
+                        applied[cell.style_id] = new_cell._style
+                    else:
+                        style_cache.hits += 1
+                        new_cell._style = copy(style_array)
 
-    print("\n🎉 Separation complete using openpyxl.")
+    # Copy merged cells
+    for merge_range in source_sheet.merged_cells.ranges:
+        new_sheet.merge_cells(str(merge_range))
+
+    _save_workbook(new_wb, output_filename)
+
+
+def _stream_sheet(input_file, source_sheet, output_filename, values_only=False):
+    """
+    Stream one read-only sheet into a write-only workbook, one row at a time.
+
+    Only the current row is held in memory. Values, formulas and number formats are
+    copied per cell; merged ranges are collected from the raw worksheet XML because
+    read-only worksheets do not expose them.
+
+    Args:
+        input_file (str): Path to the source Excel file (.xlsx).
+        source_sheet (ReadOnlyWorksheet): Sheet from a workbook loaded with ``read_only=True``.
+        output_filename (str): Path of the single-sheet workbook to write.
+        values_only (bool): Skip number formats and write plain values.
+    """
+    new_wb = openpyxl.Workbook(write_only=True)
+    new_sheet = new_wb.create_sheet(title=source_sheet.title)
+
+    # The <dimension> record of exported files is often missing or wrong; without it
+    # rows are returned at their natural length instead of being cut to a stale width.
+    source_sheet.reset_dimensions()
+
+    if values_only:
+        for row in source_sheet.iter_rows(values_only=True):
+            new_sheet.append(row)
+    else:
+        for row in source_sheet.iter_rows():
+            new_row = []
+            for cell in row:
+                if cell.value is None:
+                    new_row.append(None)
+                    continue
+                number_format = cell.number_format
+                if number_format and number_format != "General":
+                    new_cell = WriteOnlyCell(new_sheet, value=cell.value)
+                    new_cell.number_format = number_format
+                    new_row.append(new_cell)
+                else:
+                    new_row.append(cell.value)
+            new_sheet.append(new_row)
+
+    # Merged ranges are written after sheetData, so they can be added once all rows are in
+    for merge_range in _read_merged_ranges(input_file, source_sheet._worksheet_path):
+        new_sheet.merged_cells.add(merge_range)
+
+    _save_workbook(new_wb, output_filename)
+
+
+def _read_merged_ranges(input_file, worksheet_path):
+    """
+    Scan a worksheet XML part for merged ranges without building a DOM.
+
+    The part is decompressed in fixed-size chunks and searched with a regular
+    expression, so memory stays constant regardless of the sheet size.
+
+    Args:
+        input_file (str): Path to the source Excel file (.xlsx).
+        worksheet_path (str): Path of the worksheet part inside the archive.
+
+    Returns:
+        list[str]: Merged cell references such as ``'A1:C1'``.
+    """
+    ranges = []
+    tail = b""
+    with zipfile.ZipFile(input_file) as archive:
+        with archive.open(worksheet_path) as src:
+            while True:
+                chunk = src.read(MERGE_SCAN_CHUNK_SIZE)
+                if not chunk:
+                    break
+                buffer = tail + chunk
+                last_end = 0
+                for match in MERGE_CELL_PATTERN.finditer(buffer):
+                    ranges.append(match.group(1).decode("ascii"))
+                    last_end = match.end()
+                # Keep an overlap so a tag split across two chunks is still found
+                tail = buffer[max(last_end, len(buffer) - 256):]
+    return ranges
+
+
+def _rels_path(part_name):
+    """Return the relationships part that belongs to ``part_name``."""
+    folder, name = posixpath.split(part_name)
+    return posixpath.join(folder, "_rels", f"{name}.rels")
+
+
+def _read_relationships(source_zip, part_name):
+    """
+    Read the relationships of a package part, resolving targets to archive paths.
+
+    Returns:
+        list[dict]: One entry per relationship with ``id``, ``type``, ``target`` and
+        ``external`` keys. Missing relationship parts yield an empty list.
+    """
+    rels_path = _rels_path(part_name)
+    if rels_path not in source_zip.NameToInfo:
+        return []
+
+    relationships = []
+    root = ElementTree.fromstring(source_zip.read(rels_path))
+    for rel in root.iter(f"{{{PKG_REL_NS}}}Relationship"):
+        target = rel.get("Target")
+        external = rel.get("TargetMode") == "External"
+        if not external:
+            if target.startswith("/"):
+                target = target.lstrip("/")
+            else:
+                target = posixpath.normpath(posixpath.join(posixpath.dirname(part_name), target))
+        relationships.append({"id": rel.get("Id"), "type": rel.get("Type"), "target": target, "external": external})
+    return relationships
+
+
+def _read_package(source_zip):
+    """
+    Read the workbook-level structure of an .xlsx package.
+
+    Returns:
+        dict: The workbook part name, its ``workbookPr`` attributes, the ordered list of
+        sheets (name, part, defined names local to the sheet), the shared workbook parts
+        (styles, shared strings, theme) and the pivot caches keyed by cache definition part.
+    """
+    workbook_part = next(
+        rel["target"] for rel in _read_relationships(source_zip, "")
+        if rel["type"].endswith("/officeDocument")
+    )
+    workbook_rels = {rel["id"]: rel for rel in _read_relationships(source_zip, workbook_part)}
+    root = ElementTree.fromstring(source_zip.read(workbook_part))
+
+    workbook_pr = root.find(f"{{{SHEET_MAIN_NS}}}workbookPr")
+
+    local_names = {}
+    for defined_name in root.iter(f"{{{SHEET_MAIN_NS}}}definedName"):
+        local_sheet_id = defined_name.get("localSheetId")
+        if local_sheet_id is not None:
+            local_names.setdefault(int(local_sheet_id), []).append(defined_name)
+
+    sheets = []
+    for position, sheet in enumerate(root.iter(f"{{{SHEET_MAIN_NS}}}sheet")):
+        rel = workbook_rels[sheet.get(f"{{{DOC_REL_NS}}}id")]
+        sheets.append({
+            "name": sheet.get("name"),
+            "part": rel["target"],
+            "type": rel["type"],
+            "defined_names": local_names.get(position, []),
+        })
+
+    pivot_caches = {}
+    for cache in root.iter(f"{{{SHEET_MAIN_NS}}}pivotCache"):
+        rel = workbook_rels[cache.get(f"{{{DOC_REL_NS}}}id")]
+        pivot_caches[rel["target"]] = {"cache_id": cache.get("cacheId"), "type": rel["type"]}
+
+    shared_parts = [
+        rel for rel in workbook_rels.values()
+        if not rel["external"] and rel["type"].rsplit("/", 1)[-1] in SHARED_WORKBOOK_PARTS
+    ]
+
+    return {
+        "workbook_part": workbook_part,
+        "workbook_pr": dict(workbook_pr.attrib) if workbook_pr is not None else {},
+        "sheets": sheets,
+        "shared_parts": shared_parts,
+        "pivot_caches": pivot_caches,
+    }
+
+
+def _collect_parts(source_zip, start_parts):
+    """
+    Collect ``start_parts`` and every internal part they reference, transitively.
+
+    Returns:
+        list[str]: Archive paths of the parts, each followed by its relationships part
+        when one exists, in discovery order.
+    """
+    collected = []
+    seen = set()
+    pending = list(start_parts)
+    while pending:
+        part = pending.pop(0)
+        if part in seen or part not in source_zip.NameToInfo:
+            continue
+        seen.add(part)
+        collected.append(part)
+        if _rels_path(part) in source_zip.NameToInfo:
+            collected.append(_rels_path(part))
+        pending.extend(rel["target"] for rel in _read_relationships(source_zip, part) if not rel["external"])
+    return collected
+
+
+def _write_sheet_package(source_zip, package, position, output_filename):
+    """
+    Write a single-sheet workbook built from the parts of one source sheet.
+
+    Args:
+        source_zip (zipfile.ZipFile): The open source package.
+        package (dict): Workbook structure returned by ``_read_package``.
+        position (int): Zero-based position of the sheet in the source workbook.
+        output_filename (str): Path of the single-sheet workbook to write.
+    """
+    sheet = package["sheets"][position]
+    workbook_part = package["workbook_part"]
+    workbook_dir = posixpath.dirname(workbook_part)
+
+    # Workbook-level relationships: the sheet first, then shared parts and pivot caches
+    workbook_rels = [(sheet["type"], sheet["part"])]
+    workbook_rels.extend((rel["type"], rel["target"]) for rel in package["shared_parts"])
+
+    parts = _collect_parts(source_zip, [sheet["part"]] + [rel["target"] for rel in package["shared_parts"]])
+    pivot_caches = []
+    for part in parts:
+        cache = package["pivot_caches"].get(part)
+        if cache is not None:
+            workbook_rels.append((cache["type"], part))
+            pivot_caches.append((cache["cache_id"], f"rId{len(workbook_rels)}"))
+
+    rels_xml = ['<?xml version="1.0" encoding="UTF-8" standalone="yes"?>', f'<Relationships xmlns="{PKG_REL_NS}">']
+    for rel_idx, (rel_type, target) in enumerate(workbook_rels, start=1):
+        target = posixpath.relpath(target, workbook_dir)
+        rels_xml.append(f'<Relationship Id="rId{rel_idx}" Type={quoteattr(rel_type)} Target={quoteattr(target)}/>')
+    rels_xml.append("</Relationships>")
+
+    workbook_pr = _xml_attributes(package["workbook_pr"])
+    workbook_xml = [
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>',
+        f'<workbook xmlns="{SHEET_MAIN_NS}" xmlns:r="{DOC_REL_NS}">',
+        f"<workbookPr{workbook_pr}/>",
+        '<bookViews><workbookView activeTab="0"/></bookViews>',
+        f'<sheets><sheet name={quoteattr(sheet["name"])} sheetId="1" r:id="rId1"/></sheets>',
+    ]
+    if sheet["defined_names"]:
+        # Names local to this sheet keep working once re-pointed at sheet position 0
+        workbook_xml.append("<definedNames>")
+        for defined_name in sheet["defined_names"]:
+            attrs = _xml_attributes({**defined_name.attrib, "localSheetId": "0"})
+            workbook_xml.append(f"<definedName{attrs}>{escape(defined_name.text or '')}</definedName>")
+        workbook_xml.append("</definedNames>")
+    # calcChain.xml lists cells of every sheet, so it is dropped and Excel rebuilds it
+    workbook_xml.append('<calcPr calcId="124519" fullCalcOnLoad="1"/>')
+    if pivot_caches:
+        workbook_xml.append("<pivotCaches>")
+        workbook_xml.extend(f'<pivotCache cacheId="{cache_id}" r:id="{rel_id}"/>' for cache_id, rel_id in pivot_caches)
+        workbook_xml.append("</pivotCaches>")
+    workbook_xml.append("</workbook>")
+
+    root_rels_xml = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        f'<Relationships xmlns="{PKG_REL_NS}">'
+        f'<Relationship Id="rId1" Type="{OFFICE_DOCUMENT_REL}" Target={quoteattr(workbook_part)}/>'
+        "</Relationships>"
+    )
+
+    # Keep every default extension mapping, but only the overrides of parts we copy
+    included = {"/" + part for part in parts} | {"/" + workbook_part}
+    content_types = ElementTree.fromstring(source_zip.read("[Content_Types].xml"))
+    types_xml = ['<?xml version="1.0" encoding="UTF-8" standalone="yes"?>', f'<Types xmlns="{CONTENT_TYPES_NS}">']
+    for element in content_types:
+        tag = element.tag.rsplit("}", 1)[-1]
+        if tag == "Default":
+            types_xml.append(f'<Default Extension={quoteattr(element.get("Extension"))} ContentType={quoteattr(element.get("ContentType"))}/>')
+        elif tag == "Override" and element.get("PartName") in included:
+            types_xml.append(f'<Override PartName={quoteattr(element.get("PartName"))} ContentType={quoteattr(element.get("ContentType"))}/>')
+    types_xml.append("</Types>")
+
+    with zipfile.ZipFile(output_filename, "w", zipfile.ZIP_DEFLATED) as out:
+        out.writestr("[Content_Types].xml", "".join(types_xml))
+        out.writestr("_rels/.rels", root_rels_xml)
+        out.writestr(workbook_part, "".join(workbook_xml))
+        out.writestr(_rels_path(workbook_part), "".join(rels_xml))
+        for part in parts:
+            with source_zip.open(part) as src, out.open(part, "w") as dst:
+                shutil.copyfileobj(src, dst, ZIP_COPY_CHUNK_SIZE)
+
+
+def _xml_attributes(attributes):
+    """
+    Serialise ElementTree attributes for the rewritten workbook.xml.
+
+    Keys in the relationships namespace are written with the ``r:`` prefix the
+    workbook element declares. Other namespaced keys (``{uri}name``, such as the
+    ``xr:`` revision extensions) have no declared prefix there and are dropped.
+    """
+    written = []
+    for key, value in attributes.items():
+        if key.startswith(f"{{{DOC_REL_NS}}}"):
+            key = "r:" + key.split("}", 1)[1]
+        elif key.startswith("{"):
+            continue
+        written.append(f" {key}={quoteattr(value)}")
+    return "".join(written)
+
+
+def _save_workbook(new_wb, output_filename):
+    try:
+        print(f"    -> Saving to '{output_filename}'")
+        new_wb.save(output_filename)
+    except Exception as e:
+        print(f"    -> ❌ Error saving '{output_filename}': {e}")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
@@ -147,5 +631,20 @@ if __name__ == "__main__":
     )
     parser.add_argument("input_file", help="Path to the source Excel file (.xlsx).")
     parser.add_argument("output_folder", help="Directory where the separated sheet files will be saved.")
+    parser.add_argument(
+        "--engine", choices=SPLIT_ENGINES, default="openpyxl",
+        help="'openpyxl' rebuilds sheets cell by cell; 'zip' copies the sheet parts straight from the source archive."
+    )
+    parser.add_argument(
+        "--mode", choices=SPLIT_MODES, default="full",
+        help="'full' copies styles cell by cell; 'streaming' keeps memory bounded for very large workbooks."
+    )
+    parser.add_argument(
+        "--values-only", action="store_true",
+        help="Skip all styling and copy only values, formulas and merged ranges."
+    )
     args = parser.parse_args()
-    separate_sheets_with_openpyxl(args.input_file, args.output_folder)
+    if args.engine == "zip":
+        separate_sheets_with_zip(args.input_file, args.output_folder)
+    else:
+        separate_sheets_with_openpyxl(args.input_file, args.output_folder, mode=args.mode, values_only=args.values_only)
@@ -0,0 +1,83 @@
+"""
+Lazy registry of the pipeline's stage backends and engine choices.
+
+Every engine a run can choose, and its default, is declared here; every backend
+is named by the module and function that implement it, as ``"module:function"``.
+This module imports nothing outside the standard library, so parsing and
+validating the command line (``main.py --help`` included) loads none of pandas,
+openpyxl, openai, dotenv or xlwings. ``load_backend`` imports a backend's module
+the first time a run selects it:
+
+    split       openpyxl, zip         sheets_to_excel
+    refresh     excel                 preprocessing_excel_sheets (xlwings, imported on use)
+                python                formula_engine
+                none                  nothing
+    boundaries  batched               async_boundaries (--async-boundaries)
+
+Per-sheet boundary detection always runs through ``find_table_boundaries``,
+which imports openai and reads the .env file only when a sheet is sent to the
+LLM, so heuristic runs never load them.
+
+The modules implementing the stages import their choice tuples and defaults
+from here, and re-export them, so every name is defined once.
+"""
+
+import importlib
+
+SPLIT_ENGINES = ("openpyxl", "zip")
+SPLIT_MODES = ("full", "streaming")
+REFRESH_ENGINES = ("excel", "python", "none")
+# heuristic: offline detector only. llm: always ask the model.
+# hybrid: offline detector first, the model only for low-confidence sheets.
+BOUNDARY_ENGINES = ("heuristic", "llm", "hybrid")
+DEFAULT_CONFIDENCE_THRESHOLD = 0.75
+PROMPT_ENCODINGS = ("table", "compact")
+DEFAULT_PROMPT_ENCODING = "table"
+DEFAULT_TOKEN_BUDGET = 4000
+READERS = ("openpyxl", "fast")
+DEFAULT_READER = "openpyxl"
+# Output formats of the cleaned table. Parquet and Feather need pyarrow.
+OUTPUT_FORMATS = ("xlsx", "csv", "parquet", "feather")
+DEFAULT_OUTPUT_FORMATS = ("xlsx", "csv")
+COLUMNAR_FORMATS = ("parquet", "feather")
+# Chunked cleaning (--chunk-size): a chunk must hold the deepest header the cleaner detects,
+# process_with_pandas.MAX_HEADER_ROWS (checked by chunked_cleaning; this module stays free of pandas)
+MIN_CHUNK_SIZE = 5
+# Batched (async) LLM boundary requests
+DEFAULT_CONCURRENCY = 8
+DEFAULT_REQUESTS_PER_SECOND = 5.0
+DEFAULT_REQUEST_TIMEOUT = 60.0
+DEFAULT_MAX_RETRIES = 5
+
+BACKENDS = {
+    "split": {
+        "openpyxl": "sheets_to_excel:separate_sheets_with_openpyxl",
+        "zip": "sheets_to_excel:separate_sheets_with_zip",
+    },
+    "refresh": {
+        "excel": "preprocessing_excel_sheets:refresh_with_excel",
+        "python": "formula_engine:recalculate_workbook",
+        "none": None,
+    },
+    "boundaries": {
+        "batched": "async_boundaries:find_table_boundaries_batch",
+    },
+}
+
+
+def load_backend(stage: str, name: str):
+    """
+    The function implementing backend ``name`` of ``stage``, importing its module on first use.
+
+    Returns None for backends that do nothing (the 'none' refresh engine). Raises
+    ``ValueError`` for an unknown stage or backend.
+    """
+    if stage not in BACKENDS:
+        raise ValueError(f"Unknown stage '{stage}'. Expected one of: {', '.join(BACKENDS)}")
+    if name not in BACKENDS[stage]:
+        raise ValueError(f"Unknown {stage} backend '{name}'. Expected one of: {', '.join(BACKENDS[stage])}")
+    target = BACKENDS[stage][name]
+    if target is None:
+        return None
+    module_name, function_name = target.split(":")
+    return getattr(importlib.import_module(module_name), function_name)
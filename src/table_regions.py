@@ -0,0 +1,190 @@
+"""
+Detection of several table blocks on one sheet.
+
+Government reports often stack tables on one sheet or place them side by side.
+``find_table_blocks`` finds every block from the boolean grid of non-empty
+cells with connected-region labeling:
+
+    1. Each non-empty cell also covers the ``MAX_ROW_GAP`` cells below it and the
+       ``MAX_COL_GAP`` cells to its right, so a blank spacer row or column inside
+       a table (between column groups, say) does not cut it in two, while the
+       wider gaps between tables still do.
+    2. The covered grid is labeled into 4-connected regions, with
+       ``scipy.ndimage.label`` when SciPy is installed and otherwise with a
+       vectorized union-find over the cell adjacencies (hooking and pointer
+       jumping on whole arrays, no per-cell Python loop).
+    3. The bounding box of every region's non-empty cells is a candidate block.
+       Blocks smaller than ``MIN_TABLE_ROWS`` x ``MIN_TABLE_COLS`` (titles,
+       footnotes, stray notes) are dropped, and overlapping blocks are merged.
+
+Blocks are returned top to bottom, then left to right, as row and column
+positions of the grid read with ``pd.read_excel(header=None, dtype=str)``.
+"""
+
+import numpy as np
+import pandas as pd
+
+try:
+    from scipy import ndimage
+except ImportError:  # SciPy is optional; the union-find fallback needs only numpy
+    ndimage = None
+
+# Empty rows / columns a table may contain without being split into two blocks
+MAX_ROW_GAP = 1
+MAX_COL_GAP = 1
+# Smallest block that counts as a table: a header row and one data row, two columns wide
+MIN_TABLE_ROWS = 2
+MIN_TABLE_COLS = 2
+
+
+def find_table_blocks(df: pd.DataFrame) -> list:
+    """
+    Find every table block of a sheet grid.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Sheet grid read with ``header=None, dtype=str``.
+
+    Returns
+    -------
+    list of dict
+        One dict per block with 'row_start', 'row_end', 'col_start' and 'col_end'
+        (inclusive positions in ``df``), ordered top to bottom, then left to right.
+        Empty when the sheet holds nothing table-shaped.
+    """
+    filled = df.notna().to_numpy(copy=True)
+    if filled.any():
+        # Whitespace-only cells are empty for layout purposes
+        text = pd.Series(df.to_numpy(dtype=object)[filled], dtype=object).astype(str).str.strip()
+        filled[filled] = (text != "").to_numpy()
+    if not filled.any():
+        return []
+
+    labels = label_regions(_cover_gaps(filled))
+    rows, cols = np.nonzero(filled)
+    ids = labels[rows, cols]
+    count = int(labels.max())
+    row_start = np.full(count + 1, np.iinfo(np.int64).max)
+    col_start = np.full(count + 1, np.iinfo(np.int64).max)
+    row_end = np.full(count + 1, -1)
+    col_end = np.full(count + 1, -1)
+    np.minimum.at(row_start, ids, rows)
+    np.minimum.at(col_start, ids, cols)
+    np.maximum.at(row_end, ids, rows)
+    np.maximum.at(col_end, ids, cols)
+
+    boxes = [
+        [int(row_start[i]), int(row_end[i]), int(col_start[i]), int(col_end[i])]
+        for i in range(1, count + 1)
+        if row_end[i] >= 0
+        and row_end[i] - row_start[i] + 1 >= MIN_TABLE_ROWS and col_end[i] - col_start[i] + 1 >= MIN_TABLE_COLS
+    ]
+    boxes = _merge_overlapping(boxes)
+    return [
+        {"row_start": r0, "row_end": r1, "col_start": c0, "col_end": c1}
+        for r0, r1, c0, c1 in sorted(boxes, key=lambda box: (box[0], box[2]))
+    ]
+
+
+def block_grid(df: pd.DataFrame, block: dict) -> pd.DataFrame:
+    """The cells of ``block`` as a grid of its own, with positional row and column labels."""
+    grid = df.iloc[block["row_start"]:block["row_end"] + 1, block["col_start"]:block["col_end"] + 1]
+    grid = grid.reset_index(drop=True)
+    grid.columns = range(grid.shape[1])
+    return grid
+
+
+def whole_sheet_block(df: pd.DataFrame) -> dict:
+    """One block covering the whole grid, for sheets without any table-shaped block."""
+    return {"row_start": 0, "row_end": max(len(df) - 1, 0), "col_start": 0, "col_end": max(df.shape[1] - 1, 0)}
+
+
+def sheet_boundaries(block: dict, boundaries: dict) -> dict:
+    """Boundaries found on ``block_grid(df, block)``, moved to sheet row positions and tagged with the block."""
+    return {
+        **boundaries, **block,
+        "header_start_index": boundaries["header_start_index"] + block["row_start"],
+        "data_end_index": boundaries["data_end_index"] + block["row_start"],
+    }
+
+
+def label_regions(mask: np.ndarray) -> np.ndarray:
+    """
+    Label the 4-connected regions of a boolean grid.
+
+    Returns an int array shaped like ``mask``: 0 for False cells, 1..n for the
+    regions, numbered in row-major order of their first cell.
+    """
+    if ndimage is not None:
+        labels, _ = ndimage.label(mask)
+        return labels
+    return _label_with_union_find(mask)
+
+
+def _cover_gaps(filled: np.ndarray) -> np.ndarray:
+    """Let every non-empty cell also cover the gap cells below and to the right of it."""
+    covered = filled.copy()
+    for shift in range(1, MAX_ROW_GAP + 1):
+        covered[shift:] |= filled[:-shift]
+    for shift in range(1, MAX_COL_GAP + 1):
+        covered[:, shift:] |= filled[:, :-shift]
+    return covered
+
+
+def _label_with_union_find(mask: np.ndarray) -> np.ndarray:
+    """
+    ``label_regions`` without SciPy: union-find over all cell adjacencies at once.
+
+    Every covered cell is a node; horizontally and vertically adjacent covered
+    cells are edges. Each round hooks the larger root of every edge onto the
+    smaller one, then compresses the paths by pointer jumping until every node
+    points at its root. Rounds repeat until no edge joins two different roots.
+    """
+    node = np.full(mask.shape, -1, dtype=np.int64)
+    node[mask] = np.arange(int(mask.sum()))
+    right = mask[:, :-1] & mask[:, 1:]
+    down = mask[:-1] & mask[1:]
+    u = np.concatenate([node[:, :-1][right], node[:-1][down]])
+    v = np.concatenate([node[:, 1:][right], node[1:][down]])
+
+    parent = np.arange(node.max() + 1)
+    while u.size:
+        root_u, root_v = parent[u], parent[v]
+        joined = root_u != root_v
+        if not joined.any():
+            break
+        low = np.minimum(root_u[joined], root_v[joined])
+        high = np.maximum(root_u[joined], root_v[joined])
+        np.minimum.at(parent, high, low)
+        while True:
+            grand = parent[parent]
+            if np.array_equal(grand, parent):
+                break
+            parent = grand
+        # Edges inside one region are done; only the others can still join roots
+        u, v = u[joined], v[joined]
+
+    # Roots are the smallest node of their region, so numbering them in order is row-major
+    roots = np.unique(parent)
+    labels = np.zeros(mask.shape, dtype=np.int64)
+    labels[mask] = np.searchsorted(roots, parent) + 1
+    return labels
+
+
+def _merge_overlapping(boxes: list) -> list:
+    """Merge bounding boxes that overlap until none do; there are only a handful per sheet."""
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(boxes)):
+            for j in range(i + 1, len(boxes)):
+                a, b = boxes[i], boxes[j]
+                if a[0] <= b[1] and b[0] <= a[1] and a[2] <= b[3] and b[2] <= a[3]:
+                    boxes[i] = [min(a[0], b[0]), max(a[1], b[1]), min(a[2], b[2]), max(a[3], b[3])]
+                    del boxes[j]
+                    merged = True
+                    break
+            if merged:
+                break
+    return boxes
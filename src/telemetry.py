@@ -0,0 +1,159 @@
+"""
+Per-stage run telemetry.
+
+Every pipeline stage of every sheet is wrapped in ``StageRecorder.stage``, which
+records a stage record:
+
+    stage, sheet, status      'ok', 'failed' (with 'error') or 'reused'
+    wall_seconds, cpu_seconds wall-clock and CPU time of the stage in its process
+    peak_rss_mb               the process's peak resident set size when the stage ended
+                              (a high-water mark, so it never goes down between stages)
+    rows, cells               size of the table the stage loaded or produced, or None
+    bytes_read, bytes_written sizes of the files the stage read and wrote
+
+Records travel back from worker processes inside the summary entries, and the
+main process writes them all to ``run_report.json``. With an events path every
+record is also appended to a JSON-lines file as soon as its stage ends, one
+event per line, for log shippers and monitoring agents.
+"""
+
+import contextlib
+import datetime
+import json
+import os
+import socket
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+RUN_REPORT_FILE_NAME = "run_report.json"
+REPORT_VERSION = 1
+# Pipeline order of the stages, used to order the report totals
+STAGE_ORDER = ("split", "refresh", "parse", "boundaries", "clean")
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or None where it cannot be measured."""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+        return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+    try:
+        import psutil
+    except ImportError:
+        return None
+    memory = psutil.Process().memory_info()
+    return round(getattr(memory, "peak_wset", memory.rss) / 1024 / 1024, 1)
+
+
+def file_sizes(*paths) -> int:
+    """Total size in bytes of the given files; missing files and None count as 0."""
+    return sum(os.path.getsize(path) for path in paths if path and os.path.exists(path))
+
+
+class StageRecorder:
+    """
+    Collects the stage records of one sheet (or of the workbook-level stages).
+
+    Attributes:
+        sheet (str): Label written into every record; None for workbook-level stages.
+        events_path (str): JSON-lines file every record is appended to, or None.
+        stages (list of dict): The records, in the order the stages ended.
+    """
+
+    def __init__(self, sheet: str = None, events_path: str = None):
+        self.sheet = sheet
+        self.events_path = events_path
+        self.stages = []
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        """
+        Measure the ``with`` block as stage ``name``.
+
+        Yields the record being built; the block fills in 'rows', 'cells',
+        'bytes_read' and 'bytes_written' as it learns them. A failing block is
+        recorded as 'failed' and its exception re-raised.
+        """
+        record = {"stage": name, "sheet": self.sheet, "status": "ok", "rows": None, "cells": None,
+                  "bytes_read": 0, "bytes_written": 0}
+        wall_started, cpu_started = time.perf_counter(), time.process_time()
+        try:
+            yield record
+        except Exception as e:
+            record["status"] = "failed"
+            record["error"] = str(e)
+            raise
+        finally:
+            record["wall_seconds"] = round(time.perf_counter() - wall_started, 4)
+            record["cpu_seconds"] = round(time.process_time() - cpu_started, 4)
+            record["peak_rss_mb"] = peak_rss_mb()
+            self._add(record)
+
+    def reused(self, name: str):
+        """Record a stage that was skipped because its previous outputs were reused."""
+        self._add({"stage": name, "sheet": self.sheet, "status": "reused", "rows": None, "cells": None,
+                   "bytes_read": 0, "bytes_written": 0, "wall_seconds": 0.0, "cpu_seconds": 0.0,
+                   "peak_rss_mb": None})
+
+    def _add(self, record: dict):
+        record["finished_at"] = datetime.datetime.now().isoformat(timespec="milliseconds")
+        record["pid"] = os.getpid()
+        self.stages.append(record)
+        if self.events_path:
+            # One write per line; appends from several worker processes do not interleave
+            with open(self.events_path, "a") as f:
+                f.write(json.dumps({"event": "stage_end", **record}) + "\n")
+
+
+def write_run_report(path: str, input_file: str, started_at: str, wall_seconds: float, workbook_stages: list,
+                     summary: list, options: dict = None):
+    """
+    Write ``run_report.json``: run metadata, the workbook-level stages, every sheet's
+    stages and status, and per-stage totals over all sheets. Returns the report.
+    """
+    sheets = [
+        {"sheet_file": os.path.basename(entry["sheet_file"]), "status": entry["status"],
+         "stages": entry.get("telemetry", [])}
+        for entry in summary
+    ]
+    totals = {}
+    for record in workbook_stages + [record for sheet in sheets for record in sheet["stages"]]:
+        total = totals.setdefault(record["stage"], {"count": 0, "failed": 0, "reused": 0, "wall_seconds": 0.0,
+                                                    "cpu_seconds": 0.0, "bytes_read": 0, "bytes_written": 0})
+        total["count"] += 1
+        total["failed"] += record["status"] == "failed"
+        total["reused"] += record["status"] == "reused"
+        for key in ("wall_seconds", "cpu_seconds", "bytes_read", "bytes_written"):
+            total[key] += record[key]
+    for total in totals.values():
+        total["wall_seconds"] = round(total["wall_seconds"], 4)
+        total["cpu_seconds"] = round(total["cpu_seconds"], 4)
+    totals = dict(sorted(totals.items(), key=lambda item: STAGE_ORDER.index(item[0])
+                         if item[0] in STAGE_ORDER else len(STAGE_ORDER)))
+
+    report = {
+        "version": REPORT_VERSION,
+        "input_file": os.path.abspath(input_file),
+        "host": socket.gethostname(),
+        "started_at": started_at,
+        "wall_seconds": round(wall_seconds, 4),
+        "peak_rss_mb": peak_rss_mb(),
+        "sheets_total": len(summary),
+        "sheets_failed": sum(entry["status"] != "Success" for entry in summary),
+        "options": {key: value for key, value in (options or {}).items() if _is_plain(value)},
+        "workbook_stages": workbook_stages,
+        "sheets": sheets,
+        "totals": totals,
+    }
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+def _is_plain(value) -> bool:
+    return value is None or isinstance(value, (str, int, float, bool, list, tuple))
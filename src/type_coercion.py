@@ -0,0 +1,288 @@
+"""
+Typed value coercion for cleaned tables.
+
+Sheets are read with ``dtype=str``, so a cleaned table is a frame of Python
+strings. This stage converts each column to the most compact dtype that holds
+all of its values, in vectorized passes over the column:
+
+    - integers become the smallest integer dtype that fits (nullable when the
+      column has empty cells), other numbers float64,
+    - thousands separators, currency symbols and spaces are ignored ("1,234", "$ 5"),
+    - accounting negatives in parentheses become negative numbers ("(1,234)"),
+    - percentages become fractions ("12.5%" -> 0.125) when every value of the
+      column is a percentage; a column mixing "12%" and "50" stays text,
+    - dates and date-times become datetime64 (ISO first, then a few common layouts),
+    - low-cardinality text becomes a categorical, other text the string dtype.
+
+A column is converted only when every non-empty cell parses; a single value that
+does not fit keeps the column as text, so no data is lost. Values a number would
+misrepresent do not parse: codes with leading zeros ("00123") and integers
+beyond 2**53, which float64 cannot hold exactly. ``coerce_types``
+returns the typed frame and a per-column schema report.
+
+A table cleaned in chunks (``--chunk-size``) never exists as a whole, but every
+chunk of a column must get the same type. ``ColumnProfile`` summarises a column
+chunk by chunk (does every value parse as a number, which date layouts fit every
+value, the distinct values while few) in one pass, and then converts each chunk
+to the type ``coerce_column`` would have chosen for the whole column.
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+
+# Characters ignored when parsing a number: thousands separators, spaces and currency symbols.
+NUMERIC_NOISE_PATTERN = r"[,\s$€£¥]"
+# An accounting-style negative: the number wrapped in parentheses.
+PAREN_NEGATIVE_PATTERN = r"^\((.*)\)$"
+# Date layouts tried after ISO 8601, in order; the first that parses every value wins.
+DATE_FORMATS = ("%d/%m/%Y", "%m/%d/%Y", "%d-%m-%Y", "%d.%m.%Y", "%d %b %Y", "%d-%b-%Y", "%b %d, %Y", "%B %d, %Y")
+# datetime64 units from coarsest to finest
+DATE_UNITS = ("s", "ms", "us", "ns")
+# A text column becomes categorical when it has at most this many distinct values ...
+CATEGORY_MAX_UNIQUE = 256
+# ... and they make up at most this share of its non-empty cells.
+CATEGORY_MAX_RATIO = 0.5
+# Largest integer float64 holds exactly; larger integers keep their column as text.
+MAX_EXACT_INTEGER = 2 ** 53
+# Smallest integer dtypes first, as (numpy dtype, nullable pandas dtype).
+INTEGER_DTYPES = (("int8", "Int8"), ("int16", "Int16"), ("int32", "Int32"), ("int64", "Int64"))
+
+
+def coerce_types(data_df: pd.DataFrame) -> tuple:
+    """
+    Convert every column of a cleaned table to a compact dtype.
+
+    Parameters
+    ----------
+    data_df : pd.DataFrame
+        The cleaned table, typically all strings with NaN for empty cells.
+
+    Returns
+    -------
+    tuple
+        ``(typed_df, schema)``: the typed copy of ``data_df`` and a list with one dict
+        per column ('column', 'kind', 'dtype', 'non_null', 'nulls', 'bytes_before',
+        'bytes_after'). 'kind' is one of integer, float, percentage, date, category,
+        text or empty.
+    """
+    columns, schema = [], []
+    for name, column in data_df.items():
+        typed, kind = coerce_column(column)
+        columns.append(typed)
+        schema.append({
+            "column": str(name),
+            "kind": kind,
+            "dtype": str(typed.dtype),
+            "non_null": int(typed.notna().sum()),
+            "nulls": int(typed.isna().sum()),
+            "bytes_before": int(column.memory_usage(index=False, deep=True)),
+            "bytes_after": int(typed.memory_usage(index=False, deep=True)),
+        })
+    typed_df = pd.DataFrame(dict(enumerate(columns)), index=data_df.index)
+    typed_df.columns = data_df.columns
+    return typed_df, schema
+
+
+def coerce_column(column: pd.Series) -> tuple:
+    """Coerce one column; returns ``(typed_series, kind)``."""
+    text = _stripped(column)
+    present = text.notna()
+    if not present.any():
+        return pd.Series(np.nan, index=column.index, dtype="float64"), "empty"
+
+    numbers, is_percent = parse_numbers(text, exact=True)
+    if numbers[present].notna().all():
+        if is_percent[present].all():
+            return numbers, "percentage"
+        if not is_percent[present].any():
+            return _compact_numbers(numbers, present)
+
+    dates = _parse_dates(text[present])
+    if dates is not None:
+        return dates.reindex(column.index), "date"
+
+    distinct = text[present].nunique()
+    if distinct <= CATEGORY_MAX_UNIQUE and distinct <= CATEGORY_MAX_RATIO * present.sum():
+        return text.astype("category"), "category"
+    return text, "text"
+
+
+class ColumnProfile:
+    """
+    Running summary of one column's values, from which its coerced type is decided without holding the column.
+
+    ``update`` with every chunk of the column, then ``convert`` every chunk; the
+    conversions are the ones ``coerce_column`` makes on the whole column.
+
+    Attributes:
+        rows (int): Cells seen.
+        present (int): Non-empty cells seen.
+        kind (str): The decided kind, see ``coerce_types``; None until ``decide`` runs.
+        dtype: The decided dtype.
+        dates_only (bool): Whether a date column's values all fall at midnight, so they are written as dates.
+        fraction_digits (int): Digits of the fractional seconds a date column's values need (0, 3, 6 or 9),
+            which pandas writes on every value of the column.
+    """
+
+    def __init__(self):
+        self.rows = self.present = 0
+        # Whether every value so far parsed as a number, was a percentage, was not one, was whole
+        self.numbers = self.percent = self.no_percent = self.whole = True
+        self.low, self.high = np.inf, -np.inf
+        # Date layout -> finest datetime64 dtype it produced, for the layouts that parsed every value so far
+        self.date_dtypes = dict.fromkeys(("ISO8601",) + DATE_FORMATS)
+        # Distinct values, None once there are more than CATEGORY_MAX_UNIQUE
+        self.distinct = set()
+        # Whether every ISO 8601 date has no time of day (the other layouts have none)
+        self.iso_dates_only = True
+        self.fraction_digits = 0
+        self.kind = self.dtype = self.date_format = None
+        self.dates_only = False
+
+    def update(self, column: pd.Series):
+        """Add the values of one chunk of the column."""
+        text = _stripped(column)
+        present = text.notna()
+        self.rows += len(text)
+        count = int(present.sum())
+        if not count:
+            return
+        self.present += count
+        values = text[present]
+        if self.numbers:
+            numbers, is_percent = parse_numbers(values, exact=True)
+            self.percent = self.percent and bool(is_percent.all())
+            self.no_percent = self.no_percent and not is_percent.any()
+            if numbers.notna().all() and (self.percent or self.no_percent):
+                self.whole = self.whole and bool((numbers == numbers.round()).all())
+                self.low, self.high = min(self.low, numbers.min()), max(self.high, numbers.max())
+            else:
+                self.numbers = False
+        for date_format, dtype in list(self.date_dtypes.items()):
+            dates = pd.to_datetime(values.astype(object), format=date_format, errors="coerce")
+            if dates.notna().all():
+                self.date_dtypes[date_format] = dates.dtype if dtype is None else _finer_dates(dtype, dates.dtype)
+                if date_format == "ISO8601":
+                    self.iso_dates_only = self.iso_dates_only and bool((dates == dates.dt.normalize()).all())
+                    self.fraction_digits = max(self.fraction_digits, _fraction_digits(dates))
+            else:
+                del self.date_dtypes[date_format]
+        if self.distinct is not None:
+            self.distinct.update(values.unique())
+            if len(self.distinct) > CATEGORY_MAX_UNIQUE:
+                self.distinct = None
+
+    def decide(self) -> str:
+        """Settle the column's kind and dtype from everything seen; returns the kind."""
+        self.kind = "text"
+        self.dtype = "string"
+        if not self.present:
+            self.kind, self.dtype = "empty", "float64"
+        elif self.numbers:
+            self.kind, self.dtype = ("percentage" if self.percent else "float"), "float64"
+            if not self.percent and self.whole and max(-self.low, self.high) < MAX_EXACT_INTEGER:
+                for numpy_dtype, nullable_dtype in INTEGER_DTYPES:
+                    info = np.iinfo(numpy_dtype)
+                    if info.min <= self.low and self.high <= info.max:
+                        self.kind = "integer"
+                        self.dtype = numpy_dtype if self.present == self.rows else nullable_dtype
+                        break
+        elif self.date_dtypes:
+            self.date_format, self.dtype = next(iter(self.date_dtypes.items()))
+            self.kind = "date"
+            self.dates_only = self.iso_dates_only or self.date_format != "ISO8601"
+        elif self.distinct is not None and len(self.distinct) <= CATEGORY_MAX_RATIO * self.present:
+            self.kind = "category"
+            self.dtype = pd.CategoricalDtype(pd.Index(sorted(self.distinct), dtype="string"))
+        return self.kind
+
+    def convert(self, column: pd.Series) -> pd.Series:
+        """One chunk of the column converted to the decided type."""
+        if self.kind is None:
+            self.decide()
+        if self.kind == "empty":
+            return pd.Series(np.nan, index=column.index, dtype="float64")
+        text = _stripped(column)
+        if self.kind in ("integer", "float", "percentage"):
+            return parse_numbers(text, exact=True)[0].astype(self.dtype)
+        if self.kind == "date":
+            return pd.to_datetime(text.astype(object), format=self.date_format, errors="coerce").astype(self.dtype)
+        return text.astype(self.dtype)
+
+
+def write_schema_report(schema: list, path: str):
+    """Write the per-column schema report of ``coerce_types`` as JSON."""
+    with open(path, "w") as f:
+        json.dump({"columns": schema}, f, indent=2)
+
+
+def parse_numbers(text: pd.Series, exact: bool = False) -> tuple:
+    """
+    Parse numbers in all supported notations; returns float values (NaN where unparsable) and the % mask.
+
+    ``text`` is a string Series, stripped, with missing values for empty cells.
+    Other stages that ask whether a cell is a number (``row_filters``,
+    ``heuristic_boundaries``) parse with this, so a number means the same everywhere.
+
+    With ``exact``, values float64 would misrepresent are unparsable too: codes with
+    leading zeros ("00123", "042") and integers beyond ``MAX_EXACT_INTEGER``.
+    """
+    is_percent = text.str.endswith("%").fillna(False)
+    cleaned = text.str.rstrip("%").str.replace(NUMERIC_NOISE_PATTERN, "", regex=True)
+    is_negative = cleaned.str.match(PAREN_NEGATIVE_PATTERN).fillna(False)
+    cleaned = cleaned.str.replace(PAREN_NEGATIVE_PATTERN, r"\1", regex=True)
+    numbers = pd.to_numeric(cleaned.astype(object), errors="coerce").astype("float64")
+    numbers = numbers.where(~is_negative, -numbers).where(~is_percent, numbers / 100)
+    if exact:
+        digits = cleaned.str.lstrip("+-").fillna("")
+        limit = str(MAX_EXACT_INTEGER)
+        length = digits.str.len()
+        # Integers without leading zeros compare by length, then as text
+        too_large = digits.str.fullmatch(r"\d+") & ((length > len(limit)) | ((length == len(limit)) & (digits > limit)))
+        numbers = numbers.mask((digits.str.match(r"0\d") | too_large).to_numpy(dtype=bool))
+    return numbers, is_percent
+
+
+def _stripped(column: pd.Series) -> pd.Series:
+    """The column as stripped strings, with empty text as missing."""
+    text = pd.Series(column.to_numpy(dtype=object), index=column.index, dtype="string").str.strip()
+    return text.mask(text == "")
+
+
+def _finer_dates(dtype, other):
+    """The datetime dtype of the two with the finer unit; whole-column parsing uses the finest unit any value needs."""
+    units = [getattr(d, "unit", None) or np.datetime_data(d)[0] for d in (dtype, other)]
+    return other if DATE_UNITS.index(units[1]) > DATE_UNITS.index(units[0]) else dtype
+
+
+def _fraction_digits(dates: pd.Series) -> int:
+    """Digits of fractional seconds the dates need: 0, or 3, 6 or 9 for milli-, micro- and nanoseconds."""
+    nanoseconds = (dates.dt.microsecond * 1000 + dates.dt.nanosecond).to_numpy()
+    for digits in (0, 3, 6):
+        if not (nanoseconds % 10 ** (9 - digits)).any():
+            return digits
+    return 9
+
+
+def _compact_numbers(numbers: pd.Series, present: pd.Series) -> tuple:
+    """Downcast parsed numbers to the smallest integer dtype that holds them, else float64."""
+    values = numbers[present]
+    if (values == values.round()).all() and values.abs().max() < MAX_EXACT_INTEGER:
+        low, high = values.min(), values.max()
+        for numpy_dtype, nullable_dtype in INTEGER_DTYPES:
+            info = np.iinfo(numpy_dtype)
+            if info.min <= low and high <= info.max:
+                dtype = numpy_dtype if present.all() else nullable_dtype
+                return numbers.astype(dtype), "integer"
+    return numbers, "float"
+
+
+def _parse_dates(values: pd.Series):
+    """Parse every value as a date with one layout, or return None when no layout fits them all."""
+    for date_format in ("ISO8601",) + DATE_FORMATS:
+        dates = pd.to_datetime(values.astype(object), format=date_format, errors="coerce")
+        if dates.notna().all():
+            return dates
+    return None
@@ -0,0 +1,548 @@
+"""
+Streaming .xlsx reader that parses worksheet XML straight into column arrays.
+
+``pd.read_excel`` builds a full openpyxl cell object for every cell, converts it
+back to a Python value, collects the rows as lists, and only then hands them to
+pandas' text parser. For the string grids this pipeline works on, almost all of
+that is overhead. The 'fast' reader skips it:
+
+    1. The workbook, its relationships and styles are read once per file; the
+       shared-strings part is parsed incrementally with ``iterparse`` and every
+       string is interned, so repeated labels share one object across sheets.
+    2. The worksheet part is streamed through expat, without its namespace
+       processing (a third of the parse time on large sheets). Handlers keep only the
+       current row's cells, so the XML is never held as a tree.
+    3. Non-empty cells go straight into per-column row-position and text
+       arrays. Number texts are converted once per distinct value and then
+       reused. The DataFrame is assembled from those columns at the end, one
+       column at a time.
+
+``XlsxWorkbook.iter_rows`` streams the same grid in chunks of rows instead: the
+sheet is fed to expat block by block and the cells of completed rows are taken
+out of the column arrays every time a chunk's worth of rows is in, so memory
+holds about one chunk however long the sheet is.
+
+The grid equals ``pd.read_excel(path, header=None, sheet_name=..., dtype=str)``
+with its openpyxl engine: the same cell conversion (numbers as int when
+integral, date-formatted numbers as datetimes, errors and the default NA texts
+as missing), trailing empty cells and rows trimmed, missing rows filled, and in
+every column the first of the equal values ``True``/``1`` or ``False``/``0``
+standing in for the later ones. So boundaries, cache keys and cleaned outputs do
+not depend on which reader produced the grid.
+
+Readers are selected by name from ``READERS``; 'openpyxl' (``pd.read_excel``)
+stays the default.
+"""
+
+import posixpath
+import sys
+import zipfile
+from array import array
+from xml.etree.ElementTree import fromstring, iterparse
+from xml.parsers import expat
+
+import numpy as np
+import pandas as pd
+from openpyxl.styles.stylesheet import Stylesheet
+from openpyxl.utils.cell import column_index_from_string
+from openpyxl.utils.datetime import CALENDAR_MAC_1904, CALENDAR_WINDOWS_1900, from_excel, from_ISO8601
+
+from sheet_sampler import NA_TEXTS
+from stage_registry import READERS, DEFAULT_READER
+
+MAIN_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+PACKAGE_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+STRING_ITEM_TAG = MAIN_NS + "si"
+TEXT_TAG = MAIN_NS + "t"
+RUN_TAG = MAIN_NS + "r"
+# Distinct number texts a streaming read keeps for reuse before starting over, so memory stays flat
+NUMBER_TEXT_CACHE_SIZE = 1 << 16
+
+
+def _rich_text(element) -> str:
+    """Text of a ``<si>`` or ``<is>`` element: its plain text and its runs, phonetic hints left out."""
+    snippets = []
+    plain = element.find(TEXT_TAG)
+    if plain is not None and plain.text:
+        snippets.append(plain.text)
+    for run in element.iterfind(RUN_TAG):
+        text = run.findtext(TEXT_TAG)
+        if text:
+            snippets.append(text)
+    return "".join(snippets)
+
+
+def _number_text(value: str) -> str:
+    """Text ``read_excel(dtype=str)`` holds for a numeric cell: integral values without a fraction."""
+    number = float(value) if ("." in value or "E" in value or "e" in value) else int(value)
+    integral = int(number)
+    return str(integral) if integral == number else str(float(number))
+
+
+class XlsxWorkbook:
+    """
+    An .xlsx file opened for repeated fast sheet reads.
+
+    Shared strings and date styles are parsed on the first sheet read and then
+    reused, so reading every sheet of a workbook parses them once, like a
+    ``pd.ExcelFile`` does for ``pd.read_excel``.
+
+    Attributes:
+        sheet_names (list): Worksheet titles in workbook order (chartsheets left out).
+        active_sheet (int): Position of the active worksheet in ``sheet_names``.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._archive = zipfile.ZipFile(path)
+        try:
+            self._read_workbook()
+        except Exception:
+            self._archive.close()
+            raise
+        self._shared_strings = None
+        self._date_styles = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._archive.close()
+
+    def _rels(self, part: str) -> dict:
+        """Relationship id -> (type, part name) for ``part``."""
+        folder, name = posixpath.split(part)
+        rels_part = posixpath.join(folder, "_rels", name + ".rels")
+        if rels_part not in self._archive.NameToInfo:
+            return {}
+        rels = {}
+        for rel in fromstring(self._archive.read(rels_part)).iter(PACKAGE_REL_NS + "Relationship"):
+            target = rel.get("Target", "")
+            target = target[1:] if target.startswith("/") else posixpath.normpath(posixpath.join(folder, target))
+            rels[rel.get("Id")] = (rel.get("Type", ""), target)
+        return rels
+
+    def _read_workbook(self):
+        package = self._rels("")
+        workbook_part = next((target for rel_type, target in package.values() if rel_type.endswith("/officeDocument")),
+                             "xl/workbook.xml")
+        root = fromstring(self._archive.read(workbook_part))
+        rels = self._rels(workbook_part)
+
+        properties = root.find(MAIN_NS + "workbookPr")
+        date1904 = properties is not None and properties.get("date1904", "").lower() in ("1", "true")
+        self.epoch = CALENDAR_MAC_1904 if date1904 else CALENDAR_WINDOWS_1900
+        self._shared_strings_part = next(
+            (target for rel_type, target in rels.values() if rel_type.endswith("/sharedStrings")), None)
+        self._styles_part = next(
+            (target for rel_type, target in rels.values() if rel_type.endswith("/styles")), "xl/styles.xml")
+
+        view = root.find(f"{MAIN_NS}bookViews/{MAIN_NS}workbookView")
+        active_tab = int(view.get("activeTab", 0)) if view is not None else 0
+        self.sheet_names, self._sheet_parts, self.active_sheet = [], [], 0
+        for tab, sheet in enumerate(root.iterfind(f"{MAIN_NS}sheets/{MAIN_NS}sheet")):
+            rel_type, target = rels.get(sheet.get(REL_NS + "id"), ("", None))
+            if target is None or "chartsheet" in rel_type or target not in self._archive.NameToInfo:
+                continue
+            if tab == active_tab:
+                self.active_sheet = len(self.sheet_names)
+            self.sheet_names.append(sheet.get("name"))
+            self._sheet_parts.append(target)
+
+    def _load_shared_strings(self) -> list:
+        if self._shared_strings is None:
+            strings = []
+            if self._shared_strings_part in self._archive.NameToInfo:
+                with self._archive.open(self._shared_strings_part) as source:
+                    for _, element in iterparse(source):
+                        if element.tag == STRING_ITEM_TAG:
+                            strings.append(sys.intern(_rich_text(element).replace("x005F_", "")))
+                            element.clear()
+            self._shared_strings = strings
+        return self._shared_strings
+
+    def _load_date_styles(self) -> tuple:
+        """Style ids of date-formatted and of duration-formatted cells."""
+        if self._date_styles is None:
+            if self._styles_part in self._archive.NameToInfo:
+                stylesheet = Stylesheet.from_tree(fromstring(self._archive.read(self._styles_part)))
+                self._date_styles = (stylesheet.date_formats, stylesheet.timedelta_formats)
+            else:
+                self._date_styles = (set(), set())
+        return self._date_styles
+
+    def _sheet_part(self, sheet_name) -> str:
+        if isinstance(sheet_name, int):
+            if not 0 <= sheet_name < len(self._sheet_parts):
+                raise IndexError(f"Worksheet index {sheet_name} is invalid, {len(self._sheet_parts)} worksheets found")
+            return self._sheet_parts[sheet_name]
+        if sheet_name not in self.sheet_names:
+            raise ValueError(f"Worksheet named '{sheet_name}' not found")
+        return self._sheet_parts[self.sheet_names.index(sheet_name)]
+
+    def read_sheet(self, sheet_name=0) -> pd.DataFrame:
+        """
+        Parse one worksheet into a string grid.
+
+        Parameters
+        ----------
+        sheet_name : int or str
+            Worksheet position or title, as for ``pd.read_excel``.
+
+        Returns
+        -------
+        pd.DataFrame
+            The grid as ``pd.read_excel(header=None, dtype=str)`` returns it.
+        """
+        part = self._sheet_part(sheet_name)
+        date_styles, timedelta_styles = self._load_date_styles()
+        sheet = _SheetParser(self._load_shared_strings(), date_styles, timedelta_styles, self.epoch)
+        with self._archive.open(part) as source:
+            sheet.parse(source)
+
+        if not sheet.last_row:
+            return pd.DataFrame()
+        # Build one column at a time and drop its cell lists, so only one object array exists at once
+        grid = {}
+        for column in range(sheet.width):
+            values = np.full(sheet.last_row, np.nan, dtype=object)
+            cells = sheet.columns.pop(column + 1, None)
+            if cells is not None:
+                values[np.frombuffer(cells[0], dtype=np.int32)] = cells[1]
+            grid[column] = pd.Series(values, dtype=str)
+        return pd.DataFrame(grid)
+
+    def iter_rows(self, sheet_name=0, start: int = 0, stop: int = None, chunk_size: int = 10000,
+                  col_start: int = 0, col_end: int = None):
+        """
+        Stream a block of a worksheet as consecutive string-grid chunks.
+
+        The sheet is parsed block by block and the cells are taken out of the parser
+        once a chunk's worth of rows is complete, so memory holds about one chunk
+        however long the sheet is.
+
+        Parameters
+        ----------
+        sheet_name : int or str
+            Worksheet position or title.
+        start, stop : int
+            Grid row positions of the block; ``stop`` is exclusive, None for the end of the sheet.
+        chunk_size : int
+            Rows per chunk; only the last chunk may be shorter.
+        col_start, col_end : int
+            Grid column positions of the block, both inclusive. ``col_end`` None stands
+            for the sheet's last column, which ``sheet_width`` finds with an extra pass.
+
+        Yields
+        ------
+        pd.DataFrame
+            Chunks with columns numbered from 0 which, concatenated, equal
+            ``read_sheet(sheet_name).iloc[start:stop, col_start:col_end + 1]``.
+        """
+        if col_end is None:
+            col_end = self.sheet_width(sheet_name) - 1
+        width = col_end - col_start + 1
+        if width <= 0:
+            return
+        date_styles, timedelta_styles = self._load_date_styles()
+        sheet = _SheetParser(self._load_shared_strings(), date_styles, timedelta_styles, self.epoch)
+        taken, pending = start, None
+        with self._archive.open(self._sheet_part(sheet_name)) as source:
+            for _ in sheet.feed(source):
+                # Rows before the last row seen are complete; empty rows past it may still be trailing rows
+                upto = sheet.last_row if stop is None else min(sheet.last_row, stop)
+                if upto <= start:
+                    sheet.columns.clear()
+                elif upto - taken + (0 if pending is None else len(pending)) >= chunk_size:
+                    pending = self._take_rows(sheet, taken, upto, col_start, width, pending)
+                    taken = upto
+                    while len(pending) >= chunk_size:
+                        yield pending.iloc[:chunk_size].reset_index(drop=True)
+                        pending = pending.iloc[chunk_size:]
+                if stop is not None and sheet.last_row >= stop:
+                    break
+                if len(sheet.number_texts) > NUMBER_TEXT_CACHE_SIZE:
+                    sheet.number_texts.clear()
+        upto = sheet.last_row if stop is None else min(sheet.last_row, stop)
+        if upto > taken:
+            pending = self._take_rows(sheet, taken, upto, col_start, width, pending)
+        while pending is not None and len(pending):
+            yield pending.iloc[:chunk_size].reset_index(drop=True)
+            pending = pending.iloc[chunk_size:]
+
+    def sheet_width(self, sheet_name=0) -> int:
+        """Column count of a worksheet's grid, found by a streaming pass that keeps no cells."""
+        date_styles, timedelta_styles = self._load_date_styles()
+        sheet = _WidthScanner(self._load_shared_strings(), date_styles, timedelta_styles, self.epoch)
+        with self._archive.open(self._sheet_part(sheet_name)) as source:
+            for _ in sheet.feed(source):
+                sheet.columns.clear()
+        return sheet.width
+
+    @staticmethod
+    def _take_rows(sheet, first: int, upto: int, col_start: int, width: int, pending: pd.DataFrame = None):
+        """Rows ``first`` to ``upto`` (exclusive) of the parsed cells as a grid after ``pending``; empties the parser's columns."""
+        grid = {}
+        for offset in range(width):
+            values = np.full(upto - first, np.nan, dtype=object)
+            cells = sheet.columns.get(col_start + offset + 1)
+            if cells is not None:
+                positions = np.frombuffer(cells[0], dtype=np.int32) - first
+                inside = (positions >= 0) & (positions < len(values))
+                values[positions[inside]] = np.asarray(cells[1], dtype=object)[inside]
+            grid[offset] = pd.Series(values, dtype=str)
+        sheet.columns.clear()
+        rows = pd.DataFrame(grid)
+        return rows if pending is None else pd.concat([pending, rows], ignore_index=True)
+
+
+class _SheetParser:
+    """
+    Expat handlers that turn a worksheet part into column arrays.
+
+    Attributes:
+        columns (dict): Column number (1-based) -> ([row positions], [texts]) of its non-empty cells.
+        last_row (int): Number of the last row with a non-empty cell; the grid's row count.
+        width (int): Number of the rightmost column with a non-empty cell.
+    """
+
+    def __init__(self, shared_strings: list, date_styles: set, timedelta_styles: set, epoch):
+        self.shared_strings = shared_strings
+        self.date_styles = date_styles
+        self.timedelta_styles = timedelta_styles
+        self.epoch = epoch
+        self.columns = {}
+        self.last_row = 0
+        self.width = 0
+        self.number_texts = {}
+        # (column, False or True) -> text of the first equal boolean/number seen in that column
+        self.first_seen = {}
+
+    def parse(self, source):
+        """Parse a whole worksheet part."""
+        self._parser().ParseFile(source)
+
+    def feed(self, source, block_size: int = 1 << 16):
+        """
+        Parse a worksheet part one block of ``block_size`` bytes at a time, yielding after every block.
+
+        Between blocks the caller may take the cells of the completed rows out of
+        ``columns`` (and clear it), so the parsed cells never outgrow a block.
+        """
+        parser = self._parser()
+        while True:
+            block = source.read(block_size)
+            parser.Parse(block, not block)
+            if not block:
+                return
+            yield
+
+    def _parser(self):
+        """The expat parser for one worksheet part; its handlers are closures over local state to keep per-cell calls cheap."""
+        columns = self.columns
+        convert = self.convert
+        column_numbers = {}
+        row_tag = c_tag = v_tag = is_tag = t_tag = rph_tag = None
+        row_cells, text = [], []
+        next_row = row_number = column = 0
+        cell_type = cell_style = None
+        inline = collecting = phonetic = False
+
+        def start(name, attrs):
+            nonlocal row_number, column, cell_type, cell_style, inline, collecting, phonetic
+            if name == c_tag:
+                reference = attrs.get("r")
+                if reference:
+                    letters = reference.rstrip("0123456789")
+                    column = column_numbers.get(letters)
+                    if column is None:
+                        column = column_numbers[letters] = column_index_from_string(letters)
+                else:
+                    column += 1
+                cell_type = attrs.get("t", "n")
+                cell_style = attrs.get("s")
+                inline = False
+            elif name == v_tag:
+                collecting = cell_type != "inlineStr"
+            elif name == row_tag:
+                number = attrs.get("r")
+                row_number = int(float(number)) if number else max(next_row, 1)
+                column = 0
+            elif name == is_tag:
+                inline = cell_type == "inlineStr"
+            elif name == t_tag:
+                collecting = inline and not phonetic
+            elif name == rph_tag:
+                phonetic = True
+
+        def end(name):
+            nonlocal collecting, phonetic
+            if name == c_tag:
+                value = "".join(text) if text else None
+                text.clear()
+                row_cells.append((column, convert(column, cell_type, cell_style, value, inline)))
+            elif name == v_tag or name == t_tag:
+                collecting = False
+            elif name == row_tag:
+                end_row()
+            elif name == rph_tag:
+                phonetic = False
+
+        def start_root(name, attrs):
+            nonlocal row_tag, c_tag, v_tag, is_tag, t_tag, rph_tag
+            # Namespace processing slows expat down a lot; element names keep the root's prefix instead
+            prefix = name.rpartition(":")[0]
+            prefix = prefix + ":" if prefix else ""
+            row_tag, c_tag, v_tag, is_tag, t_tag, rph_tag = (prefix + tag for tag in ("row", "c", "v", "is", "t", "rPh"))
+            parser.StartElementHandler = start
+
+        def characters(data):
+            if collecting:
+                text.append(data)
+
+        def end_row():
+            nonlocal next_row
+            number = row_number
+            # openpyxl skips rows that repeat or go back to an earlier row number
+            if number < next_row or not row_cells:
+                next_row = max(next_row, number + 1)
+                row_cells.clear()
+                return
+            next_row = number + 1
+            # openpyxl sizes the row by its last cell, so cells listed out of order past it are dropped
+            row_width = row_cells[-1][0]
+            position = number - 1
+            for cell_column, cell_text in row_cells:
+                if cell_text is None or cell_column > row_width:
+                    continue
+                entry = columns.get(cell_column)
+                if entry is None:
+                    entry = columns[cell_column] = (array("i"), [])
+                    self.width = max(self.width, cell_column)
+                entry[0].append(position)
+                entry[1].append(cell_text)
+                self.last_row = number
+            row_cells.clear()
+
+        parser = expat.ParserCreate()
+        parser.buffer_text = True
+        parser.buffer_size = 1 << 16
+        parser.StartElementHandler = start_root
+        parser.EndElementHandler = end
+        parser.CharacterDataHandler = characters
+        return parser
+
+    def convert(self, column: int, data_type: str, style, value, inline: bool):
+        """Text of one cell, NaN for errors and NA texts, None for empty cells."""
+        if data_type == "inlineStr":
+            return self._text(value or "") if inline else None
+        if not value:
+            return None
+        if data_type == "n":
+            if style and int(style) in self.date_styles:
+                return self._date_text(value, int(style))
+            text = self.number_texts.get(value)
+            if text is None:
+                text = self.number_texts[value] = sys.intern(_number_text(value))
+            if text == "0" or text == "1":
+                text = self.first_seen.setdefault((column, text == "1"), text)
+            return text
+        if data_type == "s":
+            return self._text(self.shared_strings[int(value)])
+        if data_type == "b":
+            flag = bool(int(value))
+            return self.first_seen.setdefault((column, flag), str(flag))
+        if data_type == "e":
+            return np.nan
+        if data_type == "d":
+            return str(from_ISO8601(value))
+        return self._text(value)
+
+    def _date_text(self, value: str, style: int):
+        number = float(value) if ("." in value or "E" in value or "e" in value) else int(value)
+        try:
+            return str(from_excel(number, self.epoch, timedelta=style in self.timedelta_styles))
+        except (OverflowError, ValueError):
+            # openpyxl reads serials outside the date range as errors
+            return np.nan
+
+    @staticmethod
+    def _text(text: str):
+        if not text:
+            return None
+        return np.nan if text in NA_TEXTS else text
+
+
+class _WidthScanner(_SheetParser):
+    """A ``_SheetParser`` that only tells whether a cell has a value, for passes that need the sheet's extent."""
+
+    def convert(self, column: int, data_type: str, style, value, inline: bool):
+        if data_type == "inlineStr":
+            return True if inline and value else None
+        if not value:
+            return None
+        if data_type == "s":
+            return True if self.shared_strings[int(value)] else None
+        return True
+
+
+def read_sheet_grid(file_path: str, sheet_name=0) -> pd.DataFrame:
+    """
+    Read one worksheet with the fast reader.
+
+    Parameters
+    ----------
+    file_path : str
+        The .xlsx file to read.
+    sheet_name : int or str
+        Worksheet position or title, as for ``pd.read_excel``.
+
+    Returns
+    -------
+    pd.DataFrame
+        The grid as ``pd.read_excel(file_path, header=None, sheet_name=sheet_name, dtype=str)`` returns it.
+    """
+    with XlsxWorkbook(file_path) as workbook:
+        return workbook.read_sheet(sheet_name)
+
+
+def open_workbook(file_path: str, reader: str = DEFAULT_READER):
+    """Open ``file_path`` for several sheet reads: a ``pd.ExcelFile`` or an ``XlsxWorkbook``."""
+    _check_reader(reader)
+    return XlsxWorkbook(file_path) if reader == "fast" else pd.ExcelFile(file_path)
+
+
+def read_grid(source, sheet_name=0, reader: str = DEFAULT_READER) -> pd.DataFrame:
+    """
+    Read one worksheet as a string grid with the chosen reader.
+
+    Parameters
+    ----------
+    source : str, pd.ExcelFile or XlsxWorkbook
+        Path to the workbook, or a workbook opened by ``open_workbook``; an open
+        workbook is read with the reader it was opened with.
+    sheet_name : int or str
+        Worksheet position or title.
+    reader : str, default 'openpyxl'
+        One of ``READERS``: 'openpyxl' for ``pd.read_excel``, 'fast' for ``XlsxWorkbook``.
+
+    Returns
+    -------
+    pd.DataFrame
+        The grid as ``pd.read_excel(header=None, dtype=str)`` returns it.
+    """
+    _check_reader(reader)
+    if isinstance(source, XlsxWorkbook):
+        return source.read_sheet(sheet_name)
+    if reader == "fast" and isinstance(source, str):
+        return read_sheet_grid(source, sheet_name)
+    return pd.read_excel(source, header=None, sheet_name=sheet_name, dtype=str)
+
+
+def _check_reader(reader: str):
+    if reader not in READERS:
+        raise ValueError(f"Unknown reader '{reader}'. Expected one of: {', '.join(READERS)}")